@@ -5,17 +5,27 @@ import threading
 import struct
 import time
 import numpy as np
-import csv
 import json
-from datetime import datetime
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QComboBox, QPushButton, QCheckBox, QLineEdit, 
                              QGroupBox, QGridLayout, QTextEdit, QFileDialog, QMessageBox,
                              QTableWidget, QTableWidgetItem, QHeaderView, QScrollArea, QTabWidget)
 from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtGui import QIntValidator
 import pyqtgraph as pg
 
+from checksum import XOR_CHECK, CRC16_CHECK
+from frame_codec import RxSchema, check_mode_frame, is_batch_frame, rx_sample_dtype
+from framer import RingFramer
+from history import TieredHistory, VIEW_SPANS, plot_points
+from pacer import PLOT_FPS_CHOICES, PLOT_MAX_FPS, PlotPacer
+from link_stats import BAUD_RATES, DEFAULT_BAUDRATE, MAX_BAUDRATE, LinkMeter, ReadClock, parse_baudrate
+from ratelog import LEVEL_NAMES, LOG_CAPACITY, WARNING, log
+from recorder import RECORD_DIR, SessionRecorder, session_path
+from capture import CAPTURE_SUFFIX, REPLAY_SPEEDS, CaptureWriter, ReplaySerial
+from exporter import Exporter, HistorySource, RecordingSource, export_filter, export_format
+
 # PID参数默认值
 KP_P = 1.0
 KI_P = 0.0
@@ -29,10 +39,17 @@ KD_V = 0.0
 MAX_I_OUT_V = 10.0
 MAX_OUT_V = 50.0
 
+# 缓冲区积压的帧数达到该值时改用 NumPy 批量解码
+BULK_MIN_FRAMES = 16
+
+RECORD_PREFIX = "SelfDefine"  # 录制文件名前缀
+
 class SerialMonitor(QMainWindow):
     def __init__(self):
         super().__init__()
         self.trans = None
+        self.last_trans = None  # 上一次连接, 重新连接时沿用其历史数据和时间轴
+        self.exporter = None    # 后台导出任务
         self.setWindowTitle("PID参数调试工具")
         self.setGeometry(100, 100, 1600, 900)
         
@@ -63,8 +80,10 @@ class SerialMonitor(QMainWindow):
         
         serial_layout.addWidget(QLabel("波特率:"), 1, 0)
         self.baud_combo = QComboBox()
-        self.baud_combo.addItems(['9600', '19200', '38400', '57600', '115200'])
-        self.baud_combo.setCurrentText('115200')
+        self.baud_combo.setEditable(True)  # 可直接输入列表外的波特率
+        self.baud_combo.addItems([str(rate) for rate in BAUD_RATES])
+        self.baud_combo.setCurrentText(str(DEFAULT_BAUDRATE))
+        self.baud_combo.setValidator(QIntValidator(1, MAX_BAUDRATE))
         serial_layout.addWidget(self.baud_combo, 1, 1)
         
         self.connect_btn = QPushButton("连接")
@@ -75,6 +94,37 @@ class SerialMonitor(QMainWindow):
         self.send_btn = QPushButton("发送数据")
         self.send_btn.clicked.connect(self.send_message)
         serial_layout.addWidget(self.send_btn, 2, 0, 1, 3)
+
+        # 校验方式 (需下位机支持, 下位机确认后才切换)
+        self.crc_cb = QCheckBox("CRC-16校验")
+        self.crc_cb.setChecked(False)
+        self.crc_cb.toggled.connect(self.change_check_mode)
+        serial_layout.addWidget(self.crc_cb, 3, 0, 1, 3)
+
+        # 链路利用率: 接收速率、解码帧率、占理论线速比例和解码负载
+        self.link_label = QLabel("链路: -")
+        self.link_label.setWordWrap(True)
+        serial_layout.addWidget(self.link_label, 4, 0, 1, 3)
+
+        # 录制: 每个样本写入 recordings 目录下的会话文件, 长时间运行内存不增长
+        self.record_cb = QCheckBox("录制到文件")
+        self.record_cb.setChecked(False)
+        self.record_cb.toggled.connect(self.toggle_recording)
+        serial_layout.addWidget(self.record_cb, 5, 0)
+
+        # 抓取: 串口原始字节连同读取时刻写入 .zcap 文件, 可不连接下位机回放
+        self.capture_cb = QCheckBox("抓取原始字节")
+        self.capture_cb.setChecked(False)
+        self.capture_cb.toggled.connect(self.toggle_capture)
+        serial_layout.addWidget(self.capture_cb, 5, 1, 1, 2)
+
+        self.replay_btn = QPushButton("回放抓取文件")
+        self.replay_btn.clicked.connect(self.start_replay)
+        serial_layout.addWidget(self.replay_btn, 6, 0, 1, 2)
+        self.speed_combo = QComboBox()
+        for name, speed in REPLAY_SPEEDS:
+            self.speed_combo.addItem(name, speed)
+        serial_layout.addWidget(self.speed_combo, 6, 2)
         
         basic_layout.addWidget(serial_group)
 
@@ -92,11 +142,23 @@ class SerialMonitor(QMainWindow):
         
         basic_layout.addWidget(save_group)
         
-        # 状态显示
+        # 状态显示: 最多保留 LOG_CAPACITY 行, 内容来自接收线程和界面共用的限速日志
         self.status_text = QTextEdit()
         self.status_text.setMaximumHeight(600)
         self.status_text.setReadOnly(True)
-        basic_layout.addWidget(QLabel("状态信息:"))
+        self.status_text.document().setMaximumBlockCount(LOG_CAPACITY)
+        self.log_total = 0  # 已显示的日志条数
+        self.log_level_combo = QComboBox()
+        for level, name in LEVEL_NAMES.items():
+            self.log_level_combo.addItem(name, level)
+        self.log_level_combo.setCurrentIndex(list(LEVEL_NAMES).index(log.level))
+        self.log_level_combo.currentIndexChanged.connect(self.change_log_level)
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(QLabel("状态信息:"))
+        status_layout.addStretch()
+        status_layout.addWidget(QLabel("日志级别:"))
+        status_layout.addWidget(self.log_level_combo)
+        basic_layout.addLayout(status_layout)
         basic_layout.addWidget(self.status_text)
         
         left_tabs.addTab(basic_tab, "基本设置")
@@ -136,6 +198,12 @@ class SerialMonitor(QMainWindow):
         self.receive_btn = QPushButton("保存数据")
         self.receive_btn.clicked.connect(self.receive_message)
         receive_layout.addWidget(self.receive_btn)
+
+        # 后台导出 (CSV/二进制), 勾选"持续导出"时导出已有数据后继续追加新数据
+        self.follow_cb = QCheckBox("持续导出")
+        receive_layout.addWidget(self.follow_cb)
+        self.export_label = QLabel("导出: -")
+        receive_layout.addWidget(self.export_label)
         
         # 传入数据配置选项卡
         rx_tab = QWidget()
@@ -206,6 +274,24 @@ class SerialMonitor(QMainWindow):
         # 右侧绘图区域
         self.plot_widget = QWidget()
         plot_layout = QVBoxLayout(self.plot_widget)
+
+        # 显示范围: 更早的数据按范围自动选用 min/max 汇总级别; 手动缩放后按可见范围选取
+        span_layout = QHBoxLayout()
+        span_layout.addWidget(QLabel("显示范围:"))
+        self.span_combo = QComboBox()
+        for name, span in VIEW_SPANS:
+            self.span_combo.addItem(name, span)
+        span_layout.addWidget(self.span_combo)
+        span_layout.addWidget(QLabel("最高帧率:"))
+        self.fps_combo = QComboBox()
+        for fps in PLOT_FPS_CHOICES:
+            self.fps_combo.addItem(f"{fps} FPS", fps)
+        self.fps_combo.setCurrentIndex(PLOT_FPS_CHOICES.index(PLOT_MAX_FPS))
+        span_layout.addWidget(self.fps_combo)
+        span_layout.addStretch()
+        self.render_label = QLabel("绘图: -")
+        span_layout.addWidget(self.render_label)
+        plot_layout.addLayout(span_layout)
         
         # 图表容器（动态添加图表）
         self.charts_container = QVBoxLayout()
@@ -218,10 +304,21 @@ class SerialMonitor(QMainWindow):
         plot_layout.addLayout(self.charts_container)
         main_layout.addWidget(self.plot_widget, 1)
         
-        # 设置定时器用于更新图表
+        # 设置定时器用于更新图表: 单次触发, 每次绘制后由 PlotPacer 按绘制耗时和数据速率安排下一次
+        self.plot_pacer = PlotPacer()
+        self.fps_combo.currentIndexChanged.connect(
+            lambda: self.plot_pacer.set_max_fps(self.fps_combo.currentData()))
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_plots)
-        self.timer.start(100)  # 每100ms更新一次图表
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.plot_tick)
+        self.timer.start(int(self.plot_pacer.interval * 1000))
+
+        self.link_timer = QTimer()
+        self.link_timer.timeout.connect(self.update_link_stats)
+        self.link_timer.start(1000)  # 每秒统计一次链路利用率
+
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.update_export)
 
         self.refresh_ports()
         
@@ -249,16 +346,26 @@ class SerialMonitor(QMainWindow):
             QMessageBox.warning(self, "警告", "请选择串口")
             return
         
-        baudrate = int(self.baud_combo.currentText())
+        try:
+            baudrate = parse_baudrate(self.baud_combo.currentText())
+        except ValueError:
+            QMessageBox.warning(self, "警告", "请输入有效的波特率")
+            return
         
         try:
             # 创建Trans实例
-            self.trans = Trans(port, baudrate)
+            self.trans = Trans(port, baudrate, self.last_trans)
         
             # 连接串口
             if self.trans.connect():
                 self.connect_btn.setText("断开")
-                self.log_message(f"已连接到 {port}")
+                self.log_message(f"已连接到 {port}, 波特率 {baudrate}")
+                if self.crc_cb.isChecked():
+                    self.change_check_mode(True)
+                if self.record_cb.isChecked():
+                    self.start_recording()
+                if self.capture_cb.isChecked():
+                    self.start_capture()
 
             else:
                 self.log_message("连接失败: Trans.connect() 返回了 False")
@@ -270,6 +377,14 @@ class SerialMonitor(QMainWindow):
             self.trans = None
             QMessageBox.critical(self, "错误", f"连接错误: {str(e)}")
 
+    def change_check_mode(self, use_crc):
+        """请求下位机切换帧校验方式"""
+        if not self.trans or not self.trans.ser:
+            return
+        check = CRC16_CHECK if use_crc else XOR_CHECK
+        if self.trans.request_check_mode(check):
+            self.log_message(f"已请求切换到 {check.name} 校验, 收到下位机对应格式的数据后生效")
+
     def send_message(self):
         """发送数据到设备"""
         try:
@@ -331,30 +446,102 @@ class SerialMonitor(QMainWindow):
         if not self.trans:
             return
             
-        self.trans.custom_rx_fields = []
+        rx_fields = []
         for row in range(self.rx_table.rowCount()):
             name = self.rx_table.item(row, 0).text()
             data_type = self.rx_table.cellWidget(row, 1).currentText()
             # offset_item = self.rx_table.item(row, 2)
             # offset = int(offset_item.text()) if offset_item and offset_item.text().isdigit() else 0
             
-            self.trans.custom_rx_fields.append({
+            rx_fields.append({
                 'name': name,
                 'type': data_type,
                 # 'offset': offset
             })
-            
-            # 初始化历史数据存储
-            if name not in self.trans.history_data:
-                self.trans.history_data[name] = []
+
+        # 编译传入字段并初始化历史数据存储
+        self.trans.set_rx_fields(rx_fields)
     
     def disconnect_serial(self):
         """断开串口连接"""
         if self.trans:
+            recorder = self.trans.recorder
+            capture = self.trans.capture
             self.trans.disconnect()
+            if capture is not None:
+                self.log_message(f"抓取结束: {capture.path}, {capture.nbytes} 字节")
+            if self.exporter is not None:
+                self.exporter.stop()  # 持续导出写完已收到的数据后结束
+            if recorder is not None:
+                self.log_message(f"录制结束: {recorder.path}, {recorder.rows} 个样本")
+            self.last_trans = self.trans
             self.trans = None
         self.connect_btn.setText("连接")
+        self.link_label.setText("链路: -")
         self.log_message("已断开串口连接")
+
+    def toggle_recording(self, checked):
+        """开始/停止录制, 未连接时在下次连接后开始"""
+        if not self.trans:
+            return
+        if checked:
+            self.start_recording()
+        else:
+            recorder = self.trans.stop_recording()
+            if recorder is not None:
+                self.log_message(f"录制结束: {recorder.path}, {recorder.rows} 个样本")
+
+    def toggle_capture(self, checked):
+        """开始/停止抓取原始字节, 未连接时在下次连接后开始"""
+        if not self.trans or self.trans.replaying:
+            return
+        if checked:
+            self.start_capture()
+        else:
+            capture = self.trans.stop_capture()
+            if capture is not None:
+                self.log_message(f"抓取结束: {capture.path}, {capture.nbytes} 字节")
+
+    def start_capture(self):
+        """为当前连接新建抓取文件"""
+        try:
+            path = self.trans.start_capture()
+            self.log_message(f"开始抓取原始字节: {path}")
+        except Exception as e:
+            self.log_message(f"抓取失败: {str(e)}")
+            self.capture_cb.setChecked(False)
+
+    def start_replay(self):
+        """选择抓取文件, 不连接串口按所选速度回放 (经过与串口数据相同的解码流程)"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "回放抓取文件", RECORD_DIR, f"抓取文件 (*{CAPTURE_SUFFIX})")
+        if not file_path:
+            return
+        if self.trans:
+            self.disconnect_serial()
+        try:
+            self.trans = Trans("回放", DEFAULT_BAUDRATE)
+            self.setup_rx_data()  # 按当前传入字段配置解码
+            self.trans.replay(file_path, self.speed_combo.currentData())
+            self.connect_btn.setText("断开")
+            self.log_message(f"开始回放 {file_path} ({self.speed_combo.currentText()})")
+            if self.record_cb.isChecked():
+                self.start_recording()
+        except Exception as e:
+            self.log_message(f"回放失败: {str(e)}")
+            self.trans = None
+
+    def start_recording(self):
+        """为当前连接新建录制文件, 尚未设置传入字段时在发送数据后开始"""
+        try:
+            path = self.trans.start_recording()
+            if path:
+                self.log_message(f"开始录制: {path}")
+            else:
+                self.log_message("录制将在设置传入字段 (发送数据) 后开始")
+        except Exception as e:
+            self.log_message(f"录制失败: {str(e)}")
+            self.record_cb.setChecked(False)
     
     def import_config(self):
         """从JSON文件导入配置"""
@@ -529,8 +716,7 @@ class SerialMonitor(QMainWindow):
         curves = []
         for i, source in enumerate(data_sources):
             curve_color = color if len(data_sources) == 1 else ['r', 'g', 'b', 'y'][i % 4]
-            curve = plot.plot(pen=curve_color, name=source)
-            curves.append(curve)
+            curves.append(self._make_curve(plot, curve_color, source))
         
         # 添加到容器
         self.charts_container.addWidget(chart_widget)
@@ -542,7 +728,8 @@ class SerialMonitor(QMainWindow):
             'plot': plot,
             'curves': curves,
             'data_sources': data_sources,
-            'color': color
+            'color': color,
+            'key': None  # 上次绘制时的数据和范围, 未变化时跳过
         })
         
         # 添加到图表配置表格
@@ -552,6 +739,14 @@ class SerialMonitor(QMainWindow):
         self.chart_table.setItem(row, 1, QTableWidgetItem(", ".join(data_sources)))
         # self.chart_table.setItem(row, 2, QTableWidgetItem(color))
     
+    @staticmethod
+    def _make_curve(plot, color, name):
+        """创建曲线: 只绘制可见范围内的点, 点数超过像素宽度时每个像素列保留最大/最小值 (不丢尖峰)"""
+        curve = plot.plot(pen=color, name=name)
+        curve.setClipToView(True)
+        curve.setDownsampling(auto=True, method='peak')
+        return curve
+
     def refresh_chart(self):
         """刷新图表显示"""
         try:
@@ -577,10 +772,10 @@ class SerialMonitor(QMainWindow):
                         # 更新曲线
                         chart['plot'].clear()
                         chart['curves'] = []
+                        chart['key'] = None
                         for j, source in enumerate(sources):
                             curve_color = color if len(sources) == 1 else ['r', 'g', 'b', 'y'][j % 4]
-                            curve = chart['plot'].plot(pen=curve_color, name=source)
-                            chart['curves'].append(curve)
+                            chart['curves'].append(self._make_curve(chart['plot'], curve_color, source))
             self.log_message("图表已刷新")
         except Exception as e:
             self.log_message(f"刷新图表异常: {str(e)}")
@@ -598,49 +793,164 @@ class SerialMonitor(QMainWindow):
             self.charts.pop(current_row)
             self.chart_table.removeRow(current_row)
     
+    def update_link_stats(self):
+        """更新链路利用率和绘图帧率显示, 输出日志中的重复消息汇总"""
+        log.flush()
+        self.show_log()
+        self.render_label.setText(f"绘图: {self.plot_pacer.summary()}")
+        if self.trans and self.trans.replaying and not self.trans.recv_thread.is_alive():
+            self.disconnect_serial()
+            self.log_message("回放结束")
+            return
+        if self.trans and self.trans.ser:
+            text = f"链路: {self.trans.link.summary()}"
+            if self.trans.replaying:
+                text += f", 回放 {self.trans.ser.progress() * 100:.0f}%"
+            recorder = self.trans.recorder
+            if recorder is not None:
+                text += f", 录制 {recorder.rows} 个样本 ({recorder.nbytes / 1048576:.1f} MB)"
+            self.link_label.setText(text)
+
+    def plot_tick(self):
+        """绘图定时器: 重绘后按 PlotPacer 给出的间隔安排下一次, 绘制跟不上时丢帧而不排队"""
+        self.plot_pacer.begin()
+        drawn, total, latency = False, None, None
+        try:
+            drawn = self.update_plots()
+            history = self.trans.history if self.trans else None
+            if history is not None:
+                total = history.total
+                # 延迟: 屏幕上最新样本的年龄 (回放时时间轴与当前时刻无关, 不统计)
+                if drawn and not self.trans.replaying:
+                    latency = self.trans.clock.now() - history.last(1)[0][-1]
+        finally:
+            if drawn:
+                # Qt 在回到事件循环后才重绘界面; 排在重绘之后结束计时, 使耗时包括整帧的绘制
+                QTimer.singleShot(0, lambda: self.plot_done(drawn, total, latency))
+            else:
+                self.plot_done(drawn, total, latency)
+
+    def plot_done(self, drawn, total, latency):
+        """一帧结束: 更新绘图统计并启动下一次的定时器"""
+        self.timer.start(self.plot_pacer.end(drawn, total, latency))
+
     def update_plots(self):
-        """更新图表显示"""
-        if self.trans and hasattr(self.trans, 'history_time') and self.trans.history_time:
+        """
+        更新图表显示, 有图表重绘时返回 True; 数据、显示范围和宽度都没变的图表跳过
+        各图表按自身像素宽度和可见范围选取汇总级别 (汇总级为 min/max, 不丢尖峰), 绘制点数不随历史长度增长
+        """
+        history = self.trans.history if self.trans else None
+        drawn = False
+        if history is not None and len(history):
+            names = history.names
+            span = self.span_combo.currentData()
+            windows = {}  # 同一宽度的图表共用同一次选取的结果
             # 更新每个图表
             for chart in self.charts:
-                for i, source in enumerate(chart['data_sources']):
-                    if source in self.trans.history_data and self.trans.history_data[source]:
-                        chart['curves'][i].setData(
-                            self.trans.history_time, 
-                            self.trans.history_data[source]
-                        )
+                plot = chart['plot']
+                view_box = plot.getViewBox()
+                width = plot_points(view_box.width())
+                auto = view_box.autoRangeEnabled()[0]
+                x_range = None if auto else tuple(plot.viewRange()[0])
+                key = (id(history), history.total, span, x_range, width, tuple(chart['data_sources']))
+                if key == chart['key']:
+                    continue
+                chart['key'] = key
+                drawn = True
+                if auto:
+                    if width not in windows:
+                        windows[width] = history.window(span, width)
+                    times, channels, _ = windows[width]
+                else:
+                    # 手动缩放/平移后按可见时间范围选取分辨率
+                    times, channels, _ = history.view(x_range[0], x_range[1], width)
+                for curve, source in zip(chart['curves'], chart['data_sources']):
+                    if source in names:
+                        curve.setData(times, history.channel(channels, names.index(source)), connect='finite')
+        return drawn
                         
     def receive_message(self):
-        """保存接收的数据到CSV文件"""
+        """在后台导出接收的数据到CSV或二进制文件; 持续导出时再次点击停止"""
+        exporter = self.exporter
+        if exporter is not None and not exporter.done:
+            if exporter.follow:
+                exporter.stop()
+            return
+        trans = self.trans or self.last_trans
+        if not trans or (trans.recorder is None and trans.history is None):
+            self.log_message("没有可导出的数据")
+            return
         try:
-            if self.trans and self.trans.history_data:
-                file_path, _ = QFileDialog.getSaveFileName(
-                    self, "导出配置", "received_data", "CSV文件 (*.csv)")
-                with open(file_path, "w", newline="") as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["时间"] + list(self.trans.history_data.keys()))
-                    for i in range(len(self.trans.history_time)):
-                        row = [self.trans.history_time[i]]
-                        for key in self.trans.history_data.keys():
-                            row.append(self.trans.history_data[key][i] if i < len(self.trans.history_data[key]) else "")
-                        writer.writerow(row)
-                self.log_message("接收的数据已保存到 received_data.csv")
+            file_path, selected = QFileDialog.getSaveFileName(
+                self, "导出数据", "received_data", export_filter())
+            if not file_path:
+                return
+            fmt, file_path = export_format(file_path, selected)
+            # 录制中时从录制文件导出本次连接的全部数据, 否则导出内存中的历史数据
+            recorder = trans.recorder
+            if recorder is not None:
+                source = RecordingSource(recorder.path, recorder)
+            else:
+                source = HistorySource(trans.history, None)
+            self.exporter = Exporter(source, file_path, fmt, self.follow_cb.isChecked(), info={
+                'tool': RECORD_PREFIX, 'port': trans.port, 'baudrate': trans.baudrate,
+                'start_time': trans.clock.start_time,
+            }).start()
+            if self.exporter.follow:
+                self.receive_btn.setText("停止导出")
+            self.export_timer.start(200)
+            self.log_message(f"开始导出到 {file_path}")
         except Exception as e:
             self.log_message(f"保存接收数据异常: {str(e)}")
 
+    def update_export(self):
+        """显示后台导出进度, 完成后记录结果"""
+        exporter = self.exporter
+        if exporter is None:
+            self.export_timer.stop()
+            return
+        if not exporter.done:
+            percent = exporter.rows / exporter.total * 100 if exporter.total else 100
+            self.export_label.setText(f"导出: {exporter.rows}/{exporter.total} 行 ({percent:.0f}%)")
+            return
+        self.export_timer.stop()
+        self.receive_btn.setText("保存数据")
+        if exporter.error is not None:
+            self.export_label.setText("导出: 失败")
+            self.show_log()  # 错误已由导出线程写入日志
+            return
+        self.export_label.setText(f"导出: {exporter.rows} 行, {exporter.elapsed:.1f} s")
+        message = f"接收的数据已保存到 {exporter.path} ({exporter.rows} 行)"
+        if exporter.lost:
+            message += f", {exporter.lost} 行在导出前已被覆盖"
+        self.log_message(message)
+
     def log_message(self, message):
         """记录状态消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.status_text.append(f"[{timestamp}] {message}")
+        log.info(message)
+        self.show_log()
+
+    def show_log(self):
+        """把日志中尚未显示的记录追加到状态栏"""
+        entries, self.log_total = log.since(self.log_total)
+        for timestamp, level, text in entries:
+            prefix = f"{LEVEL_NAMES[level]}: " if level >= WARNING else ""
+            self.status_text.append(f"[{timestamp.strftime('%H:%M:%S')}] {prefix}{text}")
+
+    def change_log_level(self):
+        log.level = self.log_level_combo.currentData()
     
     def closeEvent(self, event):
         """关闭窗口时确保串口关闭[6](@ref)"""
         if self.trans and self.trans.ser and self.trans.ser.is_open:
             self.trans.disconnect()
+        if self.exporter is not None:
+            self.exporter.stop(wait=True)
         event.accept()
 
 class Trans:
-    def __init__(self, port, baudrate=115200):
+    def __init__(self, port, baudrate=115200, previous=None):
+        """previous 为上一次连接的 Trans, 传入时沿用其历史数据和时间轴"""
         self.ser = None
         self.port = port
         self.baudrate = baudrate
@@ -652,9 +962,34 @@ class Trans:
         self.custom_tx_fields = []  # 传出数据字段
         self.custom_rx_fields = []  # 传入数据字段
         
-        # 历史数据存储
-        self.history_time = []
-        self.history_data = {}  # 按数据源名称存储历史数据
+        # 历史数据: 每帧一行的结构化记录 (各字段保持传入字段的类型, 附带逐字段的有效标记, 列名即数据源名称),
+        # 最近 max_history_length 行之前的数据逐级汇总为 min/max/mean; 由 set_rx_fields 按字段建立
+        # 完整数据可另外录制到文件
+        history = previous.history if previous is not None else None
+        self.max_history_length = 1000
+        self.recording = False  # 是否录制 (设置传入字段后才能建立录制文件)
+        self.recorder = None    # 录制中时为 SessionRecorder, 由接收线程写入
+        self.capture = None     # 抓取原始字节时为 CaptureWriter, 由接收线程写入
+        self.replaying = False  # ser 为回放抓取文件的 ReplaySerial
+
+        # 帧校验方式: 收到下位机以某种方式校验的合法帧后, 发送也切换到该方式
+        self.frame_check = XOR_CHECK
+
+        # (编译后的传入字段解码器 {校验方式: RxSchema}, 历史数据), 由 set_rx_fields 一次整体替换;
+        # 接收线程每块数据只读取一次, 旧字段解码的帧不会写入按新字段建立的历史数据
+        self.rx = ({}, history)
+
+        self.link = LinkMeter(baudrate)  # 链路利用率统计
+        # 读取时刻时间戳, 历史时间为相对会话开始的秒数
+        self.clock = ReadClock(baudrate, origin=previous.clock if previous is not None else None)
+
+    @property
+    def rx_schemas(self):
+        return self.rx[0]
+
+    @property
+    def history(self):
+        return self.rx[1]
 
     def connect(self):
         """连接串口设备"""
@@ -674,7 +1009,7 @@ class Trans:
             self.recv_thread.start()
             return True
         except Exception as e:
-            print(f"连接失败: {e}")
+            log.error("连接失败: %s", e)
             return False
 
     def disconnect(self):
@@ -685,11 +1020,97 @@ class Trans:
         if hasattr(self, 'ser') and self.ser and self.ser.is_open:
             self.ser.close()
             self.ser = None
+        self.stop_recording()
+        self.stop_capture()
+
+    def start_recording(self):
+        """
+        开始录制: 此后解码得到的每个样本都追加写入新的录制文件, 返回文件路径;
+        尚未设置传入字段时返回 None, 在 set_rx_fields 中建立录制文件
+        """
+        self.stop_recording()
+        self.recording = True
+        if self.custom_rx_fields:
+            self._open_recorder()
+        return self.recorder.path if self.recorder is not None else None
+
+    def start_capture(self):
+        """开始把串口原始字节连同读取时刻写入新的抓取文件, 返回文件路径"""
+        self.stop_capture()
+        self.capture = CaptureWriter(session_path(RECORD_PREFIX, suffix=CAPTURE_SUFFIX), info={
+            'tool': RECORD_PREFIX, 'port': self.port, 'baudrate': self.baudrate,
+            'start_time': self.clock.start_time,
+        })
+        return self.capture.path
+
+    def stop_capture(self):
+        """停止抓取并关闭抓取文件, 返回已关闭的 CaptureWriter (未在抓取时返回 None)"""
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.close()
+        return capture
+
+    def replay(self, path, speed=1.0):
+        """
+        不连接串口, 把抓取文件中的原始字节按原读取间隔 (speed 倍速, 0 为最快) 送入接收线程,
+        经过与串口数据相同的解码和存储流程; 历史数据的时间为抓取时的时刻
+        """
+        self.ser = ReplaySerial(path, speed)
+        info = self.ser.info
+        self.baudrate = info.get('baudrate', self.baudrate)
+        self.link = LinkMeter(self.baudrate)
+        self.clock = ReadClock(self.baudrate, start_ns=0)
+        self.clock.start_time = info.get('start_time', self.clock.start_time)
+        self.replaying = True
+        self.send_over = True  # 抓取的数据直接保存, 无需先发送
+        self.recv_thread = threading.Thread(target=self._receive_data)
+        self.recv_thread.daemon = True
+        self.recv_thread.start()
+        return True
+
+    def stop_recording(self):
+        """停止录制并关闭录制文件, 返回已关闭的 SessionRecorder (未在录制时返回 None)"""
+        self.recording = False
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    def _open_recorder(self):
+        """按当前传入字段新建录制文件 (字段变化后的数据写入新文件)"""
+        fields = self.custom_rx_fields
+        old, self.recorder = self.recorder, SessionRecorder(
+            session_path(RECORD_PREFIX), [field['name'] for field in fields], rx_sample_dtype(fields), info={
+                'tool': RECORD_PREFIX, 'port': self.port, 'baudrate': self.baudrate,
+                'start_time': self.clock.start_time, 'types': [field['type'] for field in fields],
+            })
+        if old is not None:
+            old.close()
+        log.info("开始录制: %s", self.recorder.path)
+
+    def set_rx_fields(self, fields):
+        """设置传入数据字段, 编译为帧解码器; 字段变化时重新建立历史数据, 录制中时改写新的录制文件"""
+        schemas = {check.mode: RxSchema(fields, check) for check in (XOR_CHECK, CRC16_CHECK)} if fields else {}
+        names = [field['name'] for field in fields]
+        dtype = rx_sample_dtype(fields)
+        old = history = self.history
+        changed = old is None or names != old.names or dtype != old.raw.value_dtype
+        if changed:
+            history = None
+            if names:
+                # 字段变化时按名称保留已有的历史数据, 新增的字段在已有记录中标记为缺失
+                history = TieredHistory(len(names), self.max_history_length, dtype=dtype, names=names)
+                if old is not None:
+                    history.adopt(old)
+        self.custom_rx_fields = fields
+        self.rx = (schemas, history)
+        if self.recording and names and (changed or self.recorder is None):
+            self._open_recorder()
 
     def send_data(self):
         """发送数据（包含自定义字段）"""
         if not self.ser or not self.ser.is_open:
-            print("串口未连接，无法发送数据")
+            log.warning("串口未连接，无法发送数据")
             return False
 
         # 计算总数据长度
@@ -735,127 +1156,183 @@ class Trans:
                 data[offset+1] = field['value'] & 0xFF
                 offset += 2
 
-        total_size = offset + 2  
-
-        data = data[:total_size]  # 截断到实际大小
-        # 计算校验和（除校验位和帧尾外的所有字节）
-        checksum = 0x00
-        for i in range(total_size - 2):  # 不包括校验位和帧尾
-            checksum ^= data[i]
-        
-        data[total_size - 2] = checksum  # 校验位
-        data[total_size - 1] = 0x5D  # 帧尾
+        # 截断到实际大小, 追加校验位（覆盖校验位和帧尾之前的所有字节）和帧尾
+        data = self.frame_check.seal(data[:offset])
         
         try:
             self.ser.write(data)
             self.send_over = True
-            print(data)
-            print("发送数据成功")
+            recorder = self.recorder
+            if recorder is not None:
+                # 记录发送的字段值, 回看录制文件时可直接定位到每次发送
+                recorder.add_event("send_data", self.clock.now(),
+                                   {field['name']: field['value'] for field in self.custom_tx_fields})
+            log.debug("发送数据: %s", data)
+            log.info("发送数据成功")
             return data
         except Exception as e:
-            print(f"发送数据失败: {e}")
+            log.error("发送数据失败: %s", e)
             return None
 
+    def request_check_mode(self, check):
+        """发送切换校验方式的命令帧"""
+        if not self.ser or not self.ser.is_open:
+            log.warning("串口未连接，无法发送数据")
+            return False
+        try:
+            self.ser.write(check_mode_frame(check))
+            return True
+        except Exception as e:
+            log.error("发送数据失败: %s", e)
+            return False
+
     def _receive_data(self):
         """接收线程函数，持续处理串口数据"""
-        buffer = bytearray()
+        framer = RingFramer()
         while self.ser and self.ser.is_open:
             try:
-                data = self.ser.read(self.ser.in_waiting or 1)
+                waiting = self.ser.in_waiting
+                data = self.ser.read(waiting or 1)
                 if data:
-                    buffer.extend(data)
-                    
-                    while len(buffer) >= 5:  # 最小帧长度
-                        # 查找帧头0xAA 0x55
-                        start_idx = buffer.find(b'\xAA\x55')
-                        if start_idx == -1:
-                            buffer.clear()
-                            break
-                            
-                        # 提取帧数据
-                        data_length = buffer[start_idx + 2]
-                        frame = buffer[start_idx:start_idx + data_length]
-                        del buffer[:start_idx + data_length]  # 移除已处理数据
-
-                        # 验证帧尾
-                        if frame[-1] != 0x5D:
-                            print("警告: 无效帧尾")
-                            continue
-                            
-                        # 解析数据帧
-                        self._parse_status_frame(frame)
+                    self.clock.on_read(len(data), self.ser.read_ns if self.replaying else None)
+                    capture = self.capture
+                    if capture is not None:
+                        capture.write(self.clock.read_ns, data)
+                    start = time.perf_counter()
+                    self.link.add_read(len(data), waiting)
+                    framer.feed(data)
+                    bad_frames = framer.bad_frames
+                    rx = self.rx  # 本块数据统一使用同一组解码器和历史数据
+
+                    # 积压较多时一次向量化处理整个缓冲区
+                    schema = rx[0].get(self.frame_check.mode)
+                    if (self.send_over and schema
+                            and len(framer) >= BULK_MIN_FRAMES * schema.size):
+                        offset = framer.offset
+                        records, consumed, bad = schema.bulk_decoder.decode(framer.pending())
+                        framer.consume(consumed)
+                        if bad:
+                            log.count(WARNING, "校验和错误 x%d", bad)
+                        self.link.add_frames(len(records))
+                        self._store_rx_block(rx[1], records, self.clock.block_times(offset, consumed, len(records)))
+
+                    # 逐帧解析, 不完整的帧留在缓冲区等待后续数据
+                    for frame in framer.frames():
+                        self._parse_status_frame(frame, framer.offset, rx)
+
+                    if framer.bad_frames != bad_frames:
+                        log.count(WARNING, "无效帧长度或帧尾 x%d", framer.bad_frames - bad_frames)
+                    self.link.add_busy(time.perf_counter() - start)
             except Exception as e:
-                print(f"接收错误: {e}")
+                log.error("接收错误: %s", e)
                 time.sleep(0.2)
 
-    def _parse_status_frame(self, frame):
-        """解析状态数据帧"""
-        if not self.send_over:
-            return
-            
+    def _parse_status_frame(self, frame, end, rx):
+        """
+        解析状态数据帧, end 为帧尾在接收字节流中的位置, 用于计算时间戳;
+        rx 为接收线程本块读取的 (解码器, 历史数据)
+        """
         try:
-            # 校验和验证
-            checksum = 0   
-            for i in range(len(frame) - 2):  # 不包括校验位和帧尾
-                checksum ^= frame[i]
-                
-            if checksum != frame[-2]:
-                print("警告: 校验和错误")
+            schemas, history = rx
+            if not schemas:
+                return
+            if is_batch_frame(frame):
+                self._parse_batch_frame(frame, end, rx)
+                return
+            for schema in schemas.values():
+                if schema.size == len(frame):
+                    break
+            else:
+                log.warning("帧长度 %s 与传入数据配置 (%s 字节) 不符", len(frame), schemas[XOR_CHECK.mode].size)
+                return
+
+            # 校验和验证并一次解析全部字段
+            values = schema.decode(frame)
+            if values is None:
+                log.count(WARNING, "校验和错误 x%d", 1)
+                return
+            self.link.add_frames(1)
+            timestamp = self.clock.frame_time(end)
+
+            # 下位机已切换校验方式, 发送随之切换
+            if schema.check is not self.frame_check:
+                self.frame_check = schema.check
+                log.info("下位机使用 %s 校验", schema.check.name)
+
+            if not self.send_over:
                 return
                 
             # 解析基础数据
-            self.running = bool(frame[3])
+            self.running = bool(values[0])
             if self.running:
-                # 解析自定义字段数据
-                current_time = time.time()
-                offset = 4  # 数据起始偏移
-                for field in self.custom_rx_fields:
-                    try:
-                        if offset + 4 > len(frame):
-                            continue
-                            
-                        if field['type'] == 'int16' and offset + 2 <= len(frame):
-                            value = struct.unpack('<h', frame[offset:offset+2])[0]
-                            offset += 2
-                        elif field['type'] == 'uint16' and offset + 2 <= len(frame):
-                            value = struct.unpack('<H', frame[offset:offset+2])[0]
-                            offset += 2
-                        elif field['type'] == 'int32' and offset + 4 <= len(frame):
-                            value = struct.unpack('<i', frame[offset:offset+4])[0]
-                            offset += 4
-                        elif field['type'] == 'uint32' and offset + 4 <= len(frame):
-                            value = struct.unpack('<I', frame[offset:offset+4])[0]
-                            offset += 4
-                        elif field['type'] == 'float' and offset + 4 <= len(frame):
-                            value = struct.unpack('<f', frame[offset:offset+4])[0]
-                            offset += 4
-                        elif field['type'] == 'uint8' and offset + 1 <= len(frame):
-                            value = frame[offset]
-                            offset += 1
-                        else:
-                            continue
-
-                        # 存储历史数据
-                        if field['name'] not in self.history_data:
-                            self.history_data[field['name']] = []
-                            
-                        self.history_data[field['name']].append(value)
-                        
-                        # 限制历史数据长度
-                        if len(self.history_data[field['name']]) > 1000:
-                            self.history_data[field['name']] = self.history_data[field['name']][-1000:]
-                            
-                    except (struct.error, IndexError) as e:
-                        print(f"解析字段 {field['name']} 错误: {e}")
-                        continue
-                
-                # 更新时间历史
-                self.history_time.append(current_time)
-                if len(self.history_time) > 1000:
-                    self.history_time = self.history_time[-1000:]
+                # 存储历史数据
+                history.append(values[1:], timestamp)
+                recorder = self.recorder
+                if recorder is not None:
+                    recorder.append(values[1:], timestamp)
                     
         except Exception as e:
-            print(f"解析数据帧错误: {e}")
+            log.error("解析数据帧错误: %s", e)
+
+    def _parse_batch_frame(self, frame, end, rx):
+        """解析多样本批量帧, 每个样本展开为一行历史数据"""
+        schemas, history = rx
+        for schema in schemas.values():
+            decoder = schema.batch_decoder
+            if decoder and decoder.frame_len(frame[4]) == len(frame):
+                break
+        else:
+            log.warning("批量帧长度 %s 与传入数据配置不符", len(frame))
+            return
+        result = decoder.decode(frame)
+        if result is None:
+            log.count(WARNING, "校验和错误 x%d", 1)
+            return
+        self.link.add_frames(1, frame[4])
+        times = self.clock.frame_times((end,), (frame[4],), (len(frame),))
+
+        if schema.check is not self.frame_check:
+            self.frame_check = schema.check
+            log.info("下位机使用 %s 校验", schema.check.name)
+
+        if not self.send_over:
+            return
+        running, samples = result
+        self.running = bool(running)
+        if self.running:
+            self._store_rx_samples(history, samples, times)
+
+    def snapshot(self, n=None):
+        """
+        界面线程读取历史数据: 返回最近 n 个样本 (默认全部) 的 (时间戳, 记录, 代数), 尚未设置传入字段时返回 None
+        记录为每样本一行的结构化数组, 字段 f0 ... fN 依次对应传入字段 (history.names), 另有逐字段的有效标记 valid
+        (字段配置变化前的记录中新增的字段为无效); 取某一列用 history.channel(记录, 序号). 时间戳与记录长度一致且只读
+        """
+        history = self.history
+        return history.snapshot(n) if history is not None else None
+
+    def rows_since(self, generation):
+        """返回第 generation 代之后的新样本 (时间戳, 记录, 当前代数), 记录的格式见 snapshot; 尚未设置传入字段时返回 None"""
+        history = self.history
+        return history.since(generation) if history is not None else None
+
+    def _store_rx_block(self, history, records, times):
+        """按列整块保存批量解码得到的记录及其时间戳数组"""
+        if not len(records):
+            return
+        running = records['running'] != 0
+        self.running = bool(running[-1])
+        self._store_rx_samples(history, records[running], times[running])
+
+    def _store_rx_samples(self, history, records, times):
+        """按列整块保存多行字段数据 (字段依次命名为 f0, f1, ... 的结构化数组) 及逐行时间戳数组"""
+        if not len(records):
+            return
+
+        history.extend(records, times)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.extend(records, times)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,267 @@
+"""
+会话归档文件 (.zarc): 按通道分列、定长分块压缩的只追加格式, 只依赖 NumPy 和标准库
+[魔数(8)] [数据块 ...] [索引(JSON, UTF-8)] [索引偏移 uint64 | 索引长度 uint32 | 魔数(8)]
+每块 chunk_rows 行, 时间列与每个通道各自独立压缩; 索引记录每块的时间范围、行数以及各列的位置和 min/max,
+读取时只需读出索引, 再按所选通道和时间范围 seek 到相关的块
+编码: 时间转为 int64 ns (精确到 ns) 后差分, 整数列差分 (按原类型回绕), 浮点列不差分; 然后按字节重排 (shuffle) 并 zlib 压缩
+缺失的值 (有效标记为 False) 单独保存为压缩的位图, 全部有效的块不保存
+用法: python archive.py recordings/xxx.zrec [xxx.zarc]  (把会话录制文件转换为归档文件)
+"""
+import os
+import json
+import argparse
+import zlib
+import struct
+
+import numpy as np
+
+ARCHIVE_MAGIC = b'ZPIDARC1'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.zarc'
+ARCHIVE_FOOTER = struct.Struct('<QI8s')
+ARCHIVE_CHUNK_ROWS = 65536  # 每块的行数
+ARCHIVE_LEVEL = 3           # zlib 压缩级别 (6 约小 8%, 但慢一倍以上)
+
+
+def _encode(values, delta):
+    """差分 (可选) + 字节重排 + zlib"""
+    if delta and len(values):
+        values = np.concatenate((values[:1], np.diff(values)))
+    raw = np.ascontiguousarray(values).view(np.uint8).reshape(-1, values.dtype.itemsize).T
+    return zlib.compress(raw.tobytes(), ARCHIVE_LEVEL)
+
+
+def _decode(data, dtype, rows, delta):
+    raw = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(dtype.itemsize, rows)
+    values = np.ascontiguousarray(raw.T).view(dtype).reshape(rows)
+    if delta:
+        values = np.cumsum(values, dtype=dtype)
+    return values
+
+
+def _bounds(values, valid):
+    """有效值的 (min, max), 没有有效值时为 (None, None)"""
+    if valid is not None:
+        values = values[valid]
+    if values.dtype.kind == 'f':
+        values = values[~np.isnan(values)]
+    if not len(values):
+        return None, None
+    return values.min().item(), values.max().item()
+
+
+class ArchiveWriter:
+    """
+    按块写入归档文件; extend 可多次调用, 数据先缓存到满一块再压缩写出, close 时写入索引
+    names: 各通道的名称; dtype: 通道的类型 (所有通道相同) 或字段依次命名为 f0, f1, ... 的结构化类型
+    """
+
+    def __init__(self, path, names, dtype=np.int16, info=None, chunk_rows=ARCHIVE_CHUNK_ROWS):
+        self.path = path
+        self.names = list(names)
+        dtype = np.dtype(dtype)
+        if dtype.names:
+            self.dtypes = [dtype[i].newbyteorder('<') for i in range(len(self.names))]
+        else:
+            self.dtypes = [dtype.newbyteorder('<')] * len(self.names)
+        self.chunk_rows = chunk_rows
+        self.info = dict(info or {})
+        self.rows = 0
+        self.chunks = []
+
+        self._times = np.empty(chunk_rows, dtype=np.int64)
+        self._columns = [np.empty(chunk_rows, dtype=t) for t in self.dtypes]
+        self._valid = np.ones((chunk_rows, len(self.names)), dtype=bool)
+        self._count = 0  # 缓存中的行数
+        self._file = open(path, 'wb')
+        self._file.write(ARCHIVE_MAGIC)
+
+    def extend(self, block, times, valid=None):
+        """
+        追加多行: block 为行数 x 通道数的数组或结构化数组, times 为逐行时间戳 (s),
+        valid 为行数 x 通道数的有效标记 (可选)
+        """
+        times = np.asarray(times)
+        done = 0
+        while done < len(times):
+            count = min(len(times) - done, self.chunk_rows - self._count)
+            rows = slice(self._count, self._count + count)
+            part = block[done:done + count]
+            self._times[rows] = np.round(times[done:done + count] * 1e9)
+            for i, column in enumerate(self._columns):
+                column[rows] = part[f'f{i}'] if part.dtype.names else part[:, i]
+            self._valid[rows] = True if valid is None else valid[done:done + count]
+            self._count += count
+            done += count
+            if self._count == self.chunk_rows:
+                self._write_chunk()
+
+    def _write_chunk(self):
+        n = self._count
+        if not n:
+            return
+        f = self._file
+        times = self._times[:n]
+        chunk = {'rows': n, 't0': times[0].item() / 1e9, 't1': times[-1].item() / 1e9, 'columns': []}
+
+        data = _encode(times, True)
+        chunk['time'] = [f.tell(), len(data)]
+        f.write(data)
+        for i, column in enumerate(self._columns):
+            values = column[:n]
+            valid = self._valid[:n, i]
+            valid = None if valid.all() else valid
+            data = _encode(values, values.dtype.kind in 'iu')
+            chunk['columns'].append([f.tell(), len(data), *_bounds(values, valid)])
+            f.write(data)
+            if valid is not None:
+                data = zlib.compress(np.packbits(valid).tobytes(), ARCHIVE_LEVEL)
+                chunk.setdefault('valid', {})[str(i)] = [f.tell(), len(data)]
+                f.write(data)
+        self.chunks.append(chunk)
+        self.rows += n
+        self._count = 0
+
+    @property
+    def nbytes(self):
+        """已写出的压缩数据字节数"""
+        return self._file.tell() if self._file is not None else os.path.getsize(self.path)
+
+    def close(self):
+        """写出最后不满一块的数据和索引"""
+        if self._file is None:
+            return
+        self._write_chunk()
+        index = dict(self.info)
+        index.update(version=ARCHIVE_VERSION, names=self.names, chunk_rows=self.chunk_rows, rows=self.rows,
+                     fields=[[f'f{i}', t.str] for i, t in enumerate(self.dtypes)], chunks=self.chunks)
+        text = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        offset = self._file.tell()
+        self._file.write(text)
+        self._file.write(ARCHIVE_FOOTER.pack(offset, len(text), ARCHIVE_MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class ArchiveReader:
+    """
+    读取归档文件: 打开时只读取索引, load 按所选通道和时间范围只读取并解压相关的块
+    bytes_read 累计从文件读取的压缩数据字节数
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.bytes_read = 0
+        with open(path, 'rb') as f:
+            if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"不是归档文件: {path}")
+            f.seek(-ARCHIVE_FOOTER.size, os.SEEK_END)
+            offset, length, magic = ARCHIVE_FOOTER.unpack(f.read(ARCHIVE_FOOTER.size))
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"归档文件不完整 (缺少索引): {path}")
+            f.seek(offset)
+            self.info = json.loads(f.read(length).decode('utf-8'))
+        self.names = self.info['names']
+        self.dtypes = [np.dtype(code) for name, code in self.info['fields']]
+        self.chunks = self.info['chunks']
+        self.rows = self.info['rows']
+        self._t0 = np.array([chunk['t0'] for chunk in self.chunks])
+        self._t1 = np.array([chunk['t1'] for chunk in self.chunks])
+
+    @property
+    def time_range(self):
+        """整个会话的 (起始时间, 结束时间), 无数据时为 None"""
+        return (self._t0[0], self._t1[-1]) if self.chunks else None
+
+    def channel_index(self, channel):
+        """通道名称或序号 -> 序号"""
+        return channel if isinstance(channel, int) else self.names.index(channel)
+
+    def select(self, t0=None, t1=None):
+        """与时间范围 [t0, t1] 有重叠的块的序号"""
+        keep = np.ones(len(self.chunks), dtype=bool)
+        if t0 is not None:
+            keep &= self._t1 >= t0
+        if t1 is not None:
+            keep &= self._t0 <= t1
+        return np.flatnonzero(keep)
+
+    def chunk_bounds(self, channel):
+        """不解压数据, 取某通道每块的 (t0, t1, min, max) 数组, 可用于整个会话的概览"""
+        i = self.channel_index(channel)
+        bounds = np.array([[np.nan if v is None else v for v in chunk['columns'][i][2:]] for chunk in self.chunks],
+                          dtype=np.float64).reshape(-1, 2)
+        return self._t0, self._t1, bounds[:, 0], bounds[:, 1]
+
+    def _read(self, f, location):
+        offset, length = location[:2]
+        f.seek(offset)
+        self.bytes_read += length
+        return f.read(length)
+
+    def load(self, channels=None, t0=None, t1=None):
+        """
+        读取所选通道 (名称或序号, 默认全部) 在 [t0, t1] 内的数据
+        返回 (时间戳数组, 各通道数组列表 (保持原类型), 各通道有效标记列表 (全部有效时为 None))
+        """
+        indices = [self.channel_index(c) for c in (range(len(self.names)) if channels is None else channels)]
+        times, columns, valids = [], [[] for _ in indices], [[] for _ in indices]
+        with open(self.path, 'rb') as f:
+            for k in self.select(t0, t1):
+                chunk = self.chunks[k]
+                rows = chunk['rows']
+                ns = _decode(self._read(f, chunk['time']), np.dtype('<i8'), rows, True)
+                part = slice(None)
+                if t0 is not None or t1 is not None:
+                    start = 0 if t0 is None else np.searchsorted(ns, t0 * 1e9, 'left')
+                    end = rows if t1 is None else np.searchsorted(ns, t1 * 1e9, 'right')
+                    part = slice(start, end)
+                times.append(ns[part] / 1e9)
+                missing = chunk.get('valid', {})
+                for j, i in enumerate(indices):
+                    dtype = self.dtypes[i]
+                    values = _decode(self._read(f, chunk['columns'][i]), dtype, rows, dtype.kind in 'iu')
+                    columns[j].append(values[part])
+                    if str(i) in missing:
+                        bits = np.frombuffer(zlib.decompress(self._read(f, missing[str(i)])), dtype=np.uint8)
+                        valids[j].append(np.unpackbits(bits, count=rows).astype(bool)[part])
+                    else:
+                        valids[j].append(np.ones(len(values[part]), dtype=bool))
+        times = np.concatenate(times) if times else np.zeros(0)
+        columns = [np.concatenate(c) if c else np.zeros(0, dtype=self.dtypes[i]) for c, i in zip(columns, indices)]
+        valids = [np.concatenate(v) if v else np.zeros(0, dtype=bool) for v in valids]
+        return times, columns, [None if v.all() else v for v in valids]
+
+
+def convert_recording(source, target, chunk_rows=ARCHIVE_CHUNK_ROWS):
+    """把会话录制文件 (.zrec) 转换为归档文件, 按块读取, 内存占用与录制文件大小无关"""
+    from recorder import RecordingIndex
+    index = RecordingIndex(source)
+    info, records = dict(index.info), index.records
+    if index.events:
+        info['events'] = index.events  # send_data 等事件 (见 recorder.RecordingIndex)
+    names = info.pop('names')
+    fields = info.pop('fields')
+    info.pop('version', None)
+    writer = ArchiveWriter(target, names, np.dtype([(name, code) for name, code in fields[1:]]), info, chunk_rows)
+    for start in range(0, len(records), chunk_rows):
+        block = records[start:start + chunk_rows]
+        writer.extend(block, block['time'])
+    writer.close()
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把会话录制文件 (.zrec) 转换为归档文件 (.zarc)")
+    parser.add_argument("source", help="录制文件")
+    parser.add_argument("target", nargs="?", help="归档文件 (默认与录制文件同名)")
+    args = parser.parse_args()
+    target = args.target or os.path.splitext(args.source)[0] + ARCHIVE_SUFFIX
+    writer = convert_recording(args.source, target)
+    size, archived = os.path.getsize(args.source), os.path.getsize(target)
+    print(f"{target}: {writer.rows} 行, {len(writer.chunks)} 块, "
+          f"{size / 1e6:.1f} MB -> {archived / 1e6:.1f} MB ({size / archived:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+校验性能测试: 逐帧验证耗时 (旧的逐字节循环 / 折叠异或 / CRC-16) 以及批量验证耗时
+运行: python benchmarks/bench_checksum.py [帧数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checksum import XOR_CHECK, CRC16_CHECK, CRC16_TABLE, CRC16_INIT
+
+
+def make_frames(check, count, seed=0):
+    """生成 count 个背靠背的状态帧 (帧体随机)"""
+    rnd = np.random.default_rng(seed)
+    size = 31 + check.size
+    stream = bytearray()
+    for body in rnd.integers(0, 256, size=(count, size - 1 - check.size), dtype=np.uint8):
+        body[0:4] = (0xAA, 0x55, size, 1)
+        stream += check.seal(body.tobytes())
+    return stream, size
+
+
+def legacy_verify(frame):
+    """旧实现: 逐字节循环异或"""
+    checksum = 0
+    for i in range(30):
+        checksum ^= frame[i]
+    return checksum == frame[30]
+
+
+def table_crc16_verify(frame):
+    """纯 Python 查表 CRC-16 (与下位机实现一致), 作为对照"""
+    crc = CRC16_INIT
+    for i in range(30):
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[(crc >> 8) ^ frame[i]]
+    return crc == frame[30] | (frame[31] << 8)
+
+
+def per_frame(verify, stream, size, count):
+    for i in range(count):
+        assert verify(stream[i * size:(i + 1) * size])
+
+
+def batch(check, stream, size, count):
+    frames = np.frombuffer(stream, dtype=np.uint8).reshape(count, size)
+    assert check.verify_batch(frames).all()
+
+
+def run(name, func, *args, repeat=3):
+    count = args[-1]
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<28} {best * 1e6 / count:>8.3f} us/帧")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    xor_stream, xor_size = make_frames(XOR_CHECK, count)
+    crc_stream, crc_size = make_frames(CRC16_CHECK, count)
+    print(f"帧数: {count}")
+    run("旧实现 (逐字节异或)", per_frame, legacy_verify, xor_stream, xor_size, count)
+    run("XOR_CHECK.verify", per_frame, XOR_CHECK.verify, xor_stream, xor_size, count)
+    run("XOR_CHECK.verify_batch", batch, XOR_CHECK, xor_stream, xor_size, count)
+    run("纯 Python 查表 CRC-16", per_frame, table_crc16_verify, crc_stream, crc_size, count)
+    run("CRC16_CHECK.verify", per_frame, CRC16_CHECK.verify, crc_stream, crc_size, count)
+    run("CRC16_CHECK.verify_batch", batch, CRC16_CHECK, crc_stream, crc_size, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+状态帧解码性能测试: 逐字段切片 + struct.unpack (旧实现) 与预编译/NumPy批量解码器的帧率对比
+运行: python benchmarks/bench_decode.py [帧数]
+"""
+import os
+import sys
+import struct
+import time
+import random
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checksum import XOR_CHECK
+from frame_codec import (STATUS_FRAME_LEN, STATUS_DTYPE, STATUS_SAMPLE_DTYPE, FRAME_BATCH_FLAG,
+                         StatusFrameDecoder, BulkFrameDecoder, BatchFrameDecoder, DeltaFrameDecoder,
+                         batch_frame_len, encode_delta_frame)
+
+BATCH_SAMPLES = 8  # 每个批量帧的样本数, 与下位机 TELEMETRY_BATCH 一致
+KEYFRAME_INTERVAL = 16  # 与下位机 KEYFRAME_INTERVAL 一致
+
+
+def make_frames(count, seed=0):
+    """生成 count 个背靠背的合法状态帧"""
+    rnd = random.Random(seed)
+    stream = bytearray()
+    for _ in range(count):
+        frame = bytearray(STATUS_FRAME_LEN)
+        frame[0:4] = b'\xAA\x55\x20\x01'
+        for i in range(13):
+            frame[4 + i * 2:6 + i * 2] = struct.pack('<h', rnd.randint(-32768, 32767))
+        checksum = 0
+        for i in range(30):
+            checksum ^= frame[i]
+        frame[30] = checksum
+        frame[31] = 0x5D
+        stream += frame
+    return stream
+
+
+def make_batch_frames(stream, count):
+    """把 count 个状态帧的数据部分重新打包为批量帧"""
+    sample_size = STATUS_SAMPLE_DTYPE.itemsize
+    size = batch_frame_len(sample_size, BATCH_SAMPLES)
+    batched = bytearray()
+    for first in range(0, count, BATCH_SAMPLES):
+        n = min(BATCH_SAMPLES, count - first)
+        body = bytearray((0xAA, 0x55, batch_frame_len(sample_size, n), FRAME_BATCH_FLAG | 1, n))
+        for i in range(first, first + n):
+            body += stream[i * STATUS_FRAME_LEN + 4:i * STATUS_FRAME_LEN + 4 + sample_size]
+        batched += XOR_CHECK.seal(body)
+    return batched, size
+
+
+def make_delta_frames(count, seed=0):
+    """生成缓慢变化的13通道信号 (正弦 + 噪声), 编码为差分压缩帧列表"""
+    rnd = np.random.default_rng(seed)
+    t = np.arange(count)[:, None]
+    rows = 2000 * np.sin(t * 0.01 + np.arange(13)) + rnd.normal(0, 3, (count, 13))
+    rows = np.clip(rows, -32768, 32767).astype(np.int64)
+    frames = []
+    base = None
+    for i, first in enumerate(range(0, count, BATCH_SAMPLES)):
+        block = rows[first:first + BATCH_SAMPLES]
+        frames.append(bytes(encode_delta_frame(block, i, None if i % KEYFRAME_INTERVAL == 0 else base)))
+        base = block[-1]
+    return frames, rows
+
+
+def legacy_parse(frame):
+    """旧版 pid_ui.Trans._parse_status_frame 的解码部分"""
+    checksum = 0
+    for i in range(30):
+        checksum ^= frame[i]
+    if checksum != frame[30]:
+        return None
+    running = bool(frame[3])
+    values = (
+        struct.unpack('<h', frame[4:6])[0],
+        struct.unpack('<h', frame[6:8])[0],
+        struct.unpack('<h', frame[8:10])[0],
+        struct.unpack('<h', frame[10:12])[0],
+        struct.unpack('<h', frame[12:14])[0],
+        struct.unpack('<h', frame[14:16])[0],
+        struct.unpack('<h', frame[16:18])[0],
+        struct.unpack('<h', frame[18:20])[0],
+        struct.unpack('<h', frame[20:22])[0],
+        struct.unpack('<h', frame[22:24])[0],
+        struct.unpack('<h', frame[24:26])[0],
+        struct.unpack('<h', frame[26:28])[0],
+        struct.unpack('<h', frame[28:30])[0],
+    )
+    return running, values
+
+
+def bench_legacy(stream, count):
+    rows = []
+    for i in range(count):
+        frame = stream[i * STATUS_FRAME_LEN:(i + 1) * STATUS_FRAME_LEN]
+        rows.append(legacy_parse(frame))
+    assert len(rows) == count
+
+
+def bench_decode(stream, count):
+    decoder = StatusFrameDecoder()
+    rows = []
+    for i in range(count):
+        rows.append(decoder.decode(stream, i * STATUS_FRAME_LEN))
+    assert len(rows) == count
+
+
+def bench_batch(stream, count):
+    decoder = StatusFrameDecoder()
+    rows, consumed, bad = decoder.decode_batch(stream, 0, count)
+    assert len(rows) == count and not bad
+
+
+def bench_bulk(stream, count):
+    decoder = BulkFrameDecoder(STATUS_DTYPE)
+    records, consumed, bad = decoder.decode(stream)
+    columns = records['channels'].T.tolist()
+    assert len(records) == count and not bad and len(columns[0]) == count
+
+
+def bench_batch_frames(batched, count):
+    decoder = BatchFrameDecoder(STATUS_SAMPLE_DTYPE)
+    size = decoder.frame_len(BATCH_SAMPLES)
+    columns = [[] for _ in range(13)]
+    for pos in range(0, len(batched), size):
+        running, samples = decoder.decode(batched[pos:pos + size])
+        for column, values in zip(columns, samples['channels'].T.tolist()):
+            column.extend(values)
+    assert len(columns[0]) == count
+
+
+def bench_delta_frames(frames, count):
+    decoder = DeltaFrameDecoder()
+    columns = [[] for _ in range(13)]
+    for frame in frames:
+        running, rows = decoder.decode(frame)
+        for column, values in zip(columns, rows.T.tolist()):
+            column.extend(values)
+    assert len(columns[0]) == count
+
+
+def run(name, func, stream, count, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(stream, count)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = count / best
+    print(f"{name:<24} {rate:>12,.0f} 帧/s  ({best * 1e6 / count:.2f} us/帧)")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    stream = make_frames(count)
+    print(f"帧数: {count}, 帧长: {STATUS_FRAME_LEN} 字节")
+    base = run("旧实现 (切片+unpack)", bench_legacy, stream, count)
+    single = run("decode (unpack_from)", bench_decode, stream, count)
+    batch = run("decode_batch", bench_batch, stream, count)
+    bulk = run("BulkFrameDecoder (NumPy)", bench_bulk, stream, count)
+    print(f"加速比: decode {single / base:.2f}x, decode_batch {batch / base:.2f}x, "
+          f"BulkFrameDecoder {bulk / base:.2f}x")
+
+    # 多样本批量帧: 每个样本的协议开销和 115200 波特率下的样本率上限
+    batched, size = make_batch_frames(stream, count - count % BATCH_SAMPLES)
+    samples = count - count % BATCH_SAMPLES
+    print(f"\n批量帧: 每帧 {BATCH_SAMPLES} 个样本, 帧长: {size} 字节")
+    run("BatchFrameDecoder (样本)", bench_batch_frames, batched, samples)
+    sample_size = STATUS_SAMPLE_DTYPE.itemsize
+    single_overhead = STATUS_FRAME_LEN - sample_size
+    batch_overhead = (size - sample_size * BATCH_SAMPLES) / BATCH_SAMPLES
+    line_rate = 115200 / 10  # 8N1, 每字节10位
+    print(f"每样本协议开销: 单帧 {single_overhead} 字节, 批量帧 {batch_overhead:.3f} 字节 "
+          f"({single_overhead / batch_overhead:.1f}x)")
+    print(f"115200 波特率下样本率上限: 单帧 {line_rate / STATUS_FRAME_LEN:.0f} 样本/s, "
+          f"批量帧 {line_rate * BATCH_SAMPLES / size:.0f} 样本/s")
+
+    # 差分压缩帧: 缓慢变化的信号
+    frames, rows = make_delta_frames(samples)
+    decoder = DeltaFrameDecoder()
+    decoded = np.concatenate([decoder.decode(frame)[1] for frame in frames])
+    assert (decoded == rows).all()
+    wire = sum(len(frame) for frame in frames)
+    print(f"\n差分压缩帧: 每帧 {BATCH_SAMPLES} 个样本, 每 {KEYFRAME_INTERVAL} 帧一个关键帧, "
+          f"平均帧长 {wire / len(frames):.1f} 字节")
+    run("DeltaFrameDecoder (样本)", bench_delta_frames, frames, samples)
+    print(f"压缩比: 相对单样本帧 {decoder.compression_ratio():.2f}x, 相对批量帧 "
+          f"{size * len(frames) / wire:.2f}x; 115200 波特率下样本率上限 {line_rate * samples / wire:.0f} 样本/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+离线解码的吞吐量测试: 同一抓取文件分别经 pid_ui.Trans 顺序回放和 offline_decode 多进程解码, 比较速度并核对结果一致
+运行: python benchmarks/bench_offline.py [帧数]
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_decode import make_frames, make_batch_frames, make_delta_frames
+from bench_replay import write_capture, replay
+from offline_decode import decode_capture
+from recorder import read_recording
+
+READ_SIZE = 1024
+
+
+def run(name, directory, stream, samples):
+    path = os.path.join(directory, "bench.zcap")
+    target = os.path.join(directory, "bench_decoded.zrec")
+    write_capture(path, stream, READ_SIZE)
+    elapsed, trans = replay(path, samples)
+    times, data, generation = trans.snapshot()
+    print(f"{name:<10} Trans 顺序回放: {len(stream) / elapsed / 1e6:7.2f} MB/s")
+    single = None
+    jobs = 1
+    while jobs <= (os.cpu_count() or 1):
+        stats = decode_capture(path, target, jobs)
+        info, records = read_recording(target)
+        # 与回放得到的最近样本逐一核对 (数值和时间戳)
+        same = (np.array_equal(records['time'][-len(times):], times)
+                and all(np.array_equal(records[f'f{i}'][-len(times):], data[i]) for i in range(len(data))))
+        single = single or stats['elapsed']
+        print(f"{name:<10} 离线解码 {jobs:>2} 进程: {stats['bytes'] / stats['elapsed'] / 1e6:7.2f} MB/s, "
+              f"加速 {single / stats['elapsed']:5.2f}x, {stats['chunks']} 段, 重新解码 {stats['redecoded']}, "
+              f"结果{'一致' if same and stats['samples'] == samples else '不一致'}")
+        jobs *= 2
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    stream = make_frames(count)
+    batched, size = make_batch_frames(stream, count)
+    frames, rows = make_delta_frames(count)
+    with tempfile.TemporaryDirectory() as directory:
+        run("单样本帧", directory, stream, count)
+        run("批量帧", directory, batched, count)
+        run("差分帧", directory, b''.join(frames), count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+整条接收流程的吞吐量测试: 把合成的状态帧写成抓取文件, 以最快速度回放给 pid_ui.Trans,
+经过与串口数据相同的分帧、解码、时间戳和历史数据存储
+运行: python benchmarks/bench_replay.py [帧数]
+"""
+import os
+import sys
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import CaptureWriter
+from frame_codec import STATUS_FRAME_LEN
+from bench_decode import make_frames, make_batch_frames, BATCH_SAMPLES
+import pid_ui
+
+BAUDRATE = 921600
+READ_SIZES = (64, 1024, 16384)  # 每次串口读取的字节数: 低延迟逐帧处理 ~ 大量积压批量处理
+
+
+def write_capture(path, stream, read_size, baudrate=BAUDRATE):
+    """把字节流按 read_size 切分为多次读取, 读取时刻按理论线速递增"""
+    capture = CaptureWriter(path, info={'baudrate': baudrate})
+    byte_ns = 10 * 1e9 / baudrate
+    for start in range(0, len(stream), read_size):
+        data = stream[start:start + read_size]
+        capture.write((start + len(data)) * byte_ns, bytes(data))
+    capture.close()
+
+
+def replay(path, samples):
+    trans = pid_ui.Trans("回放")
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        trans.replay(path, speed=0)
+        trans.recv_thread.join()
+    elapsed = time.perf_counter() - start
+    assert trans.history.total == samples, (trans.history.total, samples)
+    return elapsed, trans
+
+
+def run(name, path, stream, samples):
+    for read_size in READ_SIZES:
+        write_capture(path, stream, read_size)
+        elapsed, trans = replay(path, samples)
+        print(f"{name:<10} 每次读取 {read_size:>5} 字节: {samples / elapsed:>10,.0f} 样本/s, "
+              f"{len(stream) / elapsed / 1e6:6.2f} MB/s, 相当于 {len(stream) * 10 / elapsed / 1e6:6.1f} Mbaud")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    count -= count % BATCH_SAMPLES
+    stream = make_frames(count)
+    batched, size = make_batch_frames(stream, count)
+    print(f"样本数: {count}, 单样本帧 {STATUS_FRAME_LEN} 字节, 批量帧 {size} 字节 ({BATCH_SAMPLES} 样本)")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.zcap")
+        run("单样本帧", path, stream, count)
+        run("批量帧", path, batched, count)
+
+
+if __name__ == "__main__":
+    main()
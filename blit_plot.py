@@ -0,0 +1,119 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+# 滚动窗口: 横轴固定显示 PLOT_WINDOW 秒, 最新数据到达右边界时整体前移, 右侧留出 PLOT_SCROLL 比例的空白
+PLOT_WINDOW = 10.0
+PLOT_SCROLL = 0.25
+PLOT_MAX_POINTS = 1000  # 每条曲线最多绘制的点数 (按分组取 min/max, 不丢尖峰)
+PLOT_MARGIN = 0.1       # 纵轴扩展时在数据范围外留出的比例
+
+
+def decimate(times, values, max_points=PLOT_MAX_POINTS):
+    """点数超过 max_points 时每组取最小值和最大值, 返回 (时间, 值)"""
+    n = len(times)
+    if n <= max_points:
+        return times, values
+    k = -(-n // (max_points // 2))
+    m = n // k * k
+    groups = values[:m].reshape(-1, k)
+    t = np.repeat(times[:m:k], 2)
+    v = np.column_stack((groups.min(axis=1), groups.max(axis=1))).ravel()
+    return np.concatenate((t, times[m:])), np.concatenate((v, values[m:]))
+
+
+class BlitPlotter:
+    """
+    基于 matplotlib blitting 的实时曲线
+    坐标轴、网格和图例只在横轴滚动、纵轴超出范围或窗口大小变化时完整重绘一次并缓存为背景,
+    其余每次更新只恢复背景并重绘曲线, 耗时只与窗口内的点数有关, 不随会话时长增长
+    panels: [(标题, 纵轴标签, [(曲线名称, 通道序号, 颜色或 None), ...]), ...], 按 2 列排布
+    """
+
+    def __init__(self, panels, window=PLOT_WINDOW, max_points=PLOT_MAX_POINTS, figsize=(12, 8)):
+        self.window = window
+        self.max_points = max_points
+
+        plt.ion()  # 启用交互式实时绘图
+        rows = -(-len(panels) // 2)
+        self.fig, axes = plt.subplots(rows, 2, figsize=figsize, squeeze=False)
+        self.axes = list(axes.ravel()[:len(panels)])
+        self.blit = self.fig.canvas.supports_blit
+        self.lines = []  # [(子图, 曲线, 通道序号), ...]
+        for ax, (title, ylabel, curves) in zip(self.axes, panels):
+            ax.set_xlabel('Time')
+            ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            ax.grid(True)
+            ax.set_xlim(0, window)
+            for label, index, color in curves:
+                # animated 的曲线不参与完整重绘, 只由 blit 绘制; 不支持 blit 的后端退回每次完整重绘
+                line, = ax.plot([], [], color=color, label=label, animated=self.blit)
+                self.lines.append((ax, line, index))
+            ax.legend()
+        plt.tight_layout()
+
+        self._background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        plt.show(block=False)
+        self.fig.canvas.draw()
+
+    @property
+    def closed(self):
+        return not plt.fignum_exists(self.fig.number)
+
+    def _on_draw(self, event):
+        """完整重绘 (包括窗口大小变化) 后缓存不含曲线的背景"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox) if self.blit else None
+
+    def _rescale(self, latest):
+        """横轴滚动或纵轴超出范围时调整坐标轴, 返回是否需要完整重绘"""
+        x0, x1 = self.axes[0].get_xlim()
+        scroll = latest > x1 or latest < x0
+        if scroll:
+            x1 = latest + self.window * PLOT_SCROLL
+            x0 = x1 - self.window
+            for ax in self.axes:
+                ax.set_xlim(x0, x1)
+        changed = scroll
+        for ax in self.axes:
+            data = [line.get_ydata() for a, line, _ in self.lines if a is ax and len(line.get_ydata())]
+            if not data:
+                continue
+            lo = float(min(values.min() for values in data))
+            hi = float(max(values.max() for values in data))
+            y0, y1 = ax.get_ylim()
+            # 只在超出范围时扩展; 横轴滚动时按窗口内的数据重新确定, 避免一次尖峰后一直保持大范围
+            if scroll or lo < y0 or hi > y1:
+                margin = (hi - lo) * PLOT_MARGIN or 1.0
+                if scroll:
+                    y0, y1 = lo - margin, hi + margin
+                else:
+                    y0, y1 = min(y0, lo - margin), max(y1, hi + margin)
+                ax.set_ylim(y0, y1)
+                changed = True
+        return changed
+
+    def update(self, times, data):
+        """
+        用最近的样本更新曲线: times 为时间戳数组, data 为 通道数 x n 数组 (如 HistoryBuffer.last() 的返回值)
+        只绘制当前横轴范围内的部分
+        """
+        if not len(times):
+            return
+        latest = times[-1]
+        start = int(np.searchsorted(times, latest - self.window))
+        times = times[start:]
+        for ax, line, index in self.lines:
+            line.set_data(*decimate(times, data[index, start:], self.max_points))
+        canvas = self.fig.canvas
+        if not self.blit:
+            self._rescale(latest)
+            canvas.draw_idle()
+        else:
+            if self._rescale(latest) or self._background is None:
+                canvas.draw()  # 触发 _on_draw 缓存新的背景
+            canvas.restore_region(self._background)
+            for ax, line, index in self.lines:
+                ax.draw_artist(line)
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
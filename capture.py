@@ -0,0 +1,217 @@
+import os
+import json
+import mmap
+import time
+import struct
+import threading
+
+import numpy as np
+
+# 原始字节抓取文件:
+# [魔数(8) | 说明长度 uint32 | 说明(JSON, UTF-8)] [读取时刻 int64 | 字节数 uint32 | 原始字节] ...
+# 读取时刻为相对会话开始的 ns (与 ReadClock 的时间轴一致), 每条对应接收线程的一次串口读取
+CAPTURE_MAGIC = b'ZPIDCAP1'
+CAPTURE_SUFFIX = '.zcap'
+CAPTURE_HEADER = struct.Struct('<8sI')
+CAPTURE_CHUNK = struct.Struct('<qI')
+CAPTURE_BUFFER = 1 << 20           # 写文件缓冲区大小
+CAPTURE_FLUSH_INTERVAL = 1.0       # 缓冲区写回磁盘的最长间隔 (s)
+
+# 回放速度: (显示名称, 倍数), 0 表示不等待、尽快回放
+REPLAY_SPEEDS = (("1x", 1.0), ("2x", 2.0), ("5x", 5.0), ("10x", 10.0), ("最快", 0.0))
+
+
+class CaptureWriter:
+    """把接收线程每次读取到的原始字节连同读取时刻追加写入抓取文件, close 可在界面线程调用"""
+
+    def __init__(self, path, info=None):
+        self.path = path
+        self.chunks = 0  # 已写入的读取次数
+        self.nbytes = 0  # 已写入的原始字节数
+        text = json.dumps(dict(info or {}), ensure_ascii=False).encode('utf-8')
+        self._file = open(path, 'wb', buffering=CAPTURE_BUFFER)
+        self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, len(text)) + text)
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    def write(self, read_ns, data):
+        """记录一次读取: read_ns 为读取时刻 (相对会话开始的 ns), data 为读到的字节"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(CAPTURE_CHUNK.pack(int(read_ns), len(data)))
+            self._file.write(data)
+            self.chunks += 1
+            self.nbytes += len(data)
+            if time.monotonic() - self._flushed >= CAPTURE_FLUSH_INTERVAL:
+                self._file.flush()
+                self._flushed = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CaptureReader:
+    """顺序读取抓取文件, 逐条返回 (读取时刻 ns, 原始字节); 文件末尾不完整的一条 (异常退出) 被忽略"""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._file = open(path, 'rb')
+        magic, length = CAPTURE_HEADER.unpack(self._file.read(CAPTURE_HEADER.size))
+        if magic != CAPTURE_MAGIC:
+            self._file.close()
+            raise ValueError(f"不是抓取文件: {path}")
+        self.info = json.loads(self._file.read(length).decode('utf-8'))
+
+    @property
+    def position(self):
+        """已读取到的文件位置 (字节)"""
+        return self._file.tell() if self._file is not None else self.size
+
+    def next_chunk(self):
+        """下一次读取的 (读取时刻 ns, 原始字节), 读完时返回 None"""
+        if self._file is None:
+            return None
+        head = self._file.read(CAPTURE_CHUNK.size)
+        if len(head) == CAPTURE_CHUNK.size:
+            read_ns, size = CAPTURE_CHUNK.unpack(head)
+            data = self._file.read(size)
+            if len(data) == size:
+                return read_ns, data
+        self.close()
+        return None
+
+    def __iter__(self):
+        chunk = self.next_chunk()
+        while chunk is not None:
+            yield chunk
+            chunk = self.next_chunk()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CaptureIndex:
+    """
+    抓取文件中每次读取的位置索引, 可按字节流位置随机读取 (供离线解码切分)
+    read_ns/ends/data_pos/sizes 为逐次读取的读取时刻、读取后的字节流总长度、数据在文件中的位置和字节数
+    """
+
+    def __init__(self, path):
+        self.path = path
+        reader = CaptureReader(path)
+        self.info = reader.info
+        start = reader.position
+        reader.close()
+        read_ns, data_pos, sizes = [], [], []
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos, end = start, len(mm)
+            unpack, head = CAPTURE_CHUNK.unpack_from, CAPTURE_CHUNK.size
+            while pos + head <= end:
+                t, size = unpack(mm, pos)
+                pos += head
+                if pos + size > end:
+                    break  # 异常退出时不完整的最后一条
+                read_ns.append(t)
+                data_pos.append(pos)
+                sizes.append(size)
+                pos += size
+        self.read_ns = np.array(read_ns, dtype=np.int64)
+        self.data_pos = np.array(data_pos, dtype=np.int64)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.ends = np.cumsum(self.sizes)
+
+    @property
+    def total(self):
+        """字节流总长度"""
+        return int(self.ends[-1]) if len(self.ends) else 0
+
+    def segments(self, begin, end):
+        """字节流 [begin, end) 所在的各次读取: (数据位置数组, 字节数数组, 第一段中跳过的字节数)"""
+        first = int(np.searchsorted(self.ends, begin, 'right'))
+        last = int(np.searchsorted(self.ends, end, 'left')) + 1
+        skip = begin - (int(self.ends[first - 1]) if first else 0)
+        return self.data_pos[first:last], self.sizes[first:last], skip
+
+    def read(self, begin, end):
+        """读取字节流 [begin, end) 的原始字节"""
+        return read_segments(self.path, *self.segments(begin, end), end - begin)
+
+
+def read_segments(path, data_pos, sizes, skip, length):
+    """拼接抓取文件中的若干段原始字节, 去掉开头 skip 个字节后返回最多 length 个字节"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = b''.join([mm[p:p + n] for p, n in zip(data_pos.tolist(), sizes.tolist())])
+    return data[skip:skip + length]
+
+
+class ReplaySerial:
+    """
+    回放抓取文件的类串口对象, 可代替 serial.Serial 交给接收线程
+    按抓取时相邻两次读取的间隔 (除以 speed) 依次返回每次读取的原始字节, speed 为 0 时不等待;
+    每次 read 返回一次原始读取的全部字节 (保持原来的分块), read_ns 为该次读取的原始时刻; 读完后 is_open 变为 False
+    """
+
+    def __init__(self, path, speed=1.0, timeout=0.1):
+        self.reader = CaptureReader(path)
+        self.info = self.reader.info
+        self.speed = speed
+        self.timeout = timeout
+        self.is_open = True
+        self.read_ns = 0
+        self.bytes_written = 0  # 回放时发送的数据被丢弃
+        self._next = self.reader.next_chunk()
+        self._start = None  # (回放开始的时刻, 第一次读取的原始时刻)
+        self._lock = threading.Lock()
+
+    def _delay(self):
+        """距下一次读取到期还需等待的时间 (s)"""
+        if not self.speed or self._next is None:
+            return 0.0
+        now = time.perf_counter_ns()
+        if self._start is None:
+            self._start = (now, self._next[0])
+        start_ns, first_ns = self._start
+        return ((self._next[0] - first_ns) / self.speed - (now - start_ns)) / 1e9
+
+    @property
+    def in_waiting(self):
+        if self._next is None or self._delay() > 0:
+            return 0
+        return len(self._next[1])
+
+    def read(self, size=1):
+        """返回下一次读取的全部字节 (忽略 size); 未到期时最多等待 timeout, 仍未到期返回空字节串"""
+        delay = self._delay()
+        if delay > self.timeout:
+            time.sleep(self.timeout)
+            return b''
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            if self._next is None or not self.is_open:
+                self.is_open = False
+                self.reader.close()
+                return b''
+            self.read_ns, data = self._next
+            self._next = self.reader.next_chunk()
+            return data
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+    def progress(self):
+        """回放进度 (0 ~ 1)"""
+        return self.reader.position / self.reader.size if self.reader.size else 1.0
+
+    def close(self):
+        with self._lock:
+            self.is_open = False
+            self.reader.close()
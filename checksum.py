@@ -0,0 +1,110 @@
+import binascii
+
+import numpy as np
+
+# 校验方式编号 (与下位机 bsp_uart.h 中的 CHECK_MODE_* 一致)
+CHECK_MODE_XOR = 0
+CHECK_MODE_CRC16 = 1
+
+# CRC-16/CCITT-FALSE: 多项式 0x1021, 初值 0xFFFF, 不反转, 结果不异或
+CRC16_POLY = 0x1021
+CRC16_INIT = 0xFFFF
+
+XOR_FOLD_BYTES = 256  # xor_checksum 一次折叠的最大字节数
+
+
+def _make_crc16_table():
+    """生成 CRC-16/CCITT-FALSE 查找表"""
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ CRC16_POLY) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+CRC16_TABLE = _make_crc16_table()
+_CRC16_TABLE_NP = np.array(CRC16_TABLE, dtype=np.uint16)
+
+
+def xor_checksum(data, start=0, end=None):
+    """
+    计算 data[start:end] 的异或校验和
+    把数据读成一个大整数后按固定的 2 的幂次右移折叠, 每个字节恰好一次落到最低字节, 无逐字节循环;
+    一次折叠最多 XOR_FOLD_BYTES 字节 (覆盖 1 字节长度字段的最长帧), 更长的数据分段折叠
+    """
+    value = int.from_bytes(data[start:end], 'little')
+    if value >> 256:  # 超过 32 字节
+        if value >> (XOR_FOLD_BYTES * 8):
+            chunk = data[start:end]
+            return xor_checksum(chunk, 0, XOR_FOLD_BYTES) ^ xor_checksum(chunk, XOR_FOLD_BYTES)
+        value ^= value >> 1024
+        value ^= value >> 512
+        value ^= value >> 256
+    value ^= value >> 128
+    value ^= value >> 64
+    value ^= value >> 32
+    value ^= value >> 16
+    value ^= value >> 8
+    return value & 0xFF
+
+
+def xor_checksum_batch(block):
+    """计算二维 uint8 数组 (帧数, 字节数) 每一行的异或校验和"""
+    return np.bitwise_xor.reduce(block, axis=1)
+
+
+def crc16(data, start=0, end=None):
+    """计算 data[start:end] 的 CRC-16/CCITT-FALSE"""
+    return binascii.crc_hqx(data[start:end], CRC16_INIT)
+
+
+def crc16_batch(block):
+    """查表法计算二维 uint8 数组 (帧数, 字节数) 每一行的 CRC-16, 按列向量化"""
+    crc = np.full(block.shape[0], CRC16_INIT, dtype=np.uint16)
+    for column in block.T:
+        crc = (crc << 8) ^ _CRC16_TABLE_NP[(crc >> 8) ^ column]
+    return crc
+
+
+class FrameCheck:
+    """帧校验方式: 校验位位于帧尾之前, 覆盖帧头到校验位之前的全部字节, 小端存放"""
+
+    def __init__(self, name, mode, size, compute, compute_batch):
+        self.name = name
+        self.mode = mode
+        self.size = size
+        self.compute = compute
+        self.compute_batch = compute_batch
+        self.format = 'B' if size == 1 else 'H'   # struct 格式符
+        self.dtype = 'u1' if size == 1 else '<u2'  # NumPy 类型
+
+    def pack(self, value):
+        """校验值 -> 字节"""
+        return value.to_bytes(self.size, 'little')
+
+    def seal(self, body, tail=0x5D):
+        """在帧体后追加校验位和帧尾, 返回完整帧"""
+        frame = bytearray(body)
+        frame += self.pack(self.compute(frame))
+        frame.append(tail)
+        return frame
+
+    def verify(self, frame):
+        """验证完整帧 (含校验位和帧尾) 的校验位"""
+        body = len(frame) - 1 - self.size
+        return self.compute(frame, 0, body) == int.from_bytes(frame[body:body + self.size], 'little')
+
+    def verify_batch(self, frames):
+        """批量验证二维 uint8 数组 (帧数, 帧长) 中每一帧的校验位, 返回布尔数组"""
+        body = frames.shape[1] - 1 - self.size
+        expected = frames[:, body].astype(np.uint16)
+        if self.size == 2:
+            expected |= frames[:, body + 1].astype(np.uint16) << 8
+        return self.compute_batch(frames[:, :body]) == expected
+
+
+XOR_CHECK = FrameCheck('XOR', CHECK_MODE_XOR, 1, xor_checksum, xor_checksum_batch)
+CRC16_CHECK = FrameCheck('CRC-16', CHECK_MODE_CRC16, 2, crc16, crc16_batch)
+FRAME_CHECKS = {check.mode: check for check in (XOR_CHECK, CRC16_CHECK)}
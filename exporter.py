@@ -0,0 +1,221 @@
+import csv
+import time
+import threading
+
+import numpy as np
+
+from recorder import RECORD_SUFFIX, SessionRecorder, read_recording
+from archive import ARCHIVE_SUFFIX, ArchiveWriter
+from ratelog import log
+
+EXPORT_CSV = 'csv'
+EXPORT_BINARY = 'zrec'   # 与会话录制文件格式相同, 可用 recorder.read_recording 读取
+EXPORT_ARCHIVE = 'zarc'  # 分块压缩的归档文件, 可用 archive.ArchiveReader 按通道/时间范围读取
+# 保存对话框的文件类型 (显示名称, 后缀, 格式)
+EXPORT_FILTERS = (("CSV文件", ".csv", EXPORT_CSV), ("二进制文件", RECORD_SUFFIX, EXPORT_BINARY),
+                  ("压缩归档", ARCHIVE_SUFFIX, EXPORT_ARCHIVE))
+EXPORT_CHUNK_ROWS = 65536  # 每次格式化/写入的行数
+EXPORT_FOLLOW_INTERVAL = 0.5  # 持续导出时检查新数据的间隔 (s)
+
+
+def export_filter():
+    """保存对话框使用的文件类型过滤器字符串"""
+    return ";;".join(f"{name} (*{suffix})" for name, suffix, fmt in EXPORT_FILTERS)
+
+
+def export_format(path, selected=""):
+    """按文件后缀 (没有后缀时按对话框中选择的类型) 确定导出格式, 返回 (格式, 补全后缀的路径)"""
+    for name, suffix, fmt in EXPORT_FILTERS:
+        if path.lower().endswith(suffix):
+            return fmt, path
+    for name, suffix, fmt in EXPORT_FILTERS:
+        if selected.startswith(name):
+            return fmt, path + suffix
+    return EXPORT_CSV, path + ".csv"
+
+
+class HistorySource:
+    """
+    从内存中的历史数据 (TieredHistory) 按代数增量读取原始样本, 持续导出时只读取新追加的样本
+    接收线程写得比导出快、样本在读取前已被覆盖时, 跳过的样本数记入 lost
+    """
+
+    def __init__(self, history, names=None):
+        self.history = history
+        self.names = list(names) if names is not None else history.names
+        raw = history.raw
+        self.structured = bool(raw.dtype.names)
+        self.dtype = raw.value_dtype if self.structured else raw.dtype
+        self.generation = history.total - len(history)  # 从仍保留的最早样本开始
+        self.lost = 0
+
+    def remaining(self):
+        return self.history.total - self.generation
+
+    def read(self, count):
+        """读取最多 count 个样本: (时间戳, 数据块, 逐字段有效标记或 None), 没有新样本时返回 None"""
+        times, data, total = self.history.since(self.generation)
+        self.lost += total - self.generation - len(times)
+        self.generation = total - len(times)
+        if not len(times):
+            return None
+        times = times[:count]
+        self.generation += len(times)
+        if self.structured:
+            block = data[:len(times)]
+            return times, block, block['valid']
+        return times, data[:, :len(times)].T, None
+
+
+class RecordingSource:
+    """从会话录制文件读取样本; 正在录制时持续导出会跟随文件增长 (文件头中的行数至少每秒更新一次)"""
+
+    def __init__(self, path, recorder=None):
+        self.path = path
+        if recorder is not None:
+            recorder.flush()
+        info, records = read_recording(path)
+        self.names = info['names']
+        self.dtype = np.dtype([(name, records.dtype[name]) for name in records.dtype.names[1:]])
+        self.rows = len(records)
+        self.row = 0
+        self.lost = 0
+
+    def remaining(self):
+        return self.rows - self.row
+
+    def read(self, count):
+        info, records = read_recording(self.path)
+        self.rows = len(records)
+        if self.row >= self.rows:
+            return None
+        block = records[self.row:self.row + count]
+        self.row += len(block)
+        return block['time'], block, None
+
+
+class CsvSink:
+    """
+    CSV 输出: 每块样本整体转为对象矩阵后按行模板一次格式化, 不逐行调用 csv.writer
+    时间保留到 ns, 整数和 double 字段原样输出, float 字段保留 7 位有效数字; 缺失的值留空
+    """
+
+    def __init__(self, path, names, dtype):
+        self.file = open(path, "w", newline="")
+        csv.writer(self.file).writerow(["时间(s)"] + list(names))
+        self.columns = len(names)
+        types = [dtype[i] for i in range(self.columns)] if dtype.names else [dtype] * self.columns
+        self.row_format = ",".join(["%.9f"] + ["%.7g" if t == np.float32 else "%s" for t in types]) + "\r\n"
+
+    def write(self, times, block, valid):
+        # 对象矩阵中的元素为 Python int/float, 整块只做一次 % 格式化
+        matrix = np.empty((len(times), self.columns + 1), dtype=object)
+        matrix[:, 0] = times
+        if block.dtype.names:
+            for i in range(self.columns):
+                matrix[:, i + 1] = block[f'f{i}']
+        else:
+            matrix[:, 1:] = block
+        missing = valid is not None and not valid.all()
+        if missing:
+            matrix[:, 1:][~valid] = np.nan
+        text = (self.row_format * len(times)) % tuple(matrix.ravel().tolist())
+        if missing:
+            text = text.replace("nan", "")
+        self.file.write(text)
+
+    def close(self):
+        self.file.close()
+
+
+class BinarySink:
+    """二进制输出: 与会话录制文件格式相同, 各字段保持原类型 (缺失的值不单独标记)"""
+
+    def __init__(self, path, names, dtype, info=None):
+        self.recorder = SessionRecorder(path, names, dtype, info=info)
+
+    def write(self, times, block, valid):
+        self.recorder.extend(block, times)
+
+    def close(self):
+        self.recorder.close()
+
+
+class ArchiveSink:
+    """压缩归档输出: 按列分块压缩, 保留字段类型和缺失标记"""
+
+    def __init__(self, path, names, dtype, info=None):
+        self.writer = ArchiveWriter(path, names, dtype, info=info)
+
+    def write(self, times, block, valid):
+        self.writer.extend(block, times, valid)
+
+    def close(self):
+        self.writer.close()
+
+
+class Exporter:
+    """
+    后台导出线程: 从 HistorySource/RecordingSource 分块读取, 写入 CSV、二进制或归档文件, 不阻塞界面线程
+    界面线程定时读取 rows/total/done 显示进度; follow 为 True 时导出已有数据后继续追加新数据, 直到 stop()
+    """
+
+    def __init__(self, source, path, fmt=EXPORT_CSV, follow=False, info=None):
+        self.source = source
+        self.path = path
+        self.format = fmt
+        self.follow = follow
+        self.info = info
+        self.rows = 0                   # 已写入的行数
+        self.total = source.remaining()  # 开始时已有的行数 (持续导出时随新数据增加)
+        self.done = False
+        self.error = None
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self, wait=False):
+        """结束持续导出 (写完已有数据后退出)"""
+        self._stop.set()
+        if wait:
+            self._thread.join()
+
+    @property
+    def lost(self):
+        """读取前已被覆盖而未能导出的样本数"""
+        return self.source.lost
+
+    def _run(self):
+        sink = None
+        try:
+            if self.format == EXPORT_BINARY:
+                sink = BinarySink(self.path, self.source.names, self.source.dtype, self.info)
+            elif self.format == EXPORT_ARCHIVE:
+                sink = ArchiveSink(self.path, self.source.names, self.source.dtype, self.info)
+            else:
+                sink = CsvSink(self.path, self.source.names, self.source.dtype)
+            while True:
+                chunk = self.source.read(EXPORT_CHUNK_ROWS)
+                if chunk is not None:
+                    sink.write(*chunk)
+                    self.rows += len(chunk[0])
+                    self.total = max(self.total, self.rows + self.source.remaining())
+                elif not self.follow or self._stop.is_set():
+                    break
+                else:
+                    self._stop.wait(EXPORT_FOLLOW_INTERVAL)
+        except Exception as e:
+            self.error = e
+            log.error("导出错误: %s", e)
+        finally:
+            if sink is not None:
+                sink.close()
+            self.elapsed = time.perf_counter() - self.started
+            self.done = True
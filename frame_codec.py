@@ -0,0 +1,417 @@
+import struct
+
+import numpy as np
+
+from checksum import XOR_CHECK
+
+# 帧格式常量
+FRAME_HEADER = b'\xAA\x55'
+FRAME_TAIL = 0x5D
+
+# 命令帧: [0xAA, 0x55, 0xFE, 校验方式, 异或校验, 0x5D], 用于与下位机协商校验方式
+FRAME_CMD_CHECK_MODE = 0xFE
+
+# 状态帧 (异或校验时32字节, 小端序):
+# [0xAA, 0x55, 长度(0x20), running, motor_v_1..4, vx, vy, vz, x, y, z, roll, pitch, yaw (均为int16), checksum, 0x5D]
+# CRC-16 校验时 checksum 为2字节, 帧长33字节
+STATUS_CHANNELS = 13
+STATUS_CHECKSUM_IDX = 30
+
+
+def status_layout(check=XOR_CHECK):
+    """状态帧的 struct 格式"""
+    return struct.Struct(f'<BBBB{STATUS_CHANNELS}h{check.format}B')
+
+
+def status_dtype(check=XOR_CHECK):
+    """状态帧的 NumPy 结构化类型, 用于批量解码"""
+    return np.dtype([
+        ('header', 'u1', (2,)),
+        ('length', 'u1'),
+        ('running', 'u1'),
+        ('channels', '<i2', (STATUS_CHANNELS,)),
+        ('checksum', check.dtype),
+        ('tail', 'u1'),
+    ])
+
+
+STATUS_FRAME = status_layout()
+STATUS_FRAME_LEN = STATUS_FRAME.size
+STATUS_DTYPE = status_dtype()
+
+# 批量帧: [0xAA, 0x55, 帧长, 0x80 | running, 样本数N, N 个样本 (每个样本的布局同单帧的数据部分), checksum, 0x5D]
+# N 个样本共用帧头、帧长、running、校验位和帧尾, 每个样本的协议开销从 6~7 字节降到 1 字节以下
+FRAME_BATCH_FLAG = 0x80
+BATCH_HEADER_LEN = 5
+BATCH_MAX_LEN = 255
+STATUS_SAMPLE_DTYPE = np.dtype([('channels', '<i2', (STATUS_CHANNELS,))])
+
+
+def batch_frame_len(sample_size, count, check=XOR_CHECK):
+    """携带 count 个样本的批量帧长度"""
+    return BATCH_HEADER_LEN + sample_size * count + check.size + 1
+
+
+def batch_capacity(sample_size, check=XOR_CHECK):
+    """单个批量帧最多携带的样本数"""
+    return (BATCH_MAX_LEN - BATCH_HEADER_LEN - check.size - 1) // sample_size
+
+
+# 差分压缩帧: [0xAA, 0x55, 帧长, 0x40 | 关键帧0x20 | running, 序号, 样本数N, N x 13 个 zigzag varint, checksum, 0x5D]
+# 每个值为相对前一样本的差值; 关键帧的第一个样本相对全0 (即绝对值), 丢帧后从下一个关键帧恢复
+FRAME_CMD_TELEMETRY_MODE = 0xFD  # 命令帧: [0xAA, 0x55, 0xFD, 传输方式, 异或校验, 0x5D]
+TELEMETRY_RAW = 0
+TELEMETRY_DELTA = 1
+FRAME_DELTA_FLAG = 0x40
+FRAME_KEY_FLAG = 0x20
+DELTA_HEADER_LEN = 6
+DELTA_MIN_LEN = DELTA_HEADER_LEN + STATUS_CHANNELS + 2  # 1个样本且全部差值为单字节
+
+
+# 自定义传入字段类型 -> NumPy 类型 (小端序)
+RX_TYPE_DTYPES = {
+    'int16': '<i2',
+    'uint16': '<u2',
+    'int32': '<i4',
+    'uint32': '<u4',
+    'float': '<f4',
+    'uint8': 'u1',
+}
+
+# 自定义传入字段类型 -> struct 格式符
+RX_TYPE_FORMATS = {
+    'int16': 'h',
+    'uint16': 'H',
+    'int32': 'i',
+    'uint32': 'I',
+    'float': 'f',
+    'uint8': 'B',
+}
+
+
+def check_mode_frame(check):
+    """生成切换校验方式的命令帧 (命令帧本身始终使用异或校验)"""
+    return XOR_CHECK.seal(FRAME_HEADER + bytes([FRAME_CMD_CHECK_MODE, check.mode]), FRAME_TAIL)
+
+
+def telemetry_mode_frame(mode):
+    """生成切换状态数据传输方式 (TELEMETRY_RAW / TELEMETRY_DELTA) 的命令帧"""
+    return XOR_CHECK.seal(FRAME_HEADER + bytes([FRAME_CMD_TELEMETRY_MODE, mode]), FRAME_TAIL)
+
+
+class StatusFrameDecoder:
+    """预编译的状态帧解码器, 直接在缓冲区上 unpack_from, 不产生中间切片"""
+
+    def __init__(self, check=XOR_CHECK):
+        self.check = check
+        self.layout = status_layout(check)
+        self.size = self.layout.size
+        self.checksum_idx = STATUS_CHECKSUM_IDX
+
+    def decode(self, buffer, offset=0):
+        """
+        解码 buffer[offset:] 处的一帧
+        返回 (running, motor_v_1, ..., yaw) 元组; 帧头/帧尾/校验和错误时返回 None
+        """
+        fields = self.layout.unpack_from(buffer, offset)
+        if fields[0] != 0xAA or fields[1] != 0x55 or fields[-1] != FRAME_TAIL:
+            return None
+        if self.check.compute(buffer, offset, offset + self.checksum_idx) != fields[-2]:
+            return None
+        return fields[3:-2]
+
+    def decode_batch(self, buffer, offset=0, count=None):
+        """
+        一次解码从 offset 开始背靠背排列的 count 个状态帧 (默认解码缓冲区内所有完整帧)
+        遇到帧头、长度或帧尾不匹配时停止, 校验和错误的帧被丢弃但仍计入消耗
+        返回 (解码结果列表, 消耗的字节数, 校验和错误帧数)
+        """
+        size = self.size
+        available = (len(buffer) - offset) // size
+        if count is None or count > available:
+            count = available
+        if count <= 0:
+            return [], 0, 0
+
+        # 帧头、长度和帧尾逐列比较, 取第一个不匹配的帧之前的部分; 校验位一次批量验证
+        frames = np.frombuffer(buffer, dtype=np.uint8, count=count * size, offset=offset).reshape(count, size)
+        valid = ((frames[:, 0] == 0xAA) & (frames[:, 1] == 0x55) & (frames[:, 2] == size)
+                 & (frames[:, -1] == FRAME_TAIL))
+        if not valid.all():
+            count = int(valid.argmin())
+        good = self.check.verify_batch(frames[:count])
+        rows = [fields[3:-2] for fields, ok in zip(self.layout.iter_unpack(frames[:count]), good) if ok]
+        return rows, count * size, count - len(rows)
+
+
+def is_batch_frame(frame):
+    """帧内 running 字节的最高位标记批量帧"""
+    return len(frame) > BATCH_HEADER_LEN and frame[3] & FRAME_BATCH_FLAG != 0
+
+
+class BatchFrameDecoder:
+    """批量帧解码器, 样本数据以 NumPy 结构化数组 (帧缓冲区上的视图) 返回"""
+
+    def __init__(self, sample_dtype, check=XOR_CHECK):
+        self.sample_dtype = np.dtype(sample_dtype)
+        self.sample_size = self.sample_dtype.itemsize
+        self.check = check
+        self.max_samples = batch_capacity(self.sample_size, check)
+
+    def frame_len(self, count):
+        return batch_frame_len(self.sample_size, count, self.check)
+
+    def decode(self, frame):
+        """
+        解码一个完整的批量帧
+        返回 (running, 样本数组); 帧头/长度/帧尾/校验和错误时返回 None
+        样本数组是 frame 上的视图, frame 被复用前需要取出数据
+        """
+        size = len(frame)
+        if size <= BATCH_HEADER_LEN or frame[0] != 0xAA or frame[1] != 0x55:
+            return None
+        count = frame[4]
+        if (not 0 < count <= self.max_samples or size != self.frame_len(count)
+                or frame[2] != size or frame[-1] != FRAME_TAIL):
+            return None
+        if not self.check.verify(frame):
+            return None
+        samples = np.frombuffer(frame, dtype=self.sample_dtype, count=count, offset=BATCH_HEADER_LEN)
+        return frame[3] & 0x01, samples
+
+
+def is_delta_frame(frame):
+    """帧内 running 字节的次高位标记差分压缩帧"""
+    return len(frame) > DELTA_HEADER_LEN and frame[3] & (FRAME_BATCH_FLAG | FRAME_DELTA_FLAG) == FRAME_DELTA_FLAG
+
+
+def zigzag_varint_encode(values):
+    """有符号整数 -> zigzag 编码后的 varint 字节串 (每字节低7位为数据, 最高位表示后面还有字节)"""
+    out = bytearray()
+    for value in values:
+        value = (value << 1) ^ (value >> 63)
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def zigzag_varint_decode(payload):
+    """
+    向量化解码 zigzag varint 字节串, 返回 int64 数组; 最后一个值不完整或超过5字节时返回 None
+    每个值的结束字节最高位为0, 按结束位置分组后用 reduceat 一次拼出全部值
+    """
+    data = np.frombuffer(payload, dtype=np.uint8)
+    if not len(data) or data[-1] & 0x80:
+        return None
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts + 1
+    if lengths.max() > 5:
+        return None
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, lengths))
+    values = np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+    return (values >> 1) ^ -(values & 1)
+
+
+def encode_delta_frame(rows, seq, base=None, running=1, check=XOR_CHECK):
+    """
+    把若干个样本 (每行 STATUS_CHANNELS 个整数) 编码为一个差分压缩帧
+    base 为前一帧的最后一个样本; 为 None 时生成关键帧
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    prev = np.zeros((1, rows.shape[1]), dtype=np.int64) if base is None else np.asarray(base, dtype=np.int64)[None, :]
+    deltas = np.diff(np.concatenate((prev, rows)), axis=0)
+    payload = zigzag_varint_encode(deltas.ravel().tolist())
+    size = DELTA_HEADER_LEN + len(payload) + check.size + 1
+    if size > BATCH_MAX_LEN:
+        raise ValueError(f"差分压缩帧长度超过 {BATCH_MAX_LEN} 字节")
+    flags = FRAME_DELTA_FLAG | (FRAME_KEY_FLAG if base is None else 0) | (running & 0x01)
+    body = bytearray((0xAA, 0x55, size, flags, seq & 0xFF, len(rows)))
+    return check.seal(body + payload, FRAME_TAIL)
+
+
+class DeltaFrameDecoder:
+    """
+    差分压缩帧解码器, 保存上一个样本作为差分基准
+    序号不连续 (丢帧或校验错误) 时丢弃后续差分帧, 直到收到下一个关键帧
+    """
+
+    def __init__(self, channels=STATUS_CHANNELS):
+        self.channels = channels
+        self._last = None  # 上一个样本的绝对值, None 表示等待关键帧
+        self._seq = None
+        # 统计信息
+        self.wire_bytes = 0    # 收到的差分压缩帧字节数
+        self.raw_bytes = 0     # 同样的样本用单样本状态帧发送时的字节数
+        self.samples = 0
+        self.lost_frames = 0   # 等待关键帧期间丢弃的帧数
+
+    def reset(self):
+        self._last = None
+        self._seq = None
+
+    def state(self):
+        """差分基准 (上一个样本, 序号), 分段解码时在段之间传递"""
+        return self._last, self._seq
+
+    def set_state(self, state):
+        self._last, self._seq = state
+
+    def compression_ratio(self):
+        """相对单样本状态帧的压缩比, 尚未收到数据时返回 None"""
+        return self.raw_bytes / self.wire_bytes if self.wire_bytes else None
+
+    def decode(self, frame, check=XOR_CHECK):
+        """
+        解码一个完整的差分压缩帧
+        返回 (running, 样本数组 (样本数 x 通道数, int64)); 帧格式或校验错误时返回 None
+        等待关键帧期间返回空的样本数组
+        """
+        size = len(frame)
+        if (size <= DELTA_HEADER_LEN + check.size or frame[0] != 0xAA or frame[1] != 0x55
+                or frame[2] != size or frame[-1] != FRAME_TAIL or not check.verify(frame)):
+            return None
+        flags, seq, count = frame[3], frame[4], frame[5]
+        values = zigzag_varint_decode(frame[DELTA_HEADER_LEN:size - 1 - check.size])
+        if values is None or len(values) != count * self.channels:
+            return None
+        deltas = values.reshape(count, self.channels)
+
+        in_sync = self._last is not None and seq == (self._seq + 1) & 0xFF
+        self._seq = seq
+        if flags & FRAME_KEY_FLAG:
+            rows = np.cumsum(deltas, axis=0)
+        elif in_sync:
+            rows = np.cumsum(deltas, axis=0) + self._last
+        else:
+            self._last = None
+            self.lost_frames += 1
+            return flags & 0x01, deltas[:0]
+
+        self._last = rows[-1]
+        self.wire_bytes += size
+        self.raw_bytes += count * (4 + 2 * self.channels + check.size + 1)
+        self.samples += count
+        return flags & 0x01, rows
+
+
+def rx_sample_dtype(fields):
+    """自定义传入字段组成的单个样本的结构化类型 (批量帧中的一个样本), 字段依次命名为 f0, f1, ..."""
+    return np.dtype([(f'f{i}', RX_TYPE_DTYPES[field['type']]) for i, field in enumerate(fields)])
+
+
+def rx_fields_dtype(fields, check=XOR_CHECK):
+    """
+    根据自定义传入字段生成整帧的结构化类型
+    [0xAA, 0x55, 长度, running, 字段0, 字段1, ..., checksum, 0x5D], 字段依次命名为 f0, f1, ...
+    """
+    layout = [('header', 'u1', (2,)), ('length', 'u1'), ('running', 'u1')]
+    for i, field in enumerate(fields):
+        layout.append((f'f{i}', RX_TYPE_DTYPES[field['type']]))
+    layout += [('checksum', check.dtype), ('tail', 'u1')]
+    return np.dtype(layout)
+
+
+class BulkFrameDecoder:
+    """基于 NumPy 结构化类型的定长帧批量解码器, 积压的缓冲区只需一次向量化处理"""
+
+    def __init__(self, dtype, check=XOR_CHECK):
+        self.dtype = dtype
+        self.check = check
+        self.size = dtype.itemsize
+        self._offsets = np.arange(self.size)
+
+    def decode(self, buffer):
+        """
+        一次找出 buffer 中所有合法帧 (帧头、长度、帧尾、校验和均正确且互不重叠),
+        遇到其他帧之前停止
+        返回 (结构化记录数组, 可从缓冲区头部删除的字节数, 校验和错误帧数)
+        """
+        size = self.size
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        n = len(data)
+        if n < size:
+            return np.empty(0, dtype=self.dtype), 0, 0
+
+        # 所有帧头位置, 以及其中完整的候选帧起点
+        heads = np.flatnonzero((data[:-1] == 0xAA) & (data[1:] == 0x55))
+        starts = heads[heads <= n - size]
+        starts = starts[(data[starts + 2] == size) & (data[starts + size - 1] == FRAME_TAIL)]
+
+        frames = data[starts[:, None] + self._offsets]
+        checksum_ok = self.check.verify_batch(frames)
+        bad_starts = starts[~checksum_ok]
+        starts = starts[checksum_ok]
+        frames = frames[checksum_ok]
+
+        # 去掉与前一帧重叠的起点 (数据中偶然出现的帧头)
+        if len(starts) > 1 and np.any(np.diff(starts) < size):
+            keep = np.zeros(len(starts), dtype=bool)
+            next_free = 0
+            for i, start in enumerate(starts.tolist()):
+                if start >= next_free:
+                    keep[i] = True
+                    next_free = start + size
+            starts = starts[keep]
+            frames = frames[keep]
+
+        # 合法帧之间的空隙里有帧头时 (其他长度的帧如批量帧, 或校验错误的帧) 在此停止,
+        # 保证与逐帧解析的顺序一致; 不含帧头的空隙 (噪声) 直接跳过
+        if len(starts):
+            gap_starts = np.concatenate(([0], starts[:-1] + size))
+            heads_in_gap = np.searchsorted(heads, starts) - np.searchsorted(heads, gap_starts)
+            blocked = np.flatnonzero(heads_in_gap)
+            if len(blocked):
+                starts = starts[:blocked[0]]
+                frames = frames[:blocked[0]]
+
+        # 只消耗到最后一个合法帧为止, 之后的数据 (不完整的帧或其他长度的帧) 留给逐帧解析
+        consumed = int(starts[-1]) + size if len(starts) else 0
+        bad = int(np.count_nonzero(bad_starts < consumed))
+
+        records = np.ascontiguousarray(frames).view(self.dtype).reshape(-1)
+        return records, consumed, bad
+
+
+class RxSchema:
+    """
+    由自定义传入字段编译得到的帧解码器
+    整帧使用一个小端 struct 格式, 每帧只需一次 unpack_from
+    """
+
+    def __init__(self, fields, check=XOR_CHECK):
+        self.check = check
+        self.names = [field['name'] for field in fields]
+        self.types = [field['type'] for field in fields]
+        formats = [RX_TYPE_FORMATS[t] for t in self.types]
+        self.layout = struct.Struct('<BBBB' + ''.join(formats) + check.format + 'B')
+        self.size = self.layout.size
+        self.checksum_idx = self.size - 1 - check.size
+
+        # 各字段在帧内的字节偏移
+        self.offsets = []
+        offset = 4
+        for fmt in formats:
+            self.offsets.append(offset)
+            offset += struct.calcsize('<' + fmt)
+
+        self.dtype = rx_fields_dtype(fields, check)
+        self.bulk_decoder = BulkFrameDecoder(self.dtype, check)
+        self.batch_decoder = BatchFrameDecoder(rx_sample_dtype(fields), check) if fields else None
+
+    def decode(self, buffer, offset=0):
+        """
+        解码 buffer[offset:] 处的一帧
+        返回 (running, 字段0, 字段1, ...) 元组; 帧头/长度/帧尾/校验和错误时返回 None
+        """
+        fields = self.layout.unpack_from(buffer, offset)
+        if (fields[0] != 0xAA or fields[1] != 0x55 or fields[2] != self.size
+                or fields[-1] != FRAME_TAIL):
+            return None
+        if self.check.compute(buffer, offset, offset + self.checksum_idx) != fields[-2]:
+            return None
+        return fields[3:-2]
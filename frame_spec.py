@@ -0,0 +1,522 @@
+"""
+帧格式描述 -> Python 编解码模块 + STM32 C 头文件 生成器
+
+帧格式描述使用 SelfDefine_UI 导出的 JSON 配置 (tx_data / rx_data), 字段可额外给出 'id' 作为代码中的标识符
+传出帧 (上位机 -> 下位机): [0xAA, 0x55, 字段数, (类型标识, 值) * N, 校验位, 0x5D]
+传入帧 (下位机 -> 上位机): [0xAA, 0x55, 帧长, running, 值 * N, 校验位, 0x5D]
+批量传入帧: [0xAA, 0x55, 帧长, 0x80 | running, 样本数, 样本 * 样本数, 校验位, 0x5D], 样本布局同传入帧的数据部分
+校验位为异或校验 (1字节) 或 CRC-16 (2字节, 小端), 数据均为小端序
+
+用法: python frame_spec.py specs/pid.json --py pid_frames.py --c stm32_example/BSP/pid_frames.h
+"""
+import argparse
+import json
+import os
+import re
+import struct
+
+from checksum import CRC16_TABLE
+from frame_codec import FRAME_BATCH_FLAG, BATCH_HEADER_LEN, BATCH_MAX_LEN
+
+# 类型名 -> (类型标识, struct 格式符, C 类型, 字节数)
+FIELD_TYPES = {
+    'int16': (0x00, 'h', 'int16_t', 2),
+    'uint16': (0x01, 'H', 'uint16_t', 2),
+    'int32': (0x02, 'i', 'int32_t', 4),
+    'uint32': (0x03, 'I', 'uint32_t', 4),
+    'float': (0x04, 'f', 'float', 4),
+    'uint8': (0x05, 'B', 'uint8_t', 1),
+}
+
+_IDENT = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _field_ident(field, prefix, index):
+    """字段在代码中的标识符: 优先使用 'id', 其次是 ASCII 名称, 否则按序号命名"""
+    ident = field.get('id') or field['name']
+    if not _IDENT.match(ident):
+        ident = f'{prefix}{index}'
+    return ident.lower()
+
+
+def normalize_spec(config):
+    """整理 JSON 配置: 只保留启用的传出字段, 检查类型并生成标识符"""
+    spec = {'tx': [], 'rx': []}
+    tx_fields = [f for f in config.get('tx_data', []) if f.get('enabled', True)]
+    for kind, fields in (('tx', tx_fields), ('rx', config.get('rx_data', []))):
+        idents = set()
+        for i, field in enumerate(fields):
+            if field['type'] not in FIELD_TYPES:
+                raise ValueError(f"字段 '{field['name']}' 类型未知: {field['type']}")
+            ident = _field_ident(field, f'{kind}_', i)
+            if ident in idents or ident == 'running':
+                raise ValueError(f"字段标识符重复: {ident}")
+            idents.add(ident)
+            spec[kind].append({'name': field['name'], 'type': field['type'], 'id': ident})
+    if len(spec['tx']) > 255:
+        raise ValueError("传出字段数超过 255")
+    if not spec['rx']:
+        raise ValueError("至少需要一个传入字段")
+    if rx_frame_size(spec, 2) > BATCH_MAX_LEN:
+        raise ValueError("传入帧长度超过 255 字节")
+    return spec
+
+
+def load_spec(path):
+    """读取 JSON 帧格式描述"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return normalize_spec(json.load(f))
+
+
+def tx_body_size(spec):
+    """传出帧除校验位和帧尾外的长度"""
+    return 3 + sum(1 + FIELD_TYPES[f['type']][3] for f in spec['tx'])
+
+
+def rx_sample_size(spec):
+    """传入帧数据部分 (一个样本) 的长度"""
+    return sum(FIELD_TYPES[f['type']][3] for f in spec['rx'])
+
+
+def rx_body_size(spec):
+    """传入帧除校验位和帧尾外的长度"""
+    return 4 + rx_sample_size(spec)
+
+
+def rx_frame_size(spec, check_size=1):
+    return rx_body_size(spec) + check_size + 1
+
+
+def _tx_format(spec):
+    return '<BBB' + ''.join('B' + FIELD_TYPES[f['type']][1] for f in spec['tx'])
+
+
+def _rx_sample_format(spec):
+    return ''.join(FIELD_TYPES[f['type']][1] for f in spec['rx'])
+
+
+def _rx_format(spec):
+    return '<BBBB' + _rx_sample_format(spec)
+
+
+def generate_python(spec, source=''):
+    """生成 Python 编解码模块源码"""
+    tx, rx = spec['tx'], spec['rx']
+    tx_ids = tuple(FIELD_TYPES[f['type']][0] for f in tx)
+    struct.calcsize(_tx_format(spec))  # 提前检查格式
+
+    pack_args = ', '.join(f"{FIELD_TYPES[f['type']][0]}, values[{i}]" for i, f in enumerate(tx))
+    lines = [
+        f'# 由 frame_spec.py 根据 {source} 生成, 请勿手动修改',
+        'import struct',
+        '',
+        'from checksum import XOR_CHECK',
+        '',
+        'FRAME_TAIL = 0x5D',
+        '',
+        '# 传出帧 (上位机 -> 下位机)',
+        f'TX_NAMES = {tuple(f["name"] for f in tx)!r}',
+        f'TX_COUNT = {len(tx)}',
+        f'TX_TYPE_IDS = {tx_ids!r}',
+        f"TX_BODY = struct.Struct('{_tx_format(spec)}')",
+        '',
+        '# 传入帧 (下位机 -> 上位机)',
+        f'RX_NAMES = {tuple(f["name"] for f in rx)!r}',
+        f'RX_COUNT = {len(rx)}',
+        f"RX_FORMAT = '{_rx_format(spec)}'",
+        f"RX_SAMPLE = struct.Struct('<{_rx_sample_format(spec)}')  # 批量帧中的一个样本",
+        f'RX_BATCH_FLAG = 0x{FRAME_BATCH_FLAG:02X}',
+        f'RX_BATCH_HEADER_LEN = {BATCH_HEADER_LEN}',
+        '',
+        '_rx_layouts = {}',
+        '',
+        '',
+        'def rx_layout(check=XOR_CHECK):',
+        '    """传入帧的 struct 格式 (含校验位和帧尾)"""',
+        '    layout = _rx_layouts.get(check.mode)',
+        '    if layout is None:',
+        "        layout = _rx_layouts[check.mode] = struct.Struct(RX_FORMAT + check.format + 'B')",
+        '    return layout',
+        '',
+        '',
+        'def tx_size(check=XOR_CHECK):',
+        '    return TX_BODY.size + check.size + 1',
+        '',
+        '',
+        'def rx_size(check=XOR_CHECK):',
+        '    return rx_layout(check).size',
+        '',
+        '',
+        'def encode_tx(values, check=XOR_CHECK):',
+        '    """values 的顺序同 TX_NAMES, 返回完整的传出帧"""',
+        f'    body = TX_BODY.pack(0xAA, 0x55, TX_COUNT{", " + pack_args if tx else ""})',
+        '    return check.seal(body, FRAME_TAIL)',
+        '',
+        '',
+        'def decode_tx(buffer, offset=0, check=XOR_CHECK):',
+        '    """解码传出帧, 返回各字段值组成的元组; 帧格式或校验错误时返回 None"""',
+        '    if len(buffer) - offset < tx_size(check):',
+        '        return None',
+        '    fields = TX_BODY.unpack_from(buffer, offset)',
+        '    if fields[0] != 0xAA or fields[1] != 0x55 or fields[2] != TX_COUNT or fields[3::2] != TX_TYPE_IDS:',
+        '        return None',
+        '    end = offset + TX_BODY.size',
+        "    expected = int.from_bytes(buffer[end:end + check.size], 'little')",
+        '    if buffer[end + check.size] != FRAME_TAIL or check.compute(buffer, offset, end) != expected:',
+        '        return None',
+        '    return fields[4::2]',
+        '',
+        '',
+        'def encode_rx(running, values, check=XOR_CHECK):',
+        '    """values 的顺序同 RX_NAMES, 返回完整的传入帧"""',
+        '    layout = rx_layout(check)',
+        f"    body = struct.pack(RX_FORMAT, 0xAA, 0x55, layout.size, running{', *values' if rx else ''})",
+        '    return check.seal(body, FRAME_TAIL)',
+        '',
+        '',
+        'def decode_rx(buffer, offset=0, check=XOR_CHECK):',
+        '    """解码传入帧, 返回 (running, 字段0, 字段1, ...); 帧格式或校验错误时返回 None"""',
+        '    layout = rx_layout(check)',
+        '    if len(buffer) - offset < layout.size:',
+        '        return None',
+        '    fields = layout.unpack_from(buffer, offset)',
+        '    if fields[0] != 0xAA or fields[1] != 0x55 or fields[2] != layout.size or fields[-1] != FRAME_TAIL:',
+        '        return None',
+        '    if check.compute(buffer, offset, offset + layout.size - 1 - check.size) != fields[-2]:',
+        '        return None',
+        '    return fields[3:-2]',
+        '',
+        '',
+        'def rx_batch_size(count, check=XOR_CHECK):',
+        '    return RX_BATCH_HEADER_LEN + RX_SAMPLE.size * count + check.size + 1',
+        '',
+        '',
+        'def rx_batch_capacity(check=XOR_CHECK):',
+        '    """单个批量帧最多携带的样本数"""',
+        f'    return ({BATCH_MAX_LEN} - RX_BATCH_HEADER_LEN - check.size - 1) // RX_SAMPLE.size',
+        '',
+        '',
+        'def encode_rx_batch(running, samples, check=XOR_CHECK):',
+        '    """samples 中每个样本的字段顺序同 RX_NAMES, 返回一个批量传入帧"""',
+        '    count = len(samples)',
+        '    if not 0 < count <= rx_batch_capacity(check):',
+        '        raise ValueError(f"批量帧样本数超出范围: {count}")',
+        "    body = bytearray((0xAA, 0x55, rx_batch_size(count, check), RX_BATCH_FLAG | running, count))",
+        '    for sample in samples:',
+        '        body += RX_SAMPLE.pack(*sample)',
+        '    return check.seal(body, FRAME_TAIL)',
+        '',
+        '',
+        'def decode_rx_batch(buffer, offset=0, check=XOR_CHECK):',
+        '    """解码批量传入帧, 返回 (running, [样本0, 样本1, ...]); 帧格式或校验错误时返回 None"""',
+        '    if len(buffer) - offset <= RX_BATCH_HEADER_LEN:',
+        '        return None',
+        '    if buffer[offset] != 0xAA or buffer[offset + 1] != 0x55 or not buffer[offset + 3] & RX_BATCH_FLAG:',
+        '        return None',
+        '    count = buffer[offset + 4]',
+        '    size = rx_batch_size(count, check)',
+        '    if not 0 < count <= rx_batch_capacity(check) or buffer[offset + 2] != size or len(buffer) - offset < size:',
+        '        return None',
+        '    end = offset + size - 1 - check.size',
+        "    expected = int.from_bytes(buffer[end:end + check.size], 'little')",
+        '    if buffer[end + check.size] != FRAME_TAIL or check.compute(buffer, offset, end) != expected:',
+        '        return None',
+        '    samples = list(RX_SAMPLE.iter_unpack(buffer[offset + RX_BATCH_HEADER_LEN:end]))',
+        '    return buffer[offset + 3] & 0x01, samples',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def _c_member(field):
+    """C: 结构体成员声明, 标识符与原名称不同时注明原名称"""
+    line = f'\t{FIELD_TYPES[field["type"]][2]} {field["id"]};'
+    if field['id'] != field['name']:
+        line += f' // {field["name"]}'
+    return line
+
+
+def _c_put(buf, offset, field, value):
+    """C: 把 value 按小端写入 buf[offset]"""
+    t = field['type']
+    if t == 'uint8':
+        return f'{buf}[{offset}] = {value};'
+    if t in ('int16', 'uint16'):
+        return f'{{P}}_put_u16(&{buf}[{offset}], (uint16_t){value});'
+    if t in ('int32', 'uint32'):
+        return f'{{P}}_put_u32(&{buf}[{offset}], (uint32_t){value});'
+    return f'{{P}}_put_f32(&{buf}[{offset}], {value});'
+
+
+def _c_get(buf, offset, field):
+    """C: 从 buf[offset] 按小端读取字段值的表达式"""
+    t = field['type']
+    if t == 'uint8':
+        return f'{buf}[{offset}]'
+    if t in ('int16', 'uint16'):
+        return f'({FIELD_TYPES[t][2]}){{P}}_get_u16(&{buf}[{offset}])'
+    if t in ('int32', 'uint32'):
+        return f'({FIELD_TYPES[t][2]}){{P}}_get_u32(&{buf}[{offset}])'
+    return f'{{P}}_get_f32(&{buf}[{offset}])'
+
+
+def generate_c_header(spec, prefix, source=''):
+    """生成 C 头文件源码 (只依赖 stdint.h/string.h, 可直接在主机上用 gcc 编译测试)"""
+    P = prefix.lower()
+    M = prefix.upper()
+    tx, rx = spec['tx'], spec['rx']
+    tx_body = tx_body_size(spec)
+    rx_body = rx_body_size(spec)
+
+    out = [
+        f'/* 由 frame_spec.py 根据 {source} 生成, 请勿手动修改 */',
+        f'#ifndef __{M}_H__',
+        f'#define __{M}_H__',
+        '',
+        '#include <stdint.h>',
+        '#include <string.h>',
+        '',
+        f'#define {M}_TAIL 0x5D',
+        f'#define {M}_CHECK_XOR   0',
+        f'#define {M}_CHECK_CRC16 1',
+        f'#define {M}_CHECK_SIZE(check) ((check) == {M}_CHECK_CRC16 ? 2 : 1)',
+        '',
+        f'#define {M}_TX_COUNT {len(tx)}',
+        f'#define {M}_TX_BODY_LEN {tx_body}',
+        f'#define {M}_TX_LEN(check) ({M}_TX_BODY_LEN + {M}_CHECK_SIZE(check) + 1)',
+        f'#define {M}_RX_BODY_LEN {rx_body}',
+        f'#define {M}_RX_LEN(check) ({M}_RX_BODY_LEN + {M}_CHECK_SIZE(check) + 1)',
+        f'#define {M}_MAX_LEN ({M}_TX_BODY_LEN > {M}_RX_BODY_LEN ? {M}_TX_LEN(1) : {M}_RX_LEN(1))',
+        '',
+        '/* 批量传入帧: 多个样本共用一个帧头和校验位 */',
+        f'#define {M}_RX_BATCH_FLAG 0x{FRAME_BATCH_FLAG:02X}',
+        f'#define {M}_RX_SAMPLE_LEN {rx_sample_size(spec)}',
+        f'#define {M}_RX_BATCH_LEN(count, check) ({BATCH_HEADER_LEN} + {M}_RX_SAMPLE_LEN * (count) + {M}_CHECK_SIZE(check) + 1)',
+        f'#define {M}_RX_BATCH_MAX(check) (({BATCH_MAX_LEN} - {BATCH_HEADER_LEN + 1} - {M}_CHECK_SIZE(check)) / {M}_RX_SAMPLE_LEN)',
+        '',
+        '/* 传出帧 (上位机 -> 下位机) */',
+        'typedef struct {',
+    ]
+    out += [_c_member(f) for f in tx] or ['\tuint8_t unused;']
+    out += [
+        f'}} {P}_tx_t;',
+        '',
+        '/* 传入帧 (下位机 -> 上位机) */',
+        'typedef struct {',
+        '\tuint8_t running;',
+    ]
+    out += [_c_member(f) for f in rx]
+    out += [
+        f'}} {P}_rx_t;',
+        '',
+        'static inline void {P}_put_u16(uint8_t *p, uint16_t v) { p[0] = v & 0xFF; p[1] = (v >> 8) & 0xFF; }',
+        'static inline void {P}_put_u32(uint8_t *p, uint32_t v)',
+        '{',
+        '\tp[0] = v & 0xFF; p[1] = (v >> 8) & 0xFF; p[2] = (v >> 16) & 0xFF; p[3] = (v >> 24) & 0xFF;',
+        '}',
+        'static inline void {P}_put_f32(uint8_t *p, float v) { uint32_t u; memcpy(&u, &v, 4); {P}_put_u32(p, u); }',
+        'static inline uint16_t {P}_get_u16(const uint8_t *p) { return (uint16_t)(p[0] | (p[1] << 8)); }',
+        'static inline uint32_t {P}_get_u32(const uint8_t *p)',
+        '{',
+        '\treturn (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);',
+        '}',
+        'static inline float {P}_get_f32(const uint8_t *p) { uint32_t u = {P}_get_u32(p); float v; memcpy(&v, &u, 4); return v; }',
+        '',
+        '/* CRC-16/CCITT-FALSE (多项式 0x1021, 初值 0xFFFF), 按字节查表 */',
+        'static const uint16_t {P}_crc16_table[256] =',
+        '{',
+    ]
+    out += ['\t' + ' '.join(f'0x{v:04X},' for v in CRC16_TABLE[i:i + 8]) for i in range(0, 256, 8)]
+    out[-1] = out[-1].rstrip(',')
+    out += [
+        '};',
+        '',
+        'static inline uint16_t {P}_crc16(const uint8_t *data, uint16_t len)',
+        '{',
+        '\tuint16_t crc = 0xFFFF;',
+        '\tfor (uint16_t i = 0; i < len; i++)',
+        '\t\tcrc = (uint16_t)(crc << 8) ^ {P}_crc16_table[(uint8_t)(crc >> 8) ^ data[i]];',
+        '\treturn crc;',
+        '}',
+        '',
+        '/* 在 buf[0..body_len) 之后写入校验位和帧尾, 返回帧长 */',
+        'static inline uint16_t {P}_seal(uint8_t *buf, uint16_t body_len, uint8_t check)',
+        '{',
+        '\tif (check == {M}_CHECK_CRC16) {',
+        '\t\t{P}_put_u16(&buf[body_len], {P}_crc16(buf, body_len));',
+        '\t\tbuf[body_len + 2] = {M}_TAIL;',
+        '\t\treturn body_len + 3;',
+        '\t}',
+        '\tuint8_t checksum = 0x00;',
+        '\tfor (uint16_t i = 0; i < body_len; i++)',
+        '\t\tchecksum ^= buf[i];',
+        '\tbuf[body_len] = checksum;',
+        '\tbuf[body_len + 1] = {M}_TAIL;',
+        '\treturn body_len + 2;',
+        '}',
+        '',
+        '/* 验证帧头、校验位和帧尾: 0 正确, -1 帧头错误, -2 校验错误 */',
+        'static inline int {P}_verify(const uint8_t *buf, uint16_t body_len, uint8_t check)',
+        '{',
+        '\tif (buf[0] != 0xAA || buf[1] != 0x55) return -1;',
+        '\tif (check == {M}_CHECK_CRC16) {',
+        '\t\tif ({P}_crc16(buf, body_len) != {P}_get_u16(&buf[body_len]) || buf[body_len + 2] != {M}_TAIL) return -2;',
+        '\t\treturn 0;',
+        '\t}',
+        '\tuint8_t checksum = 0x00;',
+        '\tfor (uint16_t i = 0; i < body_len; i++)',
+        '\t\tchecksum ^= buf[i];',
+        '\tif (checksum != buf[body_len] || buf[body_len + 1] != {M}_TAIL) return -2;',
+        '\treturn 0;',
+        '}',
+        '',
+    ]
+
+    # 传出帧打包/解包
+    out += [
+        '/* 打包传出帧, 返回帧长 */',
+        'static inline uint16_t {P}_pack_tx(uint8_t *buf, const {P}_tx_t *msg, uint8_t check)',
+        '{',
+        '\tbuf[0] = 0xAA;',
+        '\tbuf[1] = 0x55;',
+        '\tbuf[2] = {M}_TX_COUNT;',
+    ]
+    offset = 3
+    for f in tx:
+        out.append(f'\tbuf[{offset}] = 0x{FIELD_TYPES[f["type"]][0]:02X};')
+        out.append('\t' + _c_put('buf', offset + 1, f, f'msg->{f["id"]}'))
+        offset += 1 + FIELD_TYPES[f['type']][3]
+    out += [
+        '\treturn {P}_seal(buf, {M}_TX_BODY_LEN, check);',
+        '}',
+        '',
+        '/* 解包传出帧: 0 正确, -1 帧头错误, -2 校验错误, -4 类型标识不符, -5 长度或字段数不符 */',
+        'static inline int {P}_unpack_tx(const uint8_t *buf, uint16_t size, uint8_t check, {P}_tx_t *msg)',
+        '{',
+        '\tif (size != {M}_TX_LEN(check)) return -5;',
+        '\tint rec = {P}_verify(buf, {M}_TX_BODY_LEN, check);',
+        '\tif (rec != 0) return rec;',
+        '\tif (buf[2] != {M}_TX_COUNT) return -5;',
+    ]
+    offset = 3
+    for f in tx:
+        out.append(f'\tif (buf[{offset}] != 0x{FIELD_TYPES[f["type"]][0]:02X}) return -4;')
+        offset += 1 + FIELD_TYPES[f['type']][3]
+    offset = 3
+    for f in tx:
+        out.append(f'\tmsg->{f["id"]} = {_c_get("buf", offset + 1, f)};')
+        offset += 1 + FIELD_TYPES[f['type']][3]
+    out += [
+        '\treturn 0;',
+        '}',
+        '',
+    ]
+
+    # 传入帧打包/解包, 单帧与批量帧共用样本的读写函数
+    out += [
+        '/* 写入一个样本 (传入帧的数据部分) */',
+        'static inline void {P}_put_rx_sample(uint8_t *p, const {P}_rx_t *msg)',
+        '{',
+    ]
+    offset = 0
+    for f in rx:
+        out.append('\t' + _c_put('p', offset, f, f'msg->{f["id"]}'))
+        offset += FIELD_TYPES[f['type']][3]
+    out += [
+        '}',
+        '',
+        '/* 读取一个样本 (传入帧的数据部分) */',
+        'static inline void {P}_get_rx_sample(const uint8_t *p, {P}_rx_t *msg)',
+        '{',
+    ]
+    offset = 0
+    for f in rx:
+        out.append(f'\tmsg->{f["id"]} = {_c_get("p", offset, f)};')
+        offset += FIELD_TYPES[f['type']][3]
+    out += [
+        '}',
+        '',
+        '/* 打包传入帧, 返回帧长 */',
+        'static inline uint16_t {P}_pack_rx(uint8_t *buf, const {P}_rx_t *msg, uint8_t check)',
+        '{',
+        '\tbuf[0] = 0xAA;',
+        '\tbuf[1] = 0x55;',
+        '\tbuf[2] = {M}_RX_LEN(check);',
+        '\tbuf[3] = msg->running;',
+        '\t{P}_put_rx_sample(&buf[4], msg);',
+        '\treturn {P}_seal(buf, {M}_RX_BODY_LEN, check);',
+        '}',
+        '',
+        '/* 解包传入帧: 0 正确, -1 帧头错误, -2 校验错误, -5 长度不符 */',
+        'static inline int {P}_unpack_rx(const uint8_t *buf, uint16_t size, uint8_t check, {P}_rx_t *msg)',
+        '{',
+        '\tif (size != {M}_RX_LEN(check) || buf[2] != size) return -5;',
+        '\tint rec = {P}_verify(buf, {M}_RX_BODY_LEN, check);',
+        '\tif (rec != 0) return rec;',
+        '\tmsg->running = buf[3];',
+        '\t{P}_get_rx_sample(&buf[4], msg);',
+        '\treturn 0;',
+        '}',
+        '',
+        '/* 打包批量传入帧: msgs 中的 count 个样本共用一个帧头, running 取最后一个样本; 返回帧长, count 超出范围时返回 0 */',
+        'static inline uint16_t {P}_pack_rx_batch(uint8_t *buf, const {P}_rx_t *msgs, uint8_t count, uint8_t check)',
+        '{',
+        '\tif (count == 0 || count > {M}_RX_BATCH_MAX(check)) return 0;',
+        '\tbuf[0] = 0xAA;',
+        '\tbuf[1] = 0x55;',
+        '\tbuf[2] = {M}_RX_BATCH_LEN(count, check);',
+        '\tbuf[3] = {M}_RX_BATCH_FLAG | (msgs[count - 1].running & 0x01);',
+        '\tbuf[4] = count;',
+        '\tfor (uint8_t i = 0; i < count; i++)',
+        f'\t\t{{P}}_put_rx_sample(&buf[{BATCH_HEADER_LEN} + i * {{M}}_RX_SAMPLE_LEN], &msgs[i]);',
+        f'\treturn {{P}}_seal(buf, {BATCH_HEADER_LEN} + count * {{M}}_RX_SAMPLE_LEN, check);',
+        '}',
+        '',
+        '/* 解包批量传入帧: 返回样本数, 错误时返回值同 unpack_rx; msgs 至少能容纳 max_count 个样本 */',
+        'static inline int {P}_unpack_rx_batch(const uint8_t *buf, uint16_t size, uint8_t check, {P}_rx_t *msgs, uint8_t max_count)',
+        '{',
+        f'\tif (size <= {BATCH_HEADER_LEN} || !(buf[3] & {{M}}_RX_BATCH_FLAG)) return -5;',
+        '\tuint8_t count = buf[4];',
+        '\tif (count == 0 || count > max_count || size != {M}_RX_BATCH_LEN(count, check) || buf[2] != size) return -5;',
+        '\tint rec = {P}_verify(buf, size - 1 - {M}_CHECK_SIZE(check), check);',
+        '\tif (rec != 0) return rec;',
+        '\tfor (uint8_t i = 0; i < count; i++) {',
+        '\t\tmsgs[i].running = buf[3] & 0x01;',
+        f'\t\t{{P}}_get_rx_sample(&buf[{BATCH_HEADER_LEN} + i * {{M}}_RX_SAMPLE_LEN], &msgs[i]);',
+        '\t}',
+        '\treturn count;',
+        '}',
+        '',
+        '#endif',
+        '',
+    ]
+    return '\n'.join(out).replace('{P}', P).replace('{M}', M)
+
+
+def _write(path, text):
+    # 与仓库中其他源文件一致, 使用 CRLF 换行
+    with open(path, 'w', encoding='utf-8', newline='\r\n') as f:
+        f.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="根据帧格式描述生成 Python 与 C 编解码代码")
+    parser.add_argument('spec', help="帧格式描述 JSON (SelfDefine_UI 导出的配置)")
+    parser.add_argument('--py', help="输出的 Python 模块路径")
+    parser.add_argument('--c', help="输出的 C 头文件路径")
+    parser.add_argument('--prefix', help="C 代码前缀, 默认取 C 头文件名")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    source = os.path.basename(args.spec)
+    if args.py:
+        _write(args.py, generate_python(spec, source))
+        print(f"已生成 {args.py}")
+    if args.c:
+        prefix = args.prefix or os.path.splitext(os.path.basename(args.c))[0]
+        _write(args.c, generate_c_header(spec, prefix, source))
+        print(f"已生成 {args.c}")
+
+
+if __name__ == "__main__":
+    main()
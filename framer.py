@@ -0,0 +1,123 @@
+from frame_codec import FRAME_HEADER, FRAME_TAIL
+
+
+class RingFramer:
+    """
+    定长容量接收缓冲区上的帧切分器
+    通过读写游标和 memoryview 取出完整帧, 不对单帧做拷贝; 只有写游标到达末尾时
+    才把未读数据整体移回开头 (每写满一次容量最多移动一次, 均摊 O(1))
+    """
+
+    def __init__(self, capacity=65536, frame_length=None, length_index=2,
+                 min_length=5, max_length=255, header=FRAME_HEADER, tail=FRAME_TAIL):
+        """
+        frame_length: 定长帧的长度; 为 None 时从帧内 length_index 处读取长度字节
+        min_length/max_length: 长度字节的合法范围
+        """
+        self.capacity = capacity
+        self.frame_length = frame_length
+        self.length_index = length_index
+        self.min_length = frame_length or min_length
+        self.max_length = frame_length or max_length
+        self.header = header
+        self.tail = tail
+
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0  # 读游标
+        self._end = 0    # 写游标
+
+        # 统计信息
+        self.dropped_bytes = 0  # 重新同步或溢出时丢弃的字节数
+        self.bad_frames = 0     # 长度字节或帧尾错误的帧数
+        self.total_bytes = 0    # 累计写入的字节数
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def offset(self):
+        """读游标在整个接收字节流中的绝对位置 (frames() 产出一帧后即为该帧帧尾之后的位置)"""
+        return self.total_bytes - (self._end - self._start)
+
+    def feed(self, data):
+        """写入新收到的数据, 缓冲区已满时丢弃最旧的数据"""
+        n = len(data)
+        self.total_bytes += n
+        if n >= self.capacity:
+            self.dropped_bytes += self._end - self._start + n - self.capacity
+            self._view[:] = memoryview(data)[n - self.capacity:]
+            self._start, self._end = 0, self.capacity
+            return
+        if self._end + n > self.capacity:
+            overflow = self._end - self._start + n - self.capacity
+            if overflow > 0:
+                self.dropped_bytes += overflow
+                self._start += overflow
+            self._compact()
+        self._view[self._end:self._end + n] = data
+        self._end += n
+
+    def _compact(self):
+        """把未读数据移到缓冲区开头"""
+        size = self._end - self._start
+        if self._start:
+            self._view[:size] = self._view[self._start:self._end]
+            self._start, self._end = 0, size
+
+    def pending(self):
+        """返回未读数据的 memoryview (在下一次 feed 之前有效)"""
+        return self._view[self._start:self._end]
+
+    def consume(self, n):
+        """从未读数据头部移除 n 个字节"""
+        self._start = min(self._start + n, self._end)
+
+    def sync(self):
+        """丢弃第一个帧头之前的数据, 未读数据以帧头开始时返回 True"""
+        start, end = self._start, self._end
+        idx = self._buf.find(self.header, start, end)
+        if idx < 0:
+            # 末尾字节可能是下一帧帧头的第一个字节
+            keep = 1 if end > start and self._buf[end - 1] == self.header[0] else 0
+            self.dropped_bytes += end - keep - start
+            self._start = end - keep
+            return False
+        self.dropped_bytes += idx - start
+        self._start = idx
+        return True
+
+    def frames(self):
+        """
+        依次产出缓冲区中的完整帧 (memoryview, 在下一次 feed 之前有效)
+        不完整的帧留在缓冲区中等待后续数据; 长度或帧尾错误时跳过帧头重新同步
+        """
+        buf = self._buf
+        while self._end - self._start >= self.min_length:
+            if not self.sync():
+                return
+            start, end = self._start, self._end
+
+            length = self.frame_length
+            if length is None:
+                if end - start <= self.length_index:
+                    return
+                length = buf[start + self.length_index]
+                if not self.min_length <= length <= self.max_length:
+                    self._skip_header()
+                    continue
+
+            if end - start < length:
+                return
+            if buf[start + length - 1] != self.tail:
+                self._skip_header()
+                continue
+
+            self._start = start + length
+            yield self._view[start:start + length]
+
+    def _skip_header(self):
+        """当前帧头无效, 跳过一个字节后重新查找"""
+        self.bad_frames += 1
+        self.dropped_bytes += 1
+        self._start += 1
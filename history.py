@@ -0,0 +1,447 @@
+import numpy as np
+
+# 界面可选的显示范围 (名称, 秒数): 0 为最近的原始样本窗口, None 为整个会话
+VIEW_SPANS = (("实时窗口", 0), ("10 s", 10), ("1 min", 60), ("10 min", 600), ("1 h", 3600), ("全部", None))
+MAX_PLOT_POINTS = 2000  # 每条曲线最多绘制的点数 (汇总级为 min/max 两倍)
+PLOT_WIDTH_STEP = 256   # 按子图像素宽度选取绘制点数时的取整步长 (像素)
+
+
+def plot_points(width, step=PLOT_WIDTH_STEP):
+    """
+    宽度为 width 像素的子图每条曲线的点数 (每个像素一个点, 汇总级为一对 min/max, 不丢尖峰);
+    取整到 step, 纵轴刻度文字变化引起的几个像素变化不改变点数; 尚未布局 (宽度为 0) 时为 MAX_PLOT_POINTS
+    """
+    return -(-int(width) // step) * step or MAX_PLOT_POINTS
+
+
+class HistoryBuffer:
+    """
+    预分配的定长历史数据缓冲区 (单写者/单读者)
+    各通道按列连续存放 (通道数 x 容量的二维数组) 并配一列 float64 时间戳, 追加为 O(1);
+    写游标到达末尾时把最近的样本复制到新分配的缓冲区开头 (均摊 O(1)), 从不原地移动已发布的数据,
+    因此任意 "最近 N 个样本" 都是连续的视图, 读者取到的视图之后也不会被改写
+
+    接收线程写入新样本后, 把 (数据, 时间, 起点, 终点, 累计样本数) 作为一个元组整体发布;
+    界面线程一次取出该元组即得到长度一致的只读视图, 无需加锁.
+    累计样本数即代数 (generation), 增量读者可用 since() 取某一代之后的新样本
+    """
+
+    def __init__(self, channels, capacity, dtype=np.int16, slack=None):
+        """
+        channels: 通道数; capacity: 保留的样本数
+        slack: 缓冲区末尾的余量, 越大重新分配越少 (默认 capacity 的 1/4)
+        """
+        self.channels = channels
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self.slack = slack or max(capacity // 4, 1)
+        self._state = self._allocate() + (0, 0, 0)
+
+    def _allocate(self):
+        size = self.capacity + self.slack
+        return np.zeros((self.channels, size), dtype=self.dtype), np.zeros(size, dtype=np.float64)
+
+    def __len__(self):
+        state = self._state
+        return state[3] - state[2]
+
+    @property
+    def total(self):
+        """累计追加的样本数"""
+        return self._state[4]
+
+    generation = total
+
+    @property
+    def nbytes(self):
+        """每个样本占用的字节数 (不含余量)"""
+        return self.dtype.itemsize * self.channels + 8
+
+    def clear(self):
+        self._state = self._allocate() + (0, 0, 0)
+
+    def _reserve(self, n):
+        """返回写游标之后至少有 n 个空位的状态, 不足时把需保留的样本复制到新缓冲区开头 (尚未发布)"""
+        data, times, start, end, total = self._state
+        if end + n <= len(times):
+            return data, times, start, end, total
+        keep = min(end - start, self.capacity - n)
+        new_data, new_times = self._allocate()
+        new_data[..., :keep] = data[..., end - keep:end]
+        new_times[:keep] = times[end - keep:end]
+        return new_data, new_times, 0, keep, total
+
+    def append(self, values, timestamp):
+        """追加一个样本 (各通道的值)"""
+        data, times, start, end, total = self._reserve(1)
+        data[:, end] = values
+        times[end] = timestamp
+        end += 1
+        self._state = (data, times, max(start, end - self.capacity), end, total + 1)
+
+    def extend(self, block, times):
+        """追加多个样本: block 为行数 x 通道数的数组, times 为逐行时间戳"""
+        n = len(block)
+        if not n:
+            return
+        skipped = max(n - self.capacity, 0)
+        if skipped:
+            block, times = block[skipped:], times[skipped:]
+            n = self.capacity
+        data, buf_times, start, end, total = self._reserve(n)
+        data[:, end:end + n] = np.asarray(block).T
+        buf_times[end:end + n] = times
+        end += n
+        self._state = (data, buf_times, max(start, end - self.capacity), end, total + skipped + n)
+
+    @staticmethod
+    def _views(data, times, start, end):
+        times, data = times[start:end], data[..., start:end]
+        times.flags.writeable = False
+        data.flags.writeable = False
+        return times, data
+
+    def snapshot(self, n=None):
+        """
+        返回最近 n 个样本 (默认全部) 的 (时间戳, 通道数 x n 数组, 代数)
+        时间戳与数据由同一个已发布状态截取, 长度一致, 只读且之后不会被改写
+        """
+        data, times, start, end, total = self._state
+        if n is not None:
+            start = max(start, end - n)
+        return self._views(data, times, start, end) + (total,)
+
+    def last(self, n=None):
+        """最近 n 个样本 (默认全部) 的 (时间戳, 通道数 x n 数组), 见 snapshot"""
+        return self.snapshot(n)[:2]
+
+    def since(self, generation):
+        """
+        返回第 generation 代之后追加的样本 (时间戳, 数据, 当前代数)
+        若部分样本已被覆盖, 只返回仍保留的部分 (数量少于 当前代数 - generation)
+        """
+        data, times, start, end, total = self._state
+        start = max(start, end - max(total - generation, 0))
+        return self._views(data, times, start, end) + (total,)
+
+    def latest(self):
+        """最新一个样本的各通道值, 无数据时返回 None"""
+        data, times, start, end, total = self._state
+        if end == start:
+            return None
+        return data[..., end - 1].copy()
+
+    def matrix(self, data):
+        """把 snapshot/last 返回的数据转换为 通道数 x n 数组 (本类中即为原数组)"""
+        return data
+
+    def column(self, data, index):
+        """snapshot/last 返回的数据中第 index 个通道的视图"""
+        return data[index]
+
+
+class RecordBuffer(HistoryBuffer):
+    """
+    结构化记录的定长历史缓冲区: 每行一帧, 各字段保持传入字段的类型, 并附带逐字段的有效标记 (valid),
+    缺失的值 (如字段配置变化前的记录中新增的字段) 标记为无效而不是让各列错位
+    追加一行只需一次整行写入; 各字段可直接取零拷贝的列视图; 发布方式与 HistoryBuffer 相同
+    """
+
+    def __init__(self, dtype, capacity, slack=None):
+        """dtype: 各字段的结构化类型 (如 frame_codec.rx_sample_dtype), 字段依次命名为 f0, f1, ..."""
+        dtype = np.dtype(dtype)
+        self.fields = list(dtype.names)
+        self.value_dtype = dtype
+        record_dtype = np.dtype(dtype.descr + [('valid', '?', (len(self.fields),))])
+        self._all_valid = (True,) * len(self.fields)
+        super().__init__(len(self.fields), capacity, record_dtype, slack)
+
+    def _allocate(self):
+        size = self.capacity + self.slack
+        return np.zeros(size, dtype=self.dtype), np.zeros(size, dtype=np.float64)
+
+    @property
+    def nbytes(self):
+        return self.dtype.itemsize + 8
+
+    def append(self, values, timestamp, valid=None):
+        """追加一行 (各字段的值), valid 为逐字段的有效标记, 默认全部有效"""
+        data, times, start, end, total = self._reserve(1)
+        data[end] = (*values, self._all_valid if valid is None else tuple(valid))
+        times[end] = timestamp
+        end += 1
+        self._state = (data, times, max(start, end - self.capacity), end, total + 1)
+
+    def extend(self, block, times, valid=None):
+        """追加多行: block 为含 f0, f1, ... 字段的结构化数组, valid 为 行数 x 字段数 的有效标记"""
+        n = len(block)
+        if not n:
+            return
+        skipped = max(n - self.capacity, 0)
+        if skipped:
+            block, times = block[skipped:], times[skipped:]
+            valid = valid[skipped:] if valid is not None else None
+            n = self.capacity
+        data, buf_times, start, end, total = self._reserve(n)
+        rows = data[end:end + n]
+        for name in self.fields:
+            rows[name] = block[name]
+        rows['valid'] = True if valid is None else valid
+        buf_times[end:end + n] = times
+        end += n
+        self._state = (data, buf_times, max(start, end - self.capacity), end, total + skipped + n)
+
+    def matrix(self, data):
+        """把记录转换为 字段数 x n 的 float64 数组, 无效的值为 NaN"""
+        out = np.empty((len(self.fields), len(data)), dtype=np.float64)
+        for i, name in enumerate(self.fields):
+            out[i] = data[name]
+        out[~data['valid'].T] = np.nan
+        return out
+
+    def column(self, data, index):
+        """第 index 个字段的零拷贝列视图; 有无效值时返回以 NaN 填充的 float64 副本"""
+        column = data[self.fields[index]]
+        valid = data['valid'][:, index]
+        if valid.all():
+            return column
+        column = column.astype(np.float64)
+        column[~valid] = np.nan
+        return column
+
+
+def _nanmean(values, axis):
+    """忽略 NaN 的平均值, 全为 NaN 时结果为 NaN (不产生警告)"""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, values, 0).sum(axis=axis)
+    return np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
+
+
+class TieredHistory:
+    """
+    多分辨率历史数据
+    最近 capacity 个样本保留原始值, 更早的数据按 factor 个一组逐级汇总为 min/max/mean,
+    第 L 级每个点覆盖 factor^L 个样本; 各级容量固定, 内存与绘图点数不随会话时长增长
+    (默认 1000 点 x 4 级, 每级 16 倍, 1 kHz 下最粗一级约可覆盖 18 小时)
+    """
+
+    def __init__(self, channels, capacity=1000, dtype=np.int16, factor=16, levels=4, tier_capacity=None,
+                 names=None):
+        """
+        dtype 为结构化类型时原始样本使用 RecordBuffer (每个字段保持自身类型并带有效标记), 否则使用 HistoryBuffer
+        names: 各通道的名称 (可选), 与数据一同发布, 读者不会取到与数据不匹配的名称
+        """
+        self.channels = channels
+        self.names = list(names) if names is not None else [str(i) for i in range(channels)]
+        self.factor = factor
+        if np.dtype(dtype).names:
+            self.raw = RecordBuffer(dtype, capacity)
+            tier_dtype = np.float64
+        else:
+            self.raw = HistoryBuffer(channels, capacity, dtype)
+            tier_dtype = np.result_type(dtype, np.float32)
+        # 每级按行存放 [min x channels, max x channels, mean x channels]
+        self.tiers = [HistoryBuffer(channels * 3, tier_capacity or capacity, tier_dtype)
+                      for _ in range(levels)]
+        self._aggregated = [0] * (levels + 1)  # 每一级已汇总到下一级的点数
+
+    def __len__(self):
+        return len(self.raw)
+
+    @property
+    def total(self):
+        return self.raw.total
+
+    generation = total
+
+    def snapshot(self, n=None):
+        """最近 n 个原始样本的一致只读视图, 见 HistoryBuffer.snapshot"""
+        return self.raw.snapshot(n)
+
+    def since(self, generation):
+        """第 generation 代之后的原始样本, 见 HistoryBuffer.since"""
+        return self.raw.since(generation)
+
+    def last(self, n=None):
+        """最近 n 个原始样本, 见 HistoryBuffer.last"""
+        return self.raw.last(n)
+
+    def latest(self):
+        return self.raw.latest()
+
+    def channel(self, data, index):
+        """取 snapshot/view/window 返回数据中的第 index 个通道 (原始记录为零拷贝的列视图)"""
+        if data.dtype.names:
+            return self.raw.column(data, index)
+        return data[index]
+
+    def clear(self):
+        self.raw.clear()
+        for tier in self.tiers:
+            tier.clear()
+        self._aggregated = [0] * len(self._aggregated)
+
+    def append(self, values, timestamp):
+        """追加一个样本"""
+        self.raw.append(values, timestamp)
+        if self.raw.total - self._aggregated[0] >= self.factor:
+            self._aggregate()
+
+    def extend(self, block, times):
+        """追加多个样本 (行数 x 通道数), 超过原始窗口的数据分段写入以免未汇总就被覆盖"""
+        step = max(self.raw.capacity - self.factor, 1)
+        for start in range(0, len(block), step):
+            self.raw.extend(block[start:start + step], times[start:start + step])
+            self._aggregate()
+
+    def _aggregate(self):
+        """把各级未汇总的完整分组汇总到下一级"""
+        source = self.raw
+        channels, factor = self.channels, self.factor
+        for level, tier in enumerate(self.tiers):
+            pending = source.total - self._aggregated[level]
+            if pending > len(source):
+                # 已被覆盖的数据无法再汇总
+                self._aggregated[level] += pending - len(source)
+                pending = len(source)
+            count = pending // factor
+            if not count:
+                return
+            times, data = source.last(pending)
+            data = source.matrix(data)
+            n = count * factor
+            times = times[:n].reshape(count, factor)
+            data = data[:, :n].reshape(len(data), count, factor)
+            # fmin/fmax 忽略 NaN (缺失的值)
+            if level == 0:
+                lo, hi = np.fmin.reduce(data, axis=2), np.fmax.reduce(data, axis=2)
+                mean = data
+            else:
+                lo = np.fmin.reduce(data[:channels], axis=2)
+                hi = np.fmax.reduce(data[channels:2 * channels], axis=2)
+                mean = data[2 * channels:]
+            mean = _nanmean(mean, 2) if mean.dtype.kind == 'f' else mean.mean(axis=2)
+            # 汇总点的时间取组内最后一个样本的时间, 之后的数据都尚未汇总
+            tier.extend(np.concatenate((lo, hi, mean)).T, times[:, -1])
+            self._aggregated[level] += n
+            source = tier
+
+    def _level_data(self, level):
+        """第 level 级的 (时间, 最小值, 最大值, 平均值), 第 0 级为原始样本"""
+        if level == 0:
+            times, data = self.raw.last()
+            data = self.raw.matrix(data)
+            return times, data, data, data
+        times, data = self.tiers[level - 1].last()
+        channels = self.channels
+        return times, data[:channels], data[channels:2 * channels], data[2 * channels:]
+
+    def view(self, t0=None, t1=None, max_points=2000, mean=False):
+        """
+        返回时间范围 [t0, t1] (None 表示不限) 内的 (时间, 通道数 x 点数数组, 级别)
+        选取点数不超过 max_points 的最细一级; 汇总级默认以 min/max 交替输出 (同一时间两个点),
+        保留尖峰, mean=True 时输出平均值; 该级尚未汇总的最新数据由更细的级别补齐
+        """
+        levels = len(self.tiers) + 1
+        level = levels - 1
+        for candidate in range(levels):
+            times = self._level_data(candidate)[0]
+            if not len(times):
+                level = max(candidate - 1, 0)
+                break
+            covers = t0 is not None and times[0] <= t0
+            if candidate < levels - 1 and not covers and self._level_has_older(candidate):
+                continue
+            first = 0 if t0 is None else np.searchsorted(times, t0)
+            last = len(times) if t1 is None else np.searchsorted(times, t1, side='right')
+            if last - first <= max_points:
+                level = candidate
+                break
+
+        parts_t, parts_v = [], []
+        cut = -np.inf if t0 is None else t0
+        for lvl in range(level, -1, -1):
+            times, lo, hi, avg = self._level_data(lvl)
+            first = np.searchsorted(times, cut, side='right' if parts_t else 'left')
+            # 包含覆盖 t1 的那个点 (汇总点的时间为组内最后一个样本的时间)
+            last = len(times) if t1 is None else min(np.searchsorted(times, t1) + 1, len(times))
+            if last <= first:
+                continue
+            times = times[first:last]
+            if lvl == 0 or mean:
+                values = (avg if lvl else lo)[:, first:last]
+            else:
+                values = np.empty((self.channels, 2 * len(times)), dtype=lo.dtype)
+                values[:, 0::2] = lo[:, first:last]
+                values[:, 1::2] = hi[:, first:last]
+                times = np.repeat(times, 2)
+            parts_t.append(times)
+            parts_v.append(values)
+            cut = times[-1]
+            if t1 is not None and cut >= t1:
+                break
+
+        if not parts_t:
+            return np.empty(0), np.empty((self.channels, 0)), level
+        if len(parts_t) == 1:
+            return parts_t[0], parts_v[0], level
+        return np.concatenate(parts_t), np.concatenate(parts_v, axis=1), level
+
+    def window(self, span, max_points=MAX_PLOT_POINTS):
+        """
+        按显示范围取数据: span 为 0 时返回原始样本窗口, None 时返回整个会话, 否则返回最近 span 秒
+        返回值同 view (原始样本窗口为未经转换的数据, 用 channel() 取各通道)
+        """
+        if span == 0:
+            times, data = self.raw.last()
+            return times, data, 0
+        if span is None or not len(self.raw):
+            return self.view(None, None, max_points)
+        return self.view(self.raw.last(1)[0][-1] - span, None, max_points)
+
+    def _level_has_older(self, level):
+        """更粗的级别中是否有比第 level 级最早数据更早的数据"""
+        times = self._level_data(level)[0]
+        coarse = self._level_data(level + 1)[0]
+        return len(coarse) and coarse[0] < times[0]
+
+    def adopt(self, other):
+        """
+        按通道名称接收另一个 TieredHistory 的全部数据 (字段配置变化时保留历史),
+        新增的通道在已有数据中标记为缺失 (原始记录的 valid 为 False, 汇总级为 NaN)
+        """
+        mapping = [other.names.index(name) if name in other.names else None for name in self.names]
+        channels, old_channels = self.channels, other.channels
+
+        # 原始样本
+        times, data = other.raw.last()
+        source = other.raw.matrix(data).astype(np.float64)
+        values = np.full((channels, len(times)), np.nan)
+        for i, j in enumerate(mapping):
+            if j is not None:
+                values[i] = source[j]
+        valid = ~np.isnan(values)
+        if isinstance(self.raw, RecordBuffer):
+            block = np.zeros(len(times), dtype=self.raw.value_dtype)
+            for i, name in enumerate(self.raw.fields):
+                block[name] = np.where(valid[i], values[i], 0)
+            self.raw.extend(block, times, valid.T)
+        else:
+            self.raw.extend(np.where(valid, values, 0).T, times)
+
+        # 汇总级
+        for old_tier, tier in zip(other.tiers, self.tiers):
+            times, data = old_tier.last()
+            block = np.full((channels * 3, len(times)), np.nan)
+            for i, j in enumerate(mapping):
+                if j is not None:
+                    block[i::channels] = data[j::old_channels]
+            tier.extend(block.T, times)
+
+        # 各级尚未汇总的点数保持不变
+        sources = [self.raw] + self.tiers
+        old_sources = [other.raw] + other.tiers
+        for level in range(len(self.tiers)):
+            pending = old_sources[level].total - other._aggregated[level]
+            self._aggregated[level] = max(sources[level].total - pending, 0)
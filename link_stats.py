@@ -0,0 +1,172 @@
+import time
+
+import numpy as np
+
+# 可选波特率 (常用 USB转TTL 最高支持 3M, STM32F103 的 USART1 最高 4.5M)
+BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600,
+              1000000, 1500000, 2000000, 3000000)
+DEFAULT_BAUDRATE = 115200
+MAX_BAUDRATE = 3000000
+BITS_PER_BYTE = 10  # 8N1: 起始位 + 8 数据位 + 停止位
+
+
+def parse_baudrate(text):
+    """把界面/命令行输入的波特率转换为整数, 非法时抛出 ValueError"""
+    baudrate = int(str(text).strip())
+    if not 0 < baudrate <= MAX_BAUDRATE:
+        raise ValueError(f"波特率超出范围 (1 ~ {MAX_BAUDRATE}): {baudrate}")
+    return baudrate
+
+
+def spread_samples(t, prev, counts, lengths, byte_ns):
+    """
+    多样本帧 (批量帧、差分帧) 的逐样本时间戳 (ns), 接收线程 (ReadClock) 和离线解码共用
+    t: 各帧帧尾的时间; prev: 各帧之前一帧的时间; counts: 各帧的样本数; lengths: 各帧的字节数;
+    byte_ns: 每字节的传输时间 (标量或逐帧数组)
+    每帧的样本均匀分布在帧首与帧尾之间, 帧首取 max(上一帧, 帧尾 - 帧长 * 每字节时间):
+    空闲一段时间后的第一帧只占其自身的传输时间, 不会被摊到整个空闲时段; 单样本帧即为帧尾时间
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    start = np.maximum(prev, t - np.asarray(lengths, dtype=np.float64) * byte_ns)
+    step = (t - start) / np.maximum(counts, 1)
+    index = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    return np.repeat(start, counts) + np.repeat(step, counts) * index
+
+
+class LinkMeter:
+    """
+    串口链路利用率统计
+    接收线程累加字节数/帧数/解码耗时, 界面线程定期调用 rates() 取两次调用之间的速率;
+    解码负载接近 100% 或驱动积压持续增长说明 _receive_data 跟不上线速
+    """
+
+    def __init__(self, baudrate, bits_per_byte=BITS_PER_BYTE):
+        self.baudrate = baudrate
+        self.line_rate = baudrate / bits_per_byte  # 理论字节/s
+
+        # 累计值 (只由接收线程写)
+        self.total_bytes = 0
+        self.total_frames = 0
+        self.total_samples = 0
+        self.busy_time = 0.0   # 解码耗时 (s)
+        self.backlog = 0       # 统计周期内驱动缓冲区积压的峰值 (字节)
+
+        self._last = (time.perf_counter(), 0, 0, 0, 0.0)
+
+    def add_read(self, size, backlog=0):
+        """记录一次串口读取, backlog 为读取时驱动缓冲区中等待的字节数"""
+        self.total_bytes += size
+        if backlog > self.backlog:
+            self.backlog = backlog
+
+    def add_frames(self, frames, samples=None):
+        """记录解码得到的帧数 (批量帧一帧含多个样本)"""
+        self.total_frames += frames
+        self.total_samples += frames if samples is None else samples
+
+    def add_busy(self, seconds):
+        self.busy_time += seconds
+
+    def rates(self):
+        """
+        返回自上次调用以来的链路统计:
+        (字节/s, 帧/s, 样本/s, 占理论线速的百分比, 解码负载百分比, 积压峰值字节数)
+        """
+        now = time.perf_counter()
+        last_time, last_bytes, last_frames, last_samples, last_busy = self._last
+        elapsed = now - last_time
+        if elapsed <= 0:
+            return 0.0, 0.0, 0.0, 0.0, 0.0, 0
+        byte_rate = (self.total_bytes - last_bytes) / elapsed
+        frame_rate = (self.total_frames - last_frames) / elapsed
+        sample_rate = (self.total_samples - last_samples) / elapsed
+        load = (self.busy_time - last_busy) / elapsed * 100
+        backlog, self.backlog = self.backlog, 0
+        self._last = (now, self.total_bytes, self.total_frames, self.total_samples, self.busy_time)
+        return byte_rate, frame_rate, sample_rate, byte_rate / self.line_rate * 100, load, backlog
+
+    def summary(self):
+        """rates() 的单行文字形式"""
+        byte_rate, frame_rate, sample_rate, usage, load, backlog = self.rates()
+        return (f"{byte_rate / 1024:.1f} KB/s, {frame_rate:.0f} 帧/s, {sample_rate:.0f} 样本/s, "
+                f"线速 {usage:.0f}%, 解码负载 {load:.0f}%, 积压 {backlog} 字节")
+
+
+class ReadClock:
+    """
+    读取时刻时间戳
+    每次串口读取后用 perf_counter_ns 记录时刻, 块内各帧按其帧尾在字节流中的位置,
+    以最近测得的字节速率 (不快于理论线速) 从读取时刻往前插值; 时间戳为相对会话开始的秒数,
+    单调不减, 不受系统时钟调整影响; 传入 origin 时沿用该时钟的时间轴 (重新连接后历史数据时间连续)
+    start_ns 为初始时刻 (默认为创建时); 回放和离线解码传入 0, 使同一抓取文件得到的时间戳完全相同
+    """
+
+    def __init__(self, baudrate, bits_per_byte=BITS_PER_BYTE, window_ns=500_000_000, origin=None, start_ns=None):
+        self.line_byte_ns = bits_per_byte * 1e9 / baudrate  # 理论线速下每字节的时间
+        self.byte_ns = self.line_byte_ns                    # 当前估计的每字节时间
+        self.window_ns = window_ns                          # 字节速率的统计周期
+        if origin is None:
+            self.start_time = time.time()                   # 会话开始的系统时间 (仅供导出参考)
+            self._t0 = time.perf_counter_ns()
+        else:
+            self.start_time = origin.start_time
+            self._t0 = origin._t0
+        now = time.perf_counter_ns() - self._t0 if start_ns is None else start_ns
+
+        self.offset = 0          # 已读取的字节总数
+        self.read_ns = now       # 最近一次读取的时刻
+        self.prev_read_ns = now  # 上一次读取的时刻
+        self.last_ns = now       # 最近分配出的时间戳
+        self._window = (now, 0)  # 字节速率统计周期的起点 (时刻, 字节数)
+
+    def now(self):
+        """当前时刻 (相对会话开始的秒数), 用于给发送等事件打时间戳"""
+        return (time.perf_counter_ns() - self._t0) / 1e9
+
+    def on_read(self, size, now=None):
+        """
+        在串口读取返回后立即调用, 记录本次读取的时刻和字节数
+        now 为读取时刻 (相对会话开始的 ns), 回放抓取文件时传入抓取时的时刻
+        """
+        if now is None:
+            now = time.perf_counter_ns() - self._t0
+        self.prev_read_ns, self.read_ns = self.read_ns, now
+        self.offset += size
+        start_ns, start_offset = self._window
+        if now - start_ns >= self.window_ns:
+            received = self.offset - start_offset
+            if received:
+                self.byte_ns = max(self.line_byte_ns, (now - start_ns) / received)
+            self._window = (now, self.offset)
+
+    def frame_time(self, end):
+        """帧尾位于字节流 end 处的单个帧的时间戳 (s)"""
+        t = self.read_ns - (self.offset - end) * self.byte_ns
+        # 帧在上一次读取之后才完整到达
+        t = max(t, self.prev_read_ns, self.last_ns)
+        self.last_ns = t
+        return t / 1e9
+
+    def frame_times(self, ends, counts=None, lengths=None):
+        """
+        多个帧的时间戳数组 (s), ends 为各帧帧尾在字节流中的位置
+        counts 为各帧包含的样本数、lengths 为各帧的字节数时, 返回逐样本的时间戳 (见 spread_samples,
+        帧首按理论线速由帧长推算); 未传入 lengths 时各帧的样本都取帧尾时间
+        """
+        ends = np.asarray(ends, dtype=np.float64)
+        if not len(ends):
+            return ends
+        t = self.read_ns - (self.offset - ends) * self.byte_ns
+        t = np.maximum.accumulate(np.maximum(t, max(self.prev_read_ns, self.last_ns)))
+        if counts is not None:
+            prev = np.concatenate(([self.last_ns], t[:-1]))
+            samples = spread_samples(t, prev, counts, np.zeros(len(t)) if lengths is None else lengths,
+                                     self.line_byte_ns)
+        else:
+            samples = t
+        self.last_ns = t[-1]
+        return samples / 1e9
+
+    def block_times(self, start, size, count):
+        """从字节流 start 处开始、共 size 字节的 count 个连续帧的时间戳数组 (s)"""
+        return self.frame_times(start + size * np.arange(1, count + 1) / max(count, 1))
@@ -0,0 +1,383 @@
+"""
+抓取文件 (.zcap) 的多进程离线解码, 结果写入录制文件 (.zrec) 或归档文件 (.zarc)
+字节流按长度切分为若干段, 段起点选在帧头 (AA 55) 处连续几帧长度、帧尾和校验都正确的位置; 各段在进程池中解码, 按顺序合并
+解码规则与 pid_ui 接收线程相同 (向量化批量解码 + 逐帧解析状态帧/批量帧/差分帧); 合并时检查相邻两段的衔接:
+前一段结束处的分帧位置与后一段起点不同, 或后一段的结果依赖段起点处未知的校验方式/差分基准时, 该段在主进程中按顺序重新解码,
+因此结果与从头顺序解码完全一致. 时间戳在合并时按抓取的读取时刻计算, 与回放 (ReadClock, 起点为 0) 相同
+用法: python offline_decode.py recordings/xxx.zcap [输出文件.zrec/.zarc] [-j 进程数]
+"""
+import os
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+import pid_frames
+from checksum import XOR_CHECK, CRC16_CHECK, FRAME_CHECKS
+from frame_codec import (BATCH_MAX_LEN, DELTA_MIN_LEN, FRAME_HEADER, FRAME_TAIL, FRAME_KEY_FLAG, STATUS_SAMPLE_DTYPE,
+                         StatusFrameDecoder, BulkFrameDecoder, BatchFrameDecoder, DeltaFrameDecoder,
+                         is_batch_frame, is_delta_frame, status_dtype)
+from framer import RingFramer
+from capture import CaptureIndex, read_segments
+from link_stats import DEFAULT_BAUDRATE, ReadClock, spread_samples
+from recorder import RECORD_SUFFIX, SessionRecorder
+from archive import ARCHIVE_SUFFIX, ArchiveWriter
+
+DECODE_CHUNK_BYTES = 4 * 1024 * 1024  # 每段的目标长度
+DECODE_BULK_BYTES = 65536             # 每次向量化解码的最大字节数
+DECODE_SYNC_FRAMES = 2                # 段起点处需要连续正确的帧数
+DECODE_SYNC_SEARCH = 65536            # 查找段起点时每次读取的字节数
+DECODED_SUFFIX = '_decoded'           # 默认输出文件名后缀 (避免覆盖同名的录制文件)
+INITIAL_STATE = (XOR_CHECK.mode, (None, None))  # 接收线程的初始状态: 异或校验, 无差分基准
+
+
+class DecodedRange:
+    """一段字节流的解码结果, 可在进程间传递"""
+
+    def __init__(self, begin):
+        self.begin = begin   # 段起点 (字节流位置)
+        self.stop = begin    # 解码结束处下一帧的起点; 与下一段的起点相同时两段衔接一致
+        self.ends = []       # 逐帧帧尾位置
+        self.counts = []     # 逐帧样本数
+        self.lengths = []    # 逐帧字节数 (批量帧、差分帧的样本分布在该帧的传输时间内; 单样本帧为 0)
+        self.running = []    # 逐帧 running
+        self.blocks = []     # 样本数据块 (行数 x 13, int16)
+        self.check = None    # 段内确定的校验方式, None 表示沿用段起点的状态
+        self.delta = None    # 段内确定的差分基准, None 表示沿用段起点的状态
+        self.depends = False  # 解码结果依赖段起点处的未知状态
+        self.bad = 0         # 校验或长度错误的帧数
+        self.bad_frames = 0  # 分帧时长度字节或帧尾错误的次数
+        self.dropped_bytes = 0
+
+    @property
+    def frames(self):
+        return len(self.ends)
+
+
+class RangeDecoder:
+    """
+    按接收线程的规则解码一段字节流
+    state 为段起点处的 (校验方式, 差分基准); 为 None 时按初始状态解码, 并在结果依赖该状态时标记 depends
+    """
+
+    def __init__(self, begin, state=None):
+        self.result = DecodedRange(begin)
+        mode, delta = state or INITIAL_STATE
+        self.check = FRAME_CHECKS[mode]
+        self.check_known = self.delta_known = state is not None
+        self.status_decoders = {}
+        self.bulk_decoders = {}
+        self.batch_decoders = {}
+        for check in (XOR_CHECK, CRC16_CHECK):
+            self.status_decoders[check.mode] = StatusFrameDecoder(check)
+            self.bulk_decoders[check.mode] = BulkFrameDecoder(status_dtype(check), check)
+            self.batch_decoders[check.mode] = BatchFrameDecoder(STATUS_SAMPLE_DTYPE, check)
+        self.delta_decoder = DeltaFrameDecoder()
+        self.delta_decoder.set_state(delta)
+
+    def run(self, data, boundary):
+        """解码 data (段起点开始的原始字节), 只保留起点在 boundary 之前的帧"""
+        result = self.result
+        limit = boundary - result.begin
+        framer = RingFramer(capacity=max(len(data), 1), min_length=DELTA_MIN_LEN, max_length=BATCH_MAX_LEN)
+        framer.feed(data)
+        stop = None
+        more = True
+        while more and stop is None and framer.offset < limit:
+            self._decode_bulk(framer, limit)
+            more = False
+            for frame in framer.frames():
+                start = framer.offset - len(frame)
+                if start >= limit:
+                    stop = start  # 跳过无效帧头后找到的帧属于下一段
+                    break
+                self._parse_frame(frame, result.begin + framer.offset)
+                if framer.offset >= limit or self._bulk_ready(framer):
+                    more = True
+                    break
+        result.stop = result.begin + (framer.offset if stop is None else stop)
+        result.bad_frames = framer.bad_frames
+        result.dropped_bytes = framer.dropped_bytes
+        if self.check_known:
+            result.check = self.check.mode
+        if self.delta_known:
+            result.delta = self.delta_decoder.state()
+        return result
+
+    def _bulk_ready(self, framer):
+        """下一帧为当前校验方式的状态帧时才尝试向量化解码"""
+        pending = framer.pending()
+        return len(pending) > 2 and pending[0] == FRAME_HEADER[0] and pending[2] == self.bulk_decoders[self.check.mode].size
+
+    def _decode_bulk(self, framer, limit):
+        """从当前位置起背靠背的状态帧一次向量化解码 (与接收线程积压时相同)"""
+        decoder = self.bulk_decoders[self.check.mode]
+        size = decoder.size
+        while framer.sync() and self._bulk_ready(framer):
+            window = framer.pending()[:min(limit - framer.offset, DECODE_BULK_BYTES)]
+            if len(window) < size:
+                return
+            records, consumed, bad = decoder.decode(window)
+            # 只接受从当前位置开始、中间没有噪声和错误帧的部分, 各帧的帧尾位置才是确定的
+            if not consumed or bad or consumed != len(records) * size:
+                return
+            end = self.result.begin + framer.offset
+            framer.consume(consumed)
+            self.check_known = True
+            self._add_rows(range(end + size, end + consumed + 1, size), records['running'], records['channels'])
+
+    def _parse_frame(self, frame, end):
+        """与 pid_ui.Trans._parse_status_frame 相同的逐帧解析"""
+        if is_batch_frame(frame):
+            for decoder in self.batch_decoders.values():
+                if decoder.frame_len(frame[4]) == len(frame):
+                    break
+            else:
+                self.result.bad += 1
+                return
+            decoded = decoder.decode(frame)
+            if decoded is None:
+                self.result.bad += 1
+                return
+            self._set_check(decoder.check)
+            running, samples = decoded
+            self._add_frame(end, len(frame), running, samples['channels'])
+        elif is_delta_frame(frame):
+            other = CRC16_CHECK if self.check is XOR_CHECK else XOR_CHECK
+            if not self.check_known and self.check.verify(frame) and other.verify(frame):
+                self.result.depends = True  # 两种校验都正确时结果取决于当前校验方式
+            for check in (self.check, other):
+                decoded = self.delta_decoder.decode(frame, check)
+                if decoded is not None:
+                    break
+            else:
+                self.result.bad += 1
+                return
+            self._set_check(check)
+            if frame[3] & FRAME_KEY_FLAG:
+                self.delta_known = True
+            elif not self.delta_known:
+                self.result.depends = True  # 非关键帧需要段起点之前的差分基准
+            running, rows = decoded
+            self._add_frame(end, len(frame), running, rows.astype(np.int16))
+        else:
+            for decoder in self.status_decoders.values():
+                if decoder.size == len(frame):
+                    break
+            else:
+                self.result.bad += 1
+                return
+            row = decoder.decode(frame)
+            if row is None:
+                self.result.bad += 1
+                return
+            self._set_check(decoder.check)
+            self._add_rows((end,), (row[0],), np.array((row[1:],), dtype=np.int16))
+
+    def _set_check(self, check):
+        self.check = check
+        self.check_known = True
+
+    def _add_rows(self, ends, running, block):
+        """逐帧一个样本的状态帧"""
+        result = self.result
+        result.ends.extend(ends)
+        result.counts.extend([1] * len(block))
+        result.lengths.extend([0] * len(block))
+        result.running.extend(np.asarray(running, dtype=bool).tolist())
+        result.blocks.append(np.array(block, dtype=np.int16))
+
+    def _add_frame(self, end, length, running, block):
+        """一帧多个样本的批量帧/差分帧"""
+        result = self.result
+        result.ends.append(end)
+        result.counts.append(len(block))
+        result.lengths.append(length)
+        result.running.append(bool(running))
+        result.blocks.append(np.array(block, dtype=np.int16))
+
+
+def decode_range(data, begin, boundary, state=None):
+    """解码字节流中从 begin 开始的一段; data 需包含 boundary 之后至少一个最长帧的字节"""
+    return RangeDecoder(begin, state).run(data, boundary)
+
+
+def _decode_task(task):
+    """进程池中执行: 从抓取文件读取一段字节流并解码"""
+    path, data_pos, sizes, skip, length, begin, boundary, state = task
+    return decode_range(read_segments(path, data_pos, sizes, skip, length), begin, boundary, state)
+
+
+_STATUS_DECODERS = [StatusFrameDecoder(check) for check in FRAME_CHECKS.values()]
+_BATCH_DECODERS = [BatchFrameDecoder(STATUS_SAMPLE_DTYPE, check) for check in FRAME_CHECKS.values()]
+
+
+def frame_length(data, pos):
+    """data[pos:] 处完整且正确的帧的长度, 否则返回 0"""
+    if data[pos:pos + 2] != FRAME_HEADER or pos + 3 > len(data):
+        return 0
+    length = data[pos + 2]
+    if not DELTA_MIN_LEN <= length <= BATCH_MAX_LEN or pos + length > len(data) or data[pos + length - 1] != FRAME_TAIL:
+        return 0
+    frame = data[pos:pos + length]
+    if is_batch_frame(frame):
+        ok = any(decoder.decode(frame) is not None for decoder in _BATCH_DECODERS)
+    elif is_delta_frame(frame):
+        ok = any(check.verify(frame) for check in FRAME_CHECKS.values())
+    else:
+        ok = any(decoder.size == length and decoder.decode(frame) is not None for decoder in _STATUS_DECODERS)
+    return length if ok else 0
+
+
+def find_sync(data, offset=0):
+    """
+    data 中从 offset 开始第一个可作为段起点的位置: 从该处起连续 DECODE_SYNC_FRAMES 帧完整且正确,
+    且第一帧不是差分非关键帧 (不依赖之前的差分基准); 没有时返回 -1
+    """
+    pos = data.find(FRAME_HEADER, offset)
+    while pos >= 0:
+        head = data[pos:pos + BATCH_MAX_LEN]
+        if not (is_delta_frame(head) and not head[3] & FRAME_KEY_FLAG):
+            end = pos
+            for _ in range(DECODE_SYNC_FRAMES):
+                length = frame_length(data, end)
+                if not length:
+                    break
+                end += length
+            else:
+                return pos
+        pos = data.find(FRAME_HEADER, pos + 1)
+    return -1
+
+
+def split_points(index, chunk_bytes=DECODE_CHUNK_BYTES):
+    """各段的起点 (第一段从 0 开始)"""
+    starts = [0]
+    total = index.total
+    target = chunk_bytes
+    while target < total:
+        begin = max(target, starts[-1] + 1)
+        data = index.read(begin, min(begin + DECODE_SYNC_SEARCH, total))
+        pos = find_sync(data)
+        if pos >= 0:
+            starts.append(begin + pos)
+        target += chunk_bytes
+    return starts
+
+
+class CaptureTimeline:
+    """按抓取的读取时刻计算帧时间戳, 与接收线程中 ReadClock 的计算完全相同"""
+
+    def __init__(self, index, baudrate):
+        clock = ReadClock(baudrate, start_ns=0)
+        prev_ns, byte_ns = [], []
+        for read_ns, size in zip(index.read_ns.tolist(), index.sizes.tolist()):
+            clock.on_read(size, read_ns)
+            prev_ns.append(clock.prev_read_ns)
+            byte_ns.append(clock.byte_ns)
+        self.read_ns = index.read_ns
+        self.ends = index.ends
+        self.prev_ns = np.array(prev_ns, dtype=np.float64)
+        self.byte_ns = np.array(byte_ns, dtype=np.float64)
+        self.line_byte_ns = clock.line_byte_ns
+        self.last_ns = 0.0  # 最近分配出的时间戳
+
+    def sample_times(self, ends, counts, lengths):
+        """逐帧帧尾位置/样本数/字节数 -> 逐样本时间戳 (s); 各段需按顺序调用"""
+        if not len(ends):
+            return np.zeros(0)
+        # 帧在帧尾所在的那次读取之后被解析
+        r = np.searchsorted(self.ends, ends, 'left')
+        t = self.read_ns[r] - (self.ends[r] - ends) * self.byte_ns[r]
+        t = np.maximum(np.maximum.accumulate(np.maximum(t, self.prev_ns[r])), self.last_ns)
+        prev = np.concatenate(([self.last_ns], t[:-1]))
+        self.last_ns = t[-1]
+        return spread_samples(t, prev, counts, lengths, self.line_byte_ns) / 1e9
+
+
+def decode_capture(path, target=None, workers=None, chunk_bytes=DECODE_CHUNK_BYTES):
+    """
+    多进程解码 pid_ui 的抓取文件, 写入录制文件 (默认) 或归档文件 (target 以 .zarc 结尾)
+    workers 为进程数 (默认 CPU 核数, 1 时不创建进程池); 返回统计信息字典
+    """
+    started = time.perf_counter()
+    index = CaptureIndex(path)
+    info = index.info
+    if info.get('tool', 'pid_ui') != 'pid_ui':
+        raise ValueError(f"只支持 pid_ui 的抓取文件: {path}")
+    if target is None:
+        target = os.path.splitext(path)[0] + DECODED_SUFFIX + RECORD_SUFFIX
+    workers = workers or os.cpu_count() or 1
+
+    total = index.total
+    starts = split_points(index, chunk_bytes)
+    bounds = starts[1:] + [total]
+    tasks = []
+    for i, (begin, boundary) in enumerate(zip(starts, bounds)):
+        end = min(boundary + BATCH_MAX_LEN, total)
+        tasks.append((path, *index.segments(begin, end), end - begin, begin, boundary,
+                      INITIAL_STATE if i == 0 else None))
+
+    timeline = CaptureTimeline(index, info.get('baudrate', DEFAULT_BAUDRATE))
+    names = info.get('names') or list(pid_frames.RX_NAMES)
+    header = {'tool': 'pid_ui', 'port': info.get('port'), 'baudrate': info.get('baudrate'),
+              'start_time': info.get('start_time'), 'source': os.path.basename(path)}
+    if target.lower().endswith(ARCHIVE_SUFFIX):
+        writer = ArchiveWriter(target, names, np.int16, info=header)
+    else:
+        writer = SessionRecorder(target, names, np.int16, info=header)
+
+    stats = {'path': target, 'bytes': total, 'chunks': len(tasks), 'redecoded': 0,
+             'frames': 0, 'samples': 0, 'bad': 0, 'bad_frames': 0}
+    pool = multiprocessing.Pool(workers) if workers > 1 and len(tasks) > 1 else None
+    try:
+        results = pool.imap(_decode_task, tasks) if pool is not None else map(_decode_task, tasks)
+        mode, delta = INITIAL_STATE
+        stop = 0
+        for boundary, result in zip(bounds, results):
+            if result.begin != stop or result.depends:
+                # 与前一段衔接不一致, 从前一段实际结束处按已知状态重新解码
+                end = min(boundary + BATCH_MAX_LEN, total)
+                result = decode_range(index.read(stop, end), stop, boundary, (mode, delta))
+                stats['redecoded'] += 1
+            mode = result.check if result.check is not None else mode
+            delta = result.delta if result.delta is not None else delta
+            stop = result.stop
+            stats['frames'] += result.frames
+            stats['bad'] += result.bad
+            stats['bad_frames'] += result.bad_frames
+            if not result.frames:
+                continue
+
+            counts = np.array(result.counts, dtype=np.int64)
+            times = timeline.sample_times(np.array(result.ends, dtype=np.int64), counts, np.array(result.lengths))
+            keep = np.repeat(np.array(result.running, dtype=bool), counts)
+            block = np.concatenate(result.blocks)[keep]
+            writer.extend(block, times[keep])
+            stats['samples'] += len(block)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        writer.close()
+    stats['elapsed'] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程离线解码 pid_ui 的抓取文件 (.zcap)")
+    parser.add_argument("source", help="抓取文件")
+    parser.add_argument("target", nargs="?", help=f"输出文件 ({RECORD_SUFFIX} 或 {ARCHIVE_SUFFIX}, "
+                                                  f"默认为抓取文件名加 {DECODED_SUFFIX}{RECORD_SUFFIX})")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="进程数 (默认 CPU 核数)")
+    parser.add_argument("--chunk", type=float, default=DECODE_CHUNK_BYTES / 1048576, help="每段的长度 (MB)")
+    args = parser.parse_args()
+    stats = decode_capture(args.source, args.target, args.jobs, int(args.chunk * 1048576))
+    print(f"{stats['path']}: {stats['samples']} 个样本, {stats['frames']} 帧, 校验错误 {stats['bad']}, "
+          f"{stats['chunks']} 段 (重新解码 {stats['redecoded']}), {stats['elapsed']:.2f} s, "
+          f"{stats['bytes'] / stats['elapsed'] / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
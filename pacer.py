@@ -0,0 +1,79 @@
+import time
+
+# 绘图刷新间隔 (s) 的范围: 下限由界面上选择的最高帧率决定, 上限保证画面最多落后这么久 (再加一次绘制的耗时)
+PLOT_MAX_FPS = 30
+PLOT_MIN_INTERVAL = 1 / PLOT_MAX_FPS
+PLOT_MAX_INTERVAL = 0.5
+PLOT_LOAD = 0.3               # 绘图最多占用界面线程时间的比例
+PLOT_FPS_CHOICES = (60, 30, 20, 10, 5)  # 界面上可选的最高帧率
+PLOT_STATS_WINDOW = 1.0       # 帧率和样本速率的统计周期 (s)
+
+
+class PlotPacer:
+    """
+    自适应绘图节拍, 配合单次定时器使用: 每次绘制后由 end() 给出下一次的间隔, 上一次绘制完成前不会再触发,
+    绘制变慢时直接少画几帧 (丢帧), 而不是让定时事件排队
+    间隔在 [min_interval, max_interval] 内选取: 不短于绘制耗时 / load (绘图占用界面线程的比例不超过 load),
+    也不短于新样本的平均到达间隔 (数据比帧率慢时没必要更频繁地刷新)
+    """
+
+    def __init__(self, min_interval=PLOT_MIN_INTERVAL, max_interval=PLOT_MAX_INTERVAL, load=PLOT_LOAD):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.load = load
+        self.interval = min_interval
+        self.draw_time = 0.0       # 一帧的耗时 (从 begin() 到 end(), 含界面重绘) 的平滑值 (s)
+        self.sample_period = None  # 新样本的平均到达间隔 (s), 尚未统计时为 None, 没有新样本时为 inf
+        self.fps = 0.0             # 实际帧率 (每秒重绘次数)
+        self.latency = None        # 最近一次绘制时屏幕上最新样本的年龄 (s)
+        self.dropped = 0           # 因绘制或界面线程繁忙而错过的帧数
+
+        now = time.perf_counter()
+        self._due = now + self.interval  # 本次定时器应触发的时刻
+        self._start = now
+        self._window = (now, 0, 0)       # 统计周期的起点 (时刻, 已绘制帧数, 样本总数)
+        self._frames = 0
+        self._total = 0
+
+    def set_max_fps(self, fps):
+        self.min_interval = 1 / fps
+
+    def begin(self):
+        """定时器触发时调用; 比预定时刻晚了不止一个间隔时, 错过的帧计入 dropped"""
+        self._start = time.perf_counter()
+        late = self._start - self._due
+        if late > self.interval:
+            self.dropped += int(late / self.interval)
+
+    def end(self, drawn, total=None, latency=None):
+        """
+        整帧绘制 (包括之后的界面重绘) 结束后调用, 返回下一次的间隔 (ms)
+        drawn: 本次是否重绘; total: 历史数据的样本总数 (用于统计样本速率, 未连接时为 None);
+        latency: 屏幕上最新样本的年龄 (s)
+        """
+        now = time.perf_counter()
+        if drawn:
+            self.draw_time += 0.2 * (now - self._start - self.draw_time)
+            self._frames += 1
+            self.latency = latency
+
+        total = total or 0
+        if total > self._total and self.sample_period == float('inf'):
+            self.sample_period = None  # 停顿后又有新样本, 不等统计周期结束就恢复刷新
+        self._total = total
+        start, frames, first_total = self._window
+        if now - start >= PLOT_STATS_WINDOW:
+            self.fps = (self._frames - frames) / (now - start)
+            received = total - first_total
+            self.sample_period = (now - start) / received if received > 0 else float('inf')
+            self._window = (now, self._frames, total)
+
+        interval = max(self.min_interval, self.draw_time / self.load, self.sample_period or 0)
+        self.interval = min(interval, self.max_interval)
+        self._due = now + self.interval
+        return int(self.interval * 1000)
+
+    def summary(self):
+        latency = f"{self.latency * 1000:.0f} ms" if self.latency is not None else "-"
+        return (f"{self.fps:.1f} FPS (间隔 {self.interval * 1000:.0f} ms), 耗时 {self.draw_time * 1000:.1f} ms, "
+                f"延迟 {latency}, 丢帧 {self.dropped}")
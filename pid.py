@@ -1,9 +1,15 @@
+import argparse
 import serial
+import serial.tools.list_ports
 import threading
-import struct
 import time
 import numpy as np
-import matplotlib.pyplot as plt 
+
+import pid_frames
+from framer import RingFramer
+from history import HistoryBuffer
+from link_stats import DEFAULT_BAUDRATE, LinkMeter, ReadClock, parse_baudrate
+from ratelog import DEBUG, INFO, WARNING, ERROR, log
 
 KP_P = 1.0
 KI_P = 0.0
@@ -17,8 +23,21 @@ KD_V = 0.0
 MAX_I_OUT_V = 10.0
 MAX_OUT_V = 50.0
 
+HISTORY_LENGTH = 20000  # 保留的样本数 (定长, 长时间运行内存和绘图耗时不增长), 应覆盖一个绘图窗口
+PLOT_INTERVAL = 0.2     # 绘图间隔 (s)
+STATS_INTERVAL = 1.0    # 打印状态和链路利用率的间隔 (s)
+LOG_LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+
+# 各子图: (标题, 纵轴标签, [(曲线名称, 通道序号, 颜色), ...]), 通道顺序同 pid_frames.RX_NAMES
+PLOT_PANELS = [
+    ('Motor Velocities', 'Velocity (cm/s)', [(f'motor_v_{i + 1}', i, c) for i, c in enumerate('rgby')]),
+    ('Linear Velocities', 'Velocity (cm/s)', [(f'v_{name}', 4 + i, None) for i, name in enumerate('xyz')]),
+    ('Positions', 'Position (cm)', [(f'pos_{name}', 7 + i, None) for i, name in enumerate('xyz')]),
+    ('Attitudes', 'Angle (mrad)', [(name, 10 + i, None) for i, name in enumerate(('roll', 'pitch', 'yaw'))]),
+]
+
 class Trans:
-    def __init__(self, port, baudrate = 115200):
+    def __init__(self, port, baudrate = DEFAULT_BAUDRATE):
         self.ser = None
         self.port = port
         self.baudrate = baudrate
@@ -59,65 +78,18 @@ class Trans:
         self.current_pitch = 0.0 # mrad
         self.current_yaw = 0.0 # mrad
 
+        self.link = LinkMeter(baudrate) # 链路利用率统计
+        self.clock = ReadClock(baudrate) # 读取时刻时间戳
+        # 最近 HISTORY_LENGTH 个样本 (接收线程写入, 主线程绘图, 无需加锁), 时间为相对会话开始的秒数
+        self.history = HistoryBuffer(pid_frames.RX_COUNT, HISTORY_LENGTH)
+
         if not self.port:
             self._auto_detect_port()
         # 连接串口
         if self.connect():
-            print("Connected to", self.port)
+            log.info("Connected to %s", self.port)
         else:
-            print("Failed to connect")
-
-        self.history_motor_v = [[], [], [], []]
-        self.history_v = [[], [], []]
-        self.history_pos = [[], [], []]
-        self.history_att = [[], [], []]
-        self.history_time = []
-
-        plt.ion()  # 启用交互式实时绘图
-        self.fig, self.ax = plt.subplots(2, 2, figsize=(12, 8))
-        
-        # 设置各子图的标题和标签
-        self.ax[0, 0].set_xlabel('Time')
-        self.ax[0, 0].set_ylabel('Velocity (cm/s)')
-        self.ax[0, 0].set_title('Motor Velocities')
-        self.ax[0, 0].grid(True)
-        
-        self.ax[0, 1].set_xlabel('Time')
-        self.ax[0, 1].set_ylabel('Velocity (cm/s)')
-        self.ax[0, 1].set_title('Linear Velocities')
-        self.ax[0, 1].grid(True)
-        
-        self.ax[1, 0].set_xlabel('Time')
-        self.ax[1, 0].set_ylabel('Position (cm)')
-        self.ax[1, 0].set_title('Positions')
-        self.ax[1, 0].grid(True)
-        
-        self.ax[1, 1].set_xlabel('Time')
-        self.ax[1, 1].set_ylabel('Angle (mrad)')
-        self.ax[1, 1].set_title('Attitudes')
-        self.ax[1, 1].grid(True)
-        
-        # 初始化各曲线
-        self.motor_line = [None] * 4
-        self.v_line = [None] * 3
-        self.pos_line = [None] * 3
-        self.att_line = [None] * 3
-        
-        colors = ['r', 'g', 'b', 'y']
-        for i in range(4):
-            self.motor_line[i], = self.ax[0, 0].plot([], [], color=colors[i], label=f'motor_v_{i+1}')
-        for i in range(3):
-            self.v_line[i], = self.ax[0, 1].plot([], [], label=f'v_{["x","y","z"][i]}')
-        for i in range(3):
-            self.pos_line[i], = self.ax[1, 0].plot([], [], label=f'pos_{["x","y","z"][i]}')
-        for i in range(3):
-            self.att_line[i], = self.ax[1, 1].plot([], [], label=f'{["roll","pitch","yaw"][i]}')
-        for i in range(2):
-            for j in range(2):
-                self.ax[i, j].legend()
-        
-        # 调整布局[6](@ref)
-        plt.tight_layout()
+            log.warning("Failed to connect")
 
     def _auto_detect_port(self):
         """自动检测可能的USB串口设备"""
@@ -125,7 +97,7 @@ class Trans:
         for port in ports:
             if 'USB' in port.description or 'Serial' in port.description:
                 self.port = port.device
-                print(f"自动选择串口: {self.port}")
+                log.info("自动选择串口: %s", self.port)
                 return
         raise Exception("未找到可用串口设备")
 
@@ -145,204 +117,161 @@ class Trans:
             self.recv_thread = threading.Thread(target=self._receive_data)
             self.recv_thread.daemon = True
             self.recv_thread.start()
-            print(f"已连接到 {self.port}")
+            log.info("已连接到 %s", self.port)
             return True
         except Exception as e:
-            print(f"连接失败: {e}")
+            log.error("连接失败: %s", e)
             return False
 
     def disconnect(self):
         """断开连接并清理资源"""
-        print("正在断开串口连接...")
+        log.info("正在断开串口连接...")
 
         if hasattr(self, 'recv_thread') and self.recv_thread.is_alive():
             try:
                 self.recv_thread.join(timeout=0.5)  # 等待接收线程结束
-                print("接收线程已停止")
+                log.info("接收线程已停止")
             except Exception as e:
-                print(f"等待接收线程时发生错误: {e}")
+                log.error("等待接收线程时发生错误: %s", e)
 
         # 关闭串口
         if hasattr(self, 'ser') and self.ser:
             try:
                 if self.ser.is_open:
-                    print("串口连接已关闭")
+                    log.info("串口连接已关闭")
             except Exception as e:
-                print(f"关闭串口时发生错误: {e}")
+                log.error("关闭串口时发生错误: %s", e)
             finally:
                 self.ser = None
 
     def send_data(self):
         """发送数据"""
         if not self.ser or not self.ser.is_open:
-            print("串口未连接，无法发送数据")
+            log.warning("串口未连接，无法发送数据")
 
-        data = bytearray(47)
-        data[0] = 0xAA  # 帧头
-        data[1] = 0x55  # 帧头
-        data[2] = 0x2F  # 字节数
-        data[3] = 0x00  # 保留位
-        data[4] = 0x00  # 保留位
+        # 帧格式由 specs/pid.json 生成 (pid_frames.py), 与下位机 pid_frames.h 一致
         if self.pid_position:
-            data[5:9] = struct.pack('<f', self.kp_p)
-            data[9:13] = struct.pack('<f', self.ki_p)
-            data[13:17] = struct.pack('<f', self.kd_p)
-            data[17:21] = struct.pack('<f', self.max_i_out_p)
-            data[21:25] = struct.pack('<f', self.max_out_p)
-        else :
-            for i in range(5, 25, 4):
-                data[i:i+4] = struct.pack('<f', 0.0)
+            values_p = (self.kp_p, self.ki_p, self.kd_p, self.max_i_out_p, self.max_out_p)
+        else:
+            values_p = (0.0,) * 5
         if self.pid_velocity:
-            data[25:29] = struct.pack('<f', self.kp_v)  
-            data[29:33] = struct.pack('<f', self.ki_v) 
-            data[33:37] = struct.pack('<f', self.kd_v)  
-            data[37:41] = struct.pack('<f', self.max_i_out_v) 
-            data[41:45] = struct.pack('<f', self.max_out_v) 
-        else :
-            for i in range(25, 45, 4):
-                data[i:i+4] = struct.pack('<f', 0.0)
+            values_v = (self.kp_v, self.ki_v, self.kd_v, self.max_i_out_v, self.max_out_v)
+        else:
+            values_v = (0.0,) * 5
+        data = pid_frames.encode_tx(values_p + values_v)
 
-        checksum = 0x00
-        for i in range(45):
-            checksum ^= data[i]
-        data[45] = checksum
-        data[46] = 0x5D  # 帧尾
-        
         try:
             self.ser.write(data)
             self.send_over = True
-            print("发送数据成功")
+            log.info("发送数据成功")
         except Exception as e:
-            print(f"发送数据失败: {e}")
+            log.error("发送数据失败: %s", e)
 
     def _receive_data(self):
         """接收线程函数，持续处理串口数据"""
-        buffer = bytearray()
+        framer = RingFramer(min_length=pid_frames.rx_size())
         while self.ser and self.ser.is_open:
             try:
-                data = self.ser.read(self.ser.in_waiting or 1)
+                waiting = self.ser.in_waiting
+                data = self.ser.read(waiting or 1)
                 if data:
-                    buffer.extend(data)
-                    
-                    while len(buffer) >= 31:
-                        # 查找帧头0xAA 0x55
-                        start_idx = buffer.find(b'\xAA\x55')
-                        if start_idx == -1:
-                            buffer.clear()
-                            break
-                            
-                        # 检查是否包含完整帧 (31字节)
-                        if len(buffer) < start_idx + 31:
-                            break
-                            
-                        # 提取帧数据
-                        frame = buffer[start_idx:start_idx+31]
-                        del buffer[:start_idx+31]  # 移除已处理数据
+                    self.clock.on_read(len(data))
+                    start = time.perf_counter()
+                    self.link.add_read(len(data), waiting)
+                    framer.feed(data)
+                    bad_frames = framer.bad_frames
 
-                        # 验证帧尾 (索引30应为0x5D)
-                        if frame[30] != 0x5D:
-                            print("警告: 无效帧尾")
-                            continue
-                            
-                        # 解析数据帧
-                        self._parse_status_frame(frame)
+                    # 逐帧解析, 不完整的帧留在缓冲区等待后续数据
+                    for frame in framer.frames():
+                        self._parse_status_frame(frame, framer.offset)
+
+                    # 验证帧尾
+                    if framer.bad_frames != bad_frames:
+                        log.count(WARNING, "无效帧尾 x%d", framer.bad_frames - bad_frames)
+                    self.link.add_busy(time.perf_counter() - start)
             except Exception as e:
-                print(f"接收错误: {e}")
+                log.error("接收错误: %s", e)
                 time.sleep(0.2)
 
-    def _parse_status_frame(self, frame):
+    def _parse_status_frame(self, frame, end):
         """
-        解析状态数据帧 (31字节)
-        帧结构: [0xAA, 0x55, running, motor_v_1_high, motor_v_1_low, motor_v_2_high, motor_v_2_low, 
-                motor_v_3_high, motor_v_3_low, motor_v_4_high, motor_v_4_low,
-                vx_high, vx_low, vy_high, vy_low, vz_high, vz_low, 
-                x_high, x_low, y_high, y_low, z_high, z_low,
-                roll_high, roll_low, pitch_high, pitch_low, yaw_high, yaw_low, checksum, 0x5D]
+        解析状态数据帧 (32字节, 小端序) 或多样本批量帧, end 为帧尾在接收字节流中的位置, 用于计算时间戳
+        帧结构: [0xAA, 0x55, 0x20, running, motor_v_1..4, vx, vy, vz, x, y, z, roll, pitch, yaw (均为int16), checksum, 0x5D]
+        批量帧: [0xAA, 0x55, 帧长, 0x80 | running, 样本数, 样本 (同上 13 个 int16) * 样本数, checksum, 0x5D]
         """
         if self.send_over == False:
             return
         try:
             # 解析数据
-            checksum = 0   
-            for i in range(28):
-                checksum ^= frame[i]
-            if checksum != frame[29]:
-                print("警告: 校验和错误")
-                return
-            self.running = bool(frame[2])
+            if frame[3] & pid_frames.RX_BATCH_FLAG:
+                result = pid_frames.decode_rx_batch(frame)
+                if result is None:
+                    log.count(WARNING, "校验和错误 x%d", 1)
+                    return
+                running, samples = result
+                self.link.add_frames(1, len(samples))
+            else:
+                fields = pid_frames.decode_rx(frame)
+                if fields is None:
+                    log.count(WARNING, "校验和错误 x%d", 1)
+                    return
+                running, samples = fields[0], (fields[1:],)
+                self.link.add_frames(1)
+            # 批量帧的各样本均匀分布在该帧的传输时间内
+            times = self.clock.frame_times((end,), (len(samples),), (len(frame),)).tolist()
+            self.running = bool(running)
             if self.running:
-                self.motor_v_1 = struct.unpack('>h', frame[3:5])[0]
-                self.motor_v_2 = struct.unpack('>h', frame[5:7])[0]
-                self.motor_v_3 = struct.unpack('>h', frame[7:9])[0]
-                self.motor_v_4 = struct.unpack('>h', frame[9:11])[0]
-                self.current_vx = struct.unpack('>h', frame[11:13])[0]
-                self.current_vy = struct.unpack('>h', frame[13:15])[0]
-                self.current_vz = struct.unpack('>h', frame[15:17])[0]
-                self.current_x = struct.unpack('>h', frame[17:19])[0]
-                self.current_y = struct.unpack('>h', frame[19:21])[0]
-                self.current_z = struct.unpack('>h', frame[21:23])[0]
-                self.current_roll = struct.unpack('>h', frame[23:25])[0]
-                self.current_pitch = struct.unpack('>h', frame[25:27])[0]
-                self.current_yaw = struct.unpack('>h', frame[27:29])[0]
-                print(f"运行状态: {self.running}")
-                print(f"电机速度: {self.motor_v_1} cm/s, {self.motor_v_2} cm/s, {self.motor_v_3} cm/s, {self.motor_v_4} cm/s")
-                print(f"当前速度: {self.current_vx} cm/s, {self.current_vy} cm/s, {self.current_vz} cm/s")
-                print(f"当前位置: {self.current_x} cm, {self.current_y} cm, {self.current_z} cm")
-                print(f"当前姿态: {self.current_roll} mrad, {self.current_pitch} mrad, {self.current_yaw} mrad")
-
-                # 更新历史数据
-                self.history_motor_v[0].append(self.motor_v_1)
-                self.history_motor_v[1].append(self.motor_v_2)
-                self.history_motor_v[2].append(self.motor_v_3)
-                self.history_motor_v[3].append(self.motor_v_4)
-                self.history_v[0].append(self.current_vx)
-                self.history_v[1].append(self.current_vy)
-                self.history_v[2].append(self.current_vz)
-                self.history_pos[0].append(self.current_x)
-                self.history_pos[1].append(self.current_y)
-                self.history_pos[2].append(self.current_z)
-                self.history_att[0].append(self.current_roll)
-                self.history_att[1].append(self.current_pitch)
-                self.history_att[2].append(self.current_yaw)
-                self.history_time.append(time.time())
+                # 更新历史数据, 当前值取最新的样本
+                for sample, current_time in zip(samples, times):
+                    self.history.append(sample, current_time)
+                (self.motor_v_1, self.motor_v_2, self.motor_v_3, self.motor_v_4,
+                 self.current_vx, self.current_vy, self.current_vz,
+                 self.current_x, self.current_y, self.current_z,
+                 self.current_roll, self.current_pitch, self.current_yaw) = samples[-1]
                     
         except Exception as e:
-            print(f"解析数据帧错误: {e}")
-    
-    def plt_show(self):
-        # 更新电机速度子图
-        for i in range(4):
-            self.motor_line[i].set_data(self.history_time, self.history_motor_v[i])
-        self.ax[0, 0].relim()
-        self.ax[0, 0].autoscale_view()
-        
-        # 更新线性速度子图
-        for i in range(3):
-            self.v_line[i].set_data(self.history_time, self.history_v[i])
-        self.ax[0, 1].relim()
-        self.ax[0, 1].autoscale_view()
-        
-        # 更新位置子图
-        for i in range(3):
-            self.pos_line[i].set_data(self.history_time, self.history_pos[i])
-        self.ax[1, 0].relim()
-        self.ax[1, 0].autoscale_view()
-        
-        # 更新姿态子图
-        for i in range(3):
-            self.att_line[i].set_data(self.history_time, self.history_att[i])
-        self.ax[1, 1].relim()
-        self.ax[1, 1].autoscale_view()
-        
-        # 重绘整个图框
-        self.fig.canvas.draw()
-        self.fig.canvas.flush_events()
+            log.error("解析数据帧错误: %s", e)
+
+    def print_status(self):
+        """打印最新的状态 (由主循环定期调用, 不在每帧打印, 以免输出拖慢接收)"""
+        print(f"运行状态: {self.running}")
+        print(f"电机速度: {self.motor_v_1} cm/s, {self.motor_v_2} cm/s, {self.motor_v_3} cm/s, {self.motor_v_4} cm/s")
+        print(f"当前速度: {self.current_vx} cm/s, {self.current_vy} cm/s, {self.current_vz} cm/s")
+        print(f"当前位置: {self.current_x} cm, {self.current_y} cm, {self.current_z} cm")
+        print(f"当前姿态: {self.current_roll} mrad, {self.current_pitch} mrad, {self.current_yaw} mrad")
 
 if __name__ == "__main__":
-    trans = Trans(port="COM5")  # 替换为实际串口
+    parser = argparse.ArgumentParser(description="PID调试工具 (无UI)")
+    parser.add_argument("port", nargs="?", default="COM5", help="串口 (默认 COM5, 传入空字符串则自动检测)")
+    parser.add_argument("-b", "--baudrate", type=parse_baudrate, default=DEFAULT_BAUDRATE,
+                        help=f"波特率 (默认 {DEFAULT_BAUDRATE}, 最高 3000000)")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="不绘图 (不导入 matplotlib), 只打印状态和链路利用率")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="info", help="日志级别 (默认 info)")
+    args = parser.parse_args()
+    log.level = LOG_LEVELS[args.log_level]
+
+    trans = Trans(port=args.port, baudrate=args.baudrate)
+    plotter = None
+    if not args.no_plot:
+        from blit_plot import BlitPlotter
+        plotter = BlitPlotter(PLOT_PANELS)
+    last_stats = time.time()
     while True:
-        time.sleep(0.2)
-        trans.plt_show()
+        time.sleep(PLOT_INTERVAL)
+        if plotter is not None:
+            if plotter.closed:
+                print("绘图窗口已关闭, 继续接收")
+                plotter = None
+            else:
+                plotter.update(*trans.history.last())
+        # 每秒打印一次状态和链路利用率
+        if time.time() - last_stats >= STATS_INTERVAL:
+            last_stats = time.time()
+            log.flush()
+            if trans.running:
+                trans.print_status()
+            print(f"链路: {trans.link.summary()}")
         if not trans.running:
             time.sleep(0.8)
             trans.send_data()
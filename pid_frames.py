@@ -0,0 +1,116 @@
+# 由 frame_spec.py 根据 pid.json 生成, 请勿手动修改
+import struct
+
+from checksum import XOR_CHECK
+
+FRAME_TAIL = 0x5D
+
+# 传出帧 (上位机 -> 下位机)
+TX_NAMES = ('KP_P', 'KI_P', 'KD_P', 'MAX_IOUT_P', 'MAX_OUT_P', 'KP_V', 'KI_V', 'KD_V', 'MAX_IOUT_V', 'MAX_OUT_V')
+TX_COUNT = 10
+TX_TYPE_IDS = (4, 4, 4, 4, 4, 4, 4, 4, 4, 4)
+TX_BODY = struct.Struct('<BBBBfBfBfBfBfBfBfBfBfBf')
+
+# 传入帧 (下位机 -> 上位机)
+RX_NAMES = ('motor_v_1', 'motor_v_2', 'motor_v_3', 'motor_v_4', 'vx', 'vy', 'vz', 'x', 'y', 'z', 'roll', 'pitch', 'yaw')
+RX_COUNT = 13
+RX_FORMAT = '<BBBBhhhhhhhhhhhhh'
+RX_SAMPLE = struct.Struct('<hhhhhhhhhhhhh')  # 批量帧中的一个样本
+RX_BATCH_FLAG = 0x80
+RX_BATCH_HEADER_LEN = 5
+
+_rx_layouts = {}
+
+
+def rx_layout(check=XOR_CHECK):
+    """传入帧的 struct 格式 (含校验位和帧尾)"""
+    layout = _rx_layouts.get(check.mode)
+    if layout is None:
+        layout = _rx_layouts[check.mode] = struct.Struct(RX_FORMAT + check.format + 'B')
+    return layout
+
+
+def tx_size(check=XOR_CHECK):
+    return TX_BODY.size + check.size + 1
+
+
+def rx_size(check=XOR_CHECK):
+    return rx_layout(check).size
+
+
+def encode_tx(values, check=XOR_CHECK):
+    """values 的顺序同 TX_NAMES, 返回完整的传出帧"""
+    body = TX_BODY.pack(0xAA, 0x55, TX_COUNT, 4, values[0], 4, values[1], 4, values[2], 4, values[3], 4, values[4], 4, values[5], 4, values[6], 4, values[7], 4, values[8], 4, values[9])
+    return check.seal(body, FRAME_TAIL)
+
+
+def decode_tx(buffer, offset=0, check=XOR_CHECK):
+    """解码传出帧, 返回各字段值组成的元组; 帧格式或校验错误时返回 None"""
+    if len(buffer) - offset < tx_size(check):
+        return None
+    fields = TX_BODY.unpack_from(buffer, offset)
+    if fields[0] != 0xAA or fields[1] != 0x55 or fields[2] != TX_COUNT or fields[3::2] != TX_TYPE_IDS:
+        return None
+    end = offset + TX_BODY.size
+    expected = int.from_bytes(buffer[end:end + check.size], 'little')
+    if buffer[end + check.size] != FRAME_TAIL or check.compute(buffer, offset, end) != expected:
+        return None
+    return fields[4::2]
+
+
+def encode_rx(running, values, check=XOR_CHECK):
+    """values 的顺序同 RX_NAMES, 返回完整的传入帧"""
+    layout = rx_layout(check)
+    body = struct.pack(RX_FORMAT, 0xAA, 0x55, layout.size, running, *values)
+    return check.seal(body, FRAME_TAIL)
+
+
+def decode_rx(buffer, offset=0, check=XOR_CHECK):
+    """解码传入帧, 返回 (running, 字段0, 字段1, ...); 帧格式或校验错误时返回 None"""
+    layout = rx_layout(check)
+    if len(buffer) - offset < layout.size:
+        return None
+    fields = layout.unpack_from(buffer, offset)
+    if fields[0] != 0xAA or fields[1] != 0x55 or fields[2] != layout.size or fields[-1] != FRAME_TAIL:
+        return None
+    if check.compute(buffer, offset, offset + layout.size - 1 - check.size) != fields[-2]:
+        return None
+    return fields[3:-2]
+
+
+def rx_batch_size(count, check=XOR_CHECK):
+    return RX_BATCH_HEADER_LEN + RX_SAMPLE.size * count + check.size + 1
+
+
+def rx_batch_capacity(check=XOR_CHECK):
+    """单个批量帧最多携带的样本数"""
+    return (255 - RX_BATCH_HEADER_LEN - check.size - 1) // RX_SAMPLE.size
+
+
+def encode_rx_batch(running, samples, check=XOR_CHECK):
+    """samples 中每个样本的字段顺序同 RX_NAMES, 返回一个批量传入帧"""
+    count = len(samples)
+    if not 0 < count <= rx_batch_capacity(check):
+        raise ValueError(f"批量帧样本数超出范围: {count}")
+    body = bytearray((0xAA, 0x55, rx_batch_size(count, check), RX_BATCH_FLAG | running, count))
+    for sample in samples:
+        body += RX_SAMPLE.pack(*sample)
+    return check.seal(body, FRAME_TAIL)
+
+
+def decode_rx_batch(buffer, offset=0, check=XOR_CHECK):
+    """解码批量传入帧, 返回 (running, [样本0, 样本1, ...]); 帧格式或校验错误时返回 None"""
+    if len(buffer) - offset <= RX_BATCH_HEADER_LEN:
+        return None
+    if buffer[offset] != 0xAA or buffer[offset + 1] != 0x55 or not buffer[offset + 3] & RX_BATCH_FLAG:
+        return None
+    count = buffer[offset + 4]
+    size = rx_batch_size(count, check)
+    if not 0 < count <= rx_batch_capacity(check) or buffer[offset + 2] != size or len(buffer) - offset < size:
+        return None
+    end = offset + size - 1 - check.size
+    expected = int.from_bytes(buffer[end:end + check.size], 'little')
+    if buffer[end + check.size] != FRAME_TAIL or check.compute(buffer, offset, end) != expected:
+        return None
+    samples = list(RX_SAMPLE.iter_unpack(buffer[offset + RX_BATCH_HEADER_LEN:end]))
+    return buffer[offset + 3] & 0x01, samples
@@ -2,7 +2,6 @@ import sys
 import serial
 import serial.tools.list_ports
 import threading
-import struct
 import time
 import numpy as np
 import csv
@@ -12,8 +11,24 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QLabel, QComboBox, QPushButton, QCheckBox, QLineEdit, 
                              QGroupBox, QGridLayout, QTextEdit, QFileDialog, QMessageBox)
 from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtGui import QIntValidator
 import pyqtgraph as pg
 
+from checksum import XOR_CHECK, CRC16_CHECK
+from frame_codec import (STATUS_FRAME_LEN, BATCH_MAX_LEN, DELTA_MIN_LEN, STATUS_SAMPLE_DTYPE,
+                         TELEMETRY_RAW, TELEMETRY_DELTA, StatusFrameDecoder, BulkFrameDecoder,
+                         BatchFrameDecoder, DeltaFrameDecoder, status_dtype, check_mode_frame,
+                         telemetry_mode_frame, is_batch_frame, is_delta_frame)
+from framer import RingFramer
+from history import TieredHistory, VIEW_SPANS, plot_points
+from pacer import PLOT_FPS_CHOICES, PLOT_MAX_FPS, PlotPacer
+from link_stats import BAUD_RATES, DEFAULT_BAUDRATE, MAX_BAUDRATE, LinkMeter, ReadClock, parse_baudrate
+from ratelog import LEVEL_NAMES, LOG_CAPACITY, WARNING, log
+from recorder import RECORD_DIR, SessionRecorder, session_path
+from capture import CAPTURE_SUFFIX, REPLAY_SPEEDS, CaptureWriter, ReplaySerial
+from exporter import Exporter, HistorySource, RecordingSource, export_filter, export_format
+import pid_frames
+
 # PID参数默认值
 KP_P = 1.0
 KI_P = 0.0
@@ -27,10 +42,20 @@ KD_V = 0.0
 MAX_I_OUT_V = 10.0
 MAX_OUT_V = 50.0
 
+# 缓冲区积压的帧数达到该值时改用 NumPy 批量解码
+BULK_MIN_FRAMES = 16
+
+# 13个通道的名称, 顺序与状态帧一致
+CHANNEL_NAMES = ["电机1速度", "电机2速度", "电机3速度", "电机4速度", "线性速度X", "线性速度Y", "线性速度Z",
+                 "位置X", "位置Y", "位置Z", "姿态Roll", "姿态Pitch", "姿态Yaw"]
+RECORD_PREFIX = "pid_ui"  # 录制文件名前缀
+
 class SerialMonitor(QMainWindow):
     def __init__(self):
         super().__init__()
         self.trans = None
+        self.last_trans = None  # 上一次连接, 重新连接时沿用其历史数据和时间轴
+        self.exporter = None    # 后台导出任务
         self.setWindowTitle("PID参数调试工具")
         self.setGeometry(100, 100, 1400, 900)
         
@@ -60,8 +85,10 @@ class SerialMonitor(QMainWindow):
         
         serial_layout.addWidget(QLabel("波特率:"), 1, 0)
         self.baud_combo = QComboBox()
-        self.baud_combo.addItems(['9600', '19200', '38400', '57600', '115200'])
-        self.baud_combo.setCurrentText('115200')
+        self.baud_combo.setEditable(True)  # 可直接输入列表外的波特率
+        self.baud_combo.addItems([str(rate) for rate in BAUD_RATES])
+        self.baud_combo.setCurrentText(str(DEFAULT_BAUDRATE))
+        self.baud_combo.setValidator(QIntValidator(1, MAX_BAUDRATE))
         serial_layout.addWidget(self.baud_combo, 1, 1)
         
         self.connect_btn = QPushButton("连接")
@@ -73,6 +100,45 @@ class SerialMonitor(QMainWindow):
         self.send_btn.clicked.connect(self.send_message)
         serial_layout.addWidget(self.send_btn, 2, 0, 1, 3)
 
+        # 校验方式 (需下位机支持, 下位机确认后才切换)
+        self.crc_cb = QCheckBox("CRC-16校验")
+        self.crc_cb.setChecked(False)
+        self.crc_cb.toggled.connect(self.change_check_mode)
+        serial_layout.addWidget(self.crc_cb, 3, 0, 1, 3)
+
+        # 差分压缩传输 (需下位机支持)
+        self.delta_cb = QCheckBox("压缩传输(差分)")
+        self.delta_cb.setChecked(False)
+        self.delta_cb.toggled.connect(self.change_telemetry_mode)
+        serial_layout.addWidget(self.delta_cb, 4, 0, 1, 2)
+        self.ratio_label = QLabel("压缩比: -")
+        serial_layout.addWidget(self.ratio_label, 4, 2)
+
+        # 链路利用率: 接收速率、解码帧率、占理论线速比例和解码负载
+        self.link_label = QLabel("链路: -")
+        self.link_label.setWordWrap(True)
+        serial_layout.addWidget(self.link_label, 5, 0, 1, 3)
+
+        # 录制: 每个样本写入 recordings 目录下的会话文件, 长时间运行内存不增长
+        self.record_cb = QCheckBox("录制到文件")
+        self.record_cb.setChecked(False)
+        self.record_cb.toggled.connect(self.toggle_recording)
+        serial_layout.addWidget(self.record_cb, 6, 0)
+
+        # 抓取: 串口原始字节连同读取时刻写入 .zcap 文件, 可不连接下位机回放
+        self.capture_cb = QCheckBox("抓取原始字节")
+        self.capture_cb.setChecked(False)
+        self.capture_cb.toggled.connect(self.toggle_capture)
+        serial_layout.addWidget(self.capture_cb, 6, 1, 1, 2)
+
+        self.replay_btn = QPushButton("回放抓取文件")
+        self.replay_btn.clicked.connect(self.start_replay)
+        serial_layout.addWidget(self.replay_btn, 7, 0, 1, 2)
+        self.speed_combo = QComboBox()
+        for name, speed in REPLAY_SPEEDS:
+            self.speed_combo.addItem(name, speed)
+        serial_layout.addWidget(self.speed_combo, 7, 2)
+
         control_layout.addWidget(serial_group)
 
         # PID模式选择组
@@ -145,22 +211,40 @@ class SerialMonitor(QMainWindow):
         
         self.save_btn = QPushButton("保存PID参数到CSV")
         self.save_btn.clicked.connect(self.save_pid_params)
-        self.receive_btn = QPushButton("保存传入数据到CSV")
+        self.receive_btn = QPushButton("保存传入数据")
         self.receive_btn.clicked.connect(self.receive_message)
         save_layout.addWidget(self.save_btn)
         save_layout.addWidget(self.receive_btn)
 
+        # 后台导出 (CSV/二进制), 勾选"持续导出"时导出已有数据后继续追加新数据
+        self.follow_cb = QCheckBox("持续导出")
+        save_layout.addWidget(self.follow_cb)
+        self.export_label = QLabel("导出: -")
+        save_layout.addWidget(self.export_label)
+
         control_layout.addWidget(save_group)
         
-        # 状态显示
+        # 状态显示: 最多保留 LOG_CAPACITY 行, 内容来自接收线程和界面共用的限速日志
         self.status_text = QTextEdit()
         self.status_text.setMaximumHeight(250)
         self.status_text.setReadOnly(True)
+        self.status_text.document().setMaximumBlockCount(LOG_CAPACITY)
+        self.log_total = 0  # 已显示的日志条数
+        self.log_level_combo = QComboBox()
+        for level, name in LEVEL_NAMES.items():
+            self.log_level_combo.addItem(name, level)
+        self.log_level_combo.setCurrentIndex(list(LEVEL_NAMES).index(log.level))
+        self.log_level_combo.currentIndexChanged.connect(self.change_log_level)
         control_layout.addWidget(serial_group)
         control_layout.addWidget(pid_mode_group)
         control_layout.addWidget(pid_params_group)
         control_layout.addWidget(save_group)
-        control_layout.addWidget(QLabel("状态信息:")) # 添加标签
+        status_layout = QHBoxLayout()
+        status_layout.addWidget(QLabel("状态信息:")) # 添加标签
+        status_layout.addStretch()
+        status_layout.addWidget(QLabel("日志级别:"))
+        status_layout.addWidget(self.log_level_combo)
+        control_layout.addLayout(status_layout)
         control_layout.addWidget(self.status_text)    # 添加文本框
         
         # 添加到主布局
@@ -169,6 +253,24 @@ class SerialMonitor(QMainWindow):
         # 右侧绘图区域
         plot_widget = QWidget()
         plot_layout = QVBoxLayout(plot_widget)
+
+        # 显示范围: 更早的数据按范围自动选用 min/max 汇总级别; 手动缩放后按可见范围选取
+        span_layout = QHBoxLayout()
+        span_layout.addWidget(QLabel("显示范围:"))
+        self.span_combo = QComboBox()
+        for name, span in VIEW_SPANS:
+            self.span_combo.addItem(name, span)
+        span_layout.addWidget(self.span_combo)
+        span_layout.addWidget(QLabel("最高帧率:"))
+        self.fps_combo = QComboBox()
+        for fps in PLOT_FPS_CHOICES:
+            self.fps_combo.addItem(f"{fps} FPS", fps)
+        self.fps_combo.setCurrentIndex(PLOT_FPS_CHOICES.index(PLOT_MAX_FPS))
+        span_layout.addWidget(self.fps_combo)
+        span_layout.addStretch()
+        self.render_label = QLabel("绘图: -")
+        span_layout.addWidget(self.render_label)
+        plot_layout.addLayout(span_layout)
         
         # 使用pyqtgraph创建绘图区域[1,5](@ref)
         self.plot_widget = pg.GraphicsLayoutWidget()
@@ -219,13 +321,39 @@ class SerialMonitor(QMainWindow):
         for i, label in enumerate(['Roll', 'Pitch', 'Yaw']):
             curve = self.attitude_plot.plot(pen=colors[i], name=label)
             self.attitude_curves.append(curve)
+
+        # 子图, 曲线及其对应的第一个状态帧通道
+        self.plot_groups = [
+            (self.motor_plot, self.motor_curves, 0),
+            (self.velocity_plot, self.velocity_curves, 4),
+            (self.position_plot, self.position_curves, 7),
+            (self.attitude_plot, self.attitude_curves, 10),
+        ]
+        # 只绘制可见范围内的点, 每个像素列保留最大/最小值 (不丢尖峰)
+        for plot, curves, first in self.plot_groups:
+            for curve in curves:
+                curve.setClipToView(True)
+                curve.setDownsampling(auto=True, method='peak')
+        self.plot_keys = [None] * len(self.plot_groups)  # 各子图上次绘制时的数据和范围, 未变化时跳过
+        self.plot_points = 0  # 最近一次绘制的数据点数
         
         main_layout.addWidget(plot_widget, 1)
         
-        # 设置定时器用于更新图表
+        # 设置定时器用于更新图表: 单次触发, 每次绘制后由 PlotPacer 按绘制耗时和数据速率安排下一次
+        self.plot_pacer = PlotPacer()
+        self.fps_combo.currentIndexChanged.connect(
+            lambda: self.plot_pacer.set_max_fps(self.fps_combo.currentData()))
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_plots)
-        self.timer.start(100)  # 每100ms更新一次图表
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.plot_tick)
+        self.timer.start(int(self.plot_pacer.interval * 1000))
+
+        self.link_timer = QTimer()
+        self.link_timer.timeout.connect(self.update_link_stats)
+        self.link_timer.start(1000)  # 每秒统计一次链路利用率
+
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.update_export)
 
         self.refresh_ports()
         
@@ -253,11 +381,15 @@ class SerialMonitor(QMainWindow):
             QMessageBox.warning(self, "警告", "请选择串口")
             return
         
-        baudrate = int(self.baud_combo.currentText())
+        try:
+            baudrate = parse_baudrate(self.baud_combo.currentText())
+        except ValueError:
+            QMessageBox.warning(self, "警告", "请输入有效的波特率")
+            return
         
         try:
             # 创建Trans实例
-            self.trans = Trans(port, baudrate)
+            self.trans = Trans(port, baudrate, self.last_trans)
             # self.trans.pid_position = self.pid_position_cb.isChecked()
             # self.trans.pid_velocity = self.pid_velocity_cb.isChecked()
             
@@ -267,7 +399,15 @@ class SerialMonitor(QMainWindow):
             # 连接串口
             if self.trans.connect():
                 self.connect_btn.setText("断开")
-                self.log_message(f"已连接到 {port}")
+                self.log_message(f"已连接到 {port}, 波特率 {baudrate}")
+                if self.crc_cb.isChecked():
+                    self.change_check_mode(True)
+                if self.delta_cb.isChecked():
+                    self.change_telemetry_mode(True)
+                if self.record_cb.isChecked():
+                    self.start_recording()
+                if self.capture_cb.isChecked():
+                    self.start_capture()
                 # 发送初始数据
                 # self.trans.send_data()
             else:
@@ -284,11 +424,96 @@ class SerialMonitor(QMainWindow):
     def disconnect_serial(self):
         """断开串口连接"""
         if self.trans:
+            recorder = self.trans.recorder
+            capture = self.trans.capture
             self.trans.disconnect()
+            if capture is not None:
+                self.log_message(f"抓取结束: {capture.path}, {capture.nbytes} 字节")
+            if self.exporter is not None:
+                self.exporter.stop()  # 持续导出写完已收到的数据后结束
+            if recorder is not None:
+                self.log_message(f"录制结束: {recorder.path}, {recorder.rows} 个样本")
+            self.last_trans = self.trans
             self.trans = None
         self.connect_btn.setText("连接")
+        self.link_label.setText("链路: -")
         self.log_message("已断开串口连接")
+
+    def toggle_recording(self, checked):
+        """开始/停止录制, 未连接时在下次连接后开始"""
+        if not self.trans:
+            return
+        if checked:
+            self.start_recording()
+        else:
+            recorder = self.trans.stop_recording()
+            if recorder is not None:
+                self.log_message(f"录制结束: {recorder.path}, {recorder.rows} 个样本")
+
+    def toggle_capture(self, checked):
+        """开始/停止抓取原始字节, 未连接时在下次连接后开始"""
+        if not self.trans or self.trans.replaying:
+            return
+        if checked:
+            self.start_capture()
+        else:
+            capture = self.trans.stop_capture()
+            if capture is not None:
+                self.log_message(f"抓取结束: {capture.path}, {capture.nbytes} 字节")
+
+    def start_capture(self):
+        """为当前连接新建抓取文件"""
+        try:
+            path = self.trans.start_capture()
+            self.log_message(f"开始抓取原始字节: {path}")
+        except Exception as e:
+            self.log_message(f"抓取失败: {str(e)}")
+            self.capture_cb.setChecked(False)
+
+    def start_replay(self):
+        """选择抓取文件, 不连接串口按所选速度回放 (经过与串口数据相同的解码流程)"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "回放抓取文件", RECORD_DIR, f"抓取文件 (*{CAPTURE_SUFFIX})")
+        if not file_path:
+            return
+        if self.trans:
+            self.disconnect_serial()
+        try:
+            self.trans = Trans("回放", DEFAULT_BAUDRATE)
+            self.trans.replay(file_path, self.speed_combo.currentData())
+            self.connect_btn.setText("断开")
+            self.log_message(f"开始回放 {file_path} ({self.speed_combo.currentText()})")
+            if self.record_cb.isChecked():
+                self.start_recording()
+        except Exception as e:
+            self.log_message(f"回放失败: {str(e)}")
+            self.trans = None
+
+    def start_recording(self):
+        """为当前连接新建录制文件"""
+        try:
+            path = self.trans.start_recording()
+            self.log_message(f"开始录制: {path}")
+        except Exception as e:
+            self.log_message(f"录制失败: {str(e)}")
+            self.record_cb.setChecked(False)
     
+    def change_check_mode(self, use_crc):
+        """请求下位机切换帧校验方式"""
+        if not self.trans or not self.trans.ser:
+            return
+        check = CRC16_CHECK if use_crc else XOR_CHECK
+        if self.trans.request_check_mode(check):
+            self.log_message(f"已请求切换到 {check.name} 校验, 收到下位机对应格式的数据后生效")
+
+    def change_telemetry_mode(self, use_delta):
+        """请求下位机切换状态数据的传输方式"""
+        if not self.trans or not self.trans.ser:
+            return
+        mode = TELEMETRY_DELTA if use_delta else TELEMETRY_RAW
+        if self.trans.request_telemetry_mode(mode):
+            self.log_message("已请求切换到差分压缩传输" if use_delta else "已请求切换到普通传输")
+
     def update_pid_params(self):
         """从界面更新PID参数"""
         try:
@@ -397,70 +622,170 @@ class SerialMonitor(QMainWindow):
             QMessageBox.critical(self, "错误", f"保存失败: {str(e)}")
             self.log_message(f"保存失败: {str(e)}")
     
+    def update_link_stats(self):
+        """更新链路利用率和绘图帧率显示, 输出日志中的重复消息汇总"""
+        log.flush()
+        self.show_log()
+        self.render_label.setText(f"绘图: {self.plot_pacer.summary()}, {self.plot_points} 点")
+        if self.trans and self.trans.replaying and not self.trans.recv_thread.is_alive():
+            self.disconnect_serial()
+            self.log_message("回放结束")
+            return
+        if self.trans and self.trans.ser:
+            text = f"链路: {self.trans.link.summary()}"
+            if self.trans.replaying:
+                text += f", 回放 {self.trans.ser.progress() * 100:.0f}%"
+            recorder = self.trans.recorder
+            if recorder is not None:
+                text += f", 录制 {recorder.rows} 个样本 ({recorder.nbytes / 1048576:.1f} MB)"
+            self.link_label.setText(text)
+
+    def plot_tick(self):
+        """绘图定时器: 重绘后按 PlotPacer 给出的间隔安排下一次, 绘制跟不上时丢帧而不排队"""
+        self.plot_pacer.begin()
+        drawn, total, latency = False, None, None
+        try:
+            drawn = self.update_plots()
+            trans = self.trans
+            if trans is not None:
+                total = trans.history.total
+                # 延迟: 屏幕上最新样本的年龄 (回放时时间轴与当前时刻无关, 不统计)
+                if drawn and not trans.replaying:
+                    latency = trans.clock.now() - trans.history.last(1)[0][-1]
+        finally:
+            if drawn:
+                # Qt 在回到事件循环后才重绘界面; 排在重绘之后结束计时, 使耗时包括整帧的绘制
+                QTimer.singleShot(0, lambda: self.plot_done(drawn, total, latency))
+            else:
+                self.plot_done(drawn, total, latency)
+
+    def plot_done(self, drawn, total, latency):
+        """一帧结束: 更新绘图统计并启动下一次的定时器"""
+        self.timer.start(self.plot_pacer.end(drawn, total, latency))
+
     def update_plots(self):
-        """更新图表显示"""
-        if self.trans and hasattr(self.trans, 'history_time') and self.trans.history_time:
-            # 更新电机速度曲线
-            for i in range(4):
-                self.motor_curves[i].setData(self.trans.history_time, self.trans.history_motor_v[i])
-            
-            # 更新线性速度曲线
-            for i in range(3):
-                self.velocity_curves[i].setData(self.trans.history_time, self.trans.history_v[i])
-            
-            # 更新位置曲线
-            for i in range(3):
-                self.position_curves[i].setData(self.trans.history_time, self.trans.history_pos[i])
-            
-            # 更新姿态曲线
-            for i in range(3):
-                self.attitude_curves[i].setData(self.trans.history_time, self.trans.history_att[i])
+        """
+        更新图表显示, 有子图重绘时返回 True: 历史数据的代数、显示范围和子图宽度都没变时跳过该子图;
+        数据点数按子图的像素宽度选取 (汇总级为 min/max)
+        """
+        if self.trans:
+            ratio = self.trans.delta_decoder.compression_ratio()
+            if ratio is not None:
+                self.ratio_label.setText(f"压缩比: {ratio:.2f}x")
+        if not self.trans or not len(self.trans.history):
+            return False
+        history = self.trans.history
+        span = self.span_combo.currentData()
+        windows = {}  # 同一宽度的子图共用同一次选取的结果
+        points = 0
+        drawn = False
+        for i, (plot, curves, first) in enumerate(self.plot_groups):
+            view_box = plot.getViewBox()
+            width = plot_points(view_box.width())
+            auto = view_box.autoRangeEnabled()[0]
+            x_range = None if auto else tuple(plot.viewRange()[0])
+            key = (id(history), history.total, span, x_range, width)
+            if key == self.plot_keys[i]:
+                continue
+            self.plot_keys[i] = key
+            drawn = True
+            if auto:
+                if width not in windows:
+                    windows[width] = history.window(span, width)
+                times, channels, _ = windows[width]
+            else:
+                # 手动缩放/平移后按可见时间范围选取分辨率
+                times, channels, _ = history.view(x_range[0], x_range[1], width)
+            for curve, values in zip(curves, channels[first:first + len(curves)]):
+                curve.setData(times, values)
+            points += len(times) * len(curves)
+        if drawn:
+            self.plot_points = points
+        return drawn
     
     def receive_message(self):
-        """保存接收的数据到CSV文件"""
+        """在后台导出接收的数据到CSV或二进制文件; 持续导出时再次点击停止"""
+        exporter = self.exporter
+        if exporter is not None and not exporter.done:
+            if exporter.follow:
+                exporter.stop()
+            return
+        trans = self.trans or self.last_trans
+        if not trans or (trans.recorder is None and not len(trans.history)):
+            self.log_message("没有可导出的数据")
+            return
         try:
-            if self.trans:
-                file_path, _ = QFileDialog.getSaveFileName(
-                    self, "导出配置", "received_data", "CSV文件 (*.csv)")
-                with open(file_path, "w", newline="") as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["时间"] + ["电机1速度", "电机2速度", "电机3速度", "电机4速度"] + ["线性速度X", "线性速度Y", "线性速度Z"] + ["位置X", "位置Y", "位置Z"] + ["姿态Roll", "姿态Pitch", "姿态Yaw"])
-                    for i in range(len(self.trans.history_time)):
-                        row = [self.trans.history_time[i]]
-                        row.extend([
-                            self.trans.history_motor_v[0][i] if i < len(self.trans.history_motor_v[0]) else "",
-                            self.trans.history_motor_v[1][i] if i < len(self.trans.history_motor_v[1]) else "",
-                            self.trans.history_motor_v[2][i] if i < len(self.trans.history_motor_v[2]) else "",
-                            self.trans.history_motor_v[3][i] if i < len(self.trans.history_motor_v[3]) else "",
-                            self.trans.history_v[0][i] if i < len(self.trans.history_v[0]) else "",
-                            self.trans.history_v[1][i] if i < len(self.trans.history_v[1]) else "",
-                            self.trans.history_v[2][i] if i < len(self.trans.history_v[2]) else "",
-                            self.trans.history_pos[0][i] if i < len(self.trans.history_pos[0]) else "",
-                            self.trans.history_pos[1][i] if i < len(self.trans.history_pos[1]) else "",
-                            self.trans.history_pos[2][i] if i < len(self.trans.history_pos[2]) else "",
-                            self.trans.history_att[0][i] if i < len(self.trans.history_att[0]) else "",
-                            self.trans.history_att[1][i] if i < len(self.trans.history_att[1]) else "",
-                            self.trans.history_att[2][i] if i < len(self.trans.history_att[2]) else "",
-                        ])
-                        writer.writerow(row)
-                self.log_message("接收的数据已保存到 received_data.csv")
+            file_path, selected = QFileDialog.getSaveFileName(
+                self, "导出数据", "received_data", export_filter())
+            if not file_path:
+                return
+            fmt, file_path = export_format(file_path, selected)
+            # 录制中时从录制文件导出本次连接的全部数据, 否则导出内存中的历史数据
+            recorder = trans.recorder
+            if recorder is not None:
+                source = RecordingSource(recorder.path, recorder)
+            else:
+                source = HistorySource(trans.history, CHANNEL_NAMES)
+            self.exporter = Exporter(source, file_path, fmt, self.follow_cb.isChecked(), info={
+                'tool': RECORD_PREFIX, 'port': trans.port, 'baudrate': trans.baudrate,
+                'start_time': trans.clock.start_time,
+            }).start()
+            if self.exporter.follow:
+                self.receive_btn.setText("停止导出")
+            self.export_timer.start(200)
+            self.log_message(f"开始导出到 {file_path}")
         except Exception as e:
             self.log_message(f"保存接收数据异常: {str(e)}")
 
+    def update_export(self):
+        """显示后台导出进度, 完成后记录结果"""
+        exporter = self.exporter
+        if exporter is None:
+            self.export_timer.stop()
+            return
+        if not exporter.done:
+            percent = exporter.rows / exporter.total * 100 if exporter.total else 100
+            self.export_label.setText(f"导出: {exporter.rows}/{exporter.total} 行 ({percent:.0f}%)")
+            return
+        self.export_timer.stop()
+        self.receive_btn.setText("保存传入数据")
+        if exporter.error is not None:
+            self.export_label.setText("导出: 失败")
+            self.show_log()  # 错误已由导出线程写入日志
+            return
+        self.export_label.setText(f"导出: {exporter.rows} 行, {exporter.elapsed:.1f} s")
+        message = f"接收的数据已保存到 {exporter.path} ({exporter.rows} 行)"
+        if exporter.lost:
+            message += f", {exporter.lost} 行在导出前已被覆盖"
+        self.log_message(message)
+
     def log_message(self, message):
         """记录状态消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.status_text.append(f"[{timestamp}] {message}")
+        log.info(message)
+        self.show_log()
+
+    def show_log(self):
+        """把日志中尚未显示的记录追加到状态栏"""
+        entries, self.log_total = log.since(self.log_total)
+        for timestamp, level, text in entries:
+            prefix = f"{LEVEL_NAMES[level]}: " if level >= WARNING else ""
+            self.status_text.append(f"[{timestamp.strftime('%H:%M:%S')}] {prefix}{text}")
+
+    def change_log_level(self):
+        log.level = self.log_level_combo.currentData()
     
     def closeEvent(self, event):
         """关闭窗口时确保串口关闭[6](@ref)"""
         if self.trans and self.trans.ser and self.trans.ser.is_open:
             self.trans.disconnect()
+        if self.exporter is not None:
+            self.exporter.stop(wait=True)
         event.accept()
 
 # 保留你原有的Trans类，但稍作修改以适配PyQt
 class Trans:
-    def __init__(self, port, baudrate=115200):
+    def __init__(self, port, baudrate=115200, previous=None):
+        """previous 为上一次连接的 Trans, 传入时沿用其历史数据和时间轴"""
         self.ser = None
         self.port = port
         self.baudrate = baudrate
@@ -501,12 +826,30 @@ class Trans:
         self.current_pitch = 0.0  # mrad
         self.current_yaw = 0.0  # mrad
 
-        # 初始化历史数据列表
-        self.history_motor_v = [[], [], [], []]
-        self.history_v = [[], [], []]
-        self.history_pos = [[], [], []]
-        self.history_att = [[], [], []]
-        self.history_time = []
+        # 历史数据: 最近 max_history_length 个原始样本 (13个通道, 顺序与状态帧一致, int16; 时间戳 float64)
+        # 更早的数据逐级汇总为 min/max/mean, 内存固定; 完整数据可另外录制到文件
+        self.max_history_length = 1000
+        if previous is None:
+            self.history = TieredHistory(13, self.max_history_length)
+        else:
+            self.history = previous.history
+        self.recorder = None  # 录制中时为 SessionRecorder, 由接收线程写入
+        self.capture = None   # 抓取原始字节时为 CaptureWriter, 由接收线程写入
+        self.replaying = False  # ser 为回放抓取文件的 ReplaySerial
+
+        # 帧校验方式: 收到下位机以某种方式校验的合法帧后, 发送也切换到该方式
+        self.frame_check = XOR_CHECK
+        self.status_decoders = {}  # 校验方式 -> 逐帧/批量解码器
+        self.bulk_decoders = {}    # 校验方式 -> NumPy 批量解码器
+        self.batch_decoders = {}   # 校验方式 -> 多样本批量帧解码器
+        for check in (XOR_CHECK, CRC16_CHECK):
+            self.status_decoders[check.mode] = StatusFrameDecoder(check)
+            self.bulk_decoders[check.mode] = BulkFrameDecoder(status_dtype(check), check)
+            self.batch_decoders[check.mode] = BatchFrameDecoder(STATUS_SAMPLE_DTYPE, check)
+        self.delta_decoder = DeltaFrameDecoder()  # 差分压缩帧解码器 (保存差分基准, 与校验方式无关)
+        self.link = LinkMeter(baudrate)  # 链路利用率统计
+        # 读取时刻时间戳, 历史时间为相对会话开始的秒数
+        self.clock = ReadClock(baudrate, origin=previous.clock if previous is not None else None)
 
     def connect(self):
         """连接串口设备"""
@@ -526,7 +869,7 @@ class Trans:
             self.recv_thread.start()
             return True
         except Exception as e:
-            print(f"连接失败: {e}")
+            log.error("连接失败: %s", e)
             return False
 
     def disconnect(self):
@@ -537,162 +880,310 @@ class Trans:
         if hasattr(self, 'ser') and self.ser and self.ser.is_open:
             self.ser.close()
             self.ser = None
+        self.stop_recording()
+        self.stop_capture()
+
+    def start_recording(self):
+        """开始录制: 此后解码得到的每个样本都追加写入新的录制文件, 返回文件路径"""
+        self.stop_recording()
+        self.recorder = SessionRecorder(session_path(RECORD_PREFIX), CHANNEL_NAMES, np.int16, info={
+            'tool': RECORD_PREFIX, 'port': self.port, 'baudrate': self.baudrate,
+            'start_time': self.clock.start_time,
+        })
+        return self.recorder.path
+
+    def start_capture(self):
+        """开始把串口原始字节连同读取时刻写入新的抓取文件, 返回文件路径"""
+        self.stop_capture()
+        self.capture = CaptureWriter(session_path(RECORD_PREFIX, suffix=CAPTURE_SUFFIX), info={
+            'tool': RECORD_PREFIX, 'port': self.port, 'baudrate': self.baudrate,
+            'start_time': self.clock.start_time, 'names': CHANNEL_NAMES,
+        })
+        return self.capture.path
+
+    def stop_capture(self):
+        """停止抓取并关闭抓取文件, 返回已关闭的 CaptureWriter (未在抓取时返回 None)"""
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            capture.close()
+        return capture
+
+    def replay(self, path, speed=1.0):
+        """
+        不连接串口, 把抓取文件中的原始字节按原读取间隔 (speed 倍速, 0 为最快) 送入接收线程,
+        经过与串口数据相同的解码和存储流程; 历史数据的时间为抓取时的时刻
+        """
+        self.ser = ReplaySerial(path, speed)
+        info = self.ser.info
+        self.baudrate = info.get('baudrate', self.baudrate)
+        self.link = LinkMeter(self.baudrate)
+        self.clock = ReadClock(self.baudrate, start_ns=0)
+        self.clock.start_time = info.get('start_time', self.clock.start_time)
+        self.replaying = True
+        self.send_over = True  # 抓取的数据直接保存, 无需先发送
+        self.recv_thread = threading.Thread(target=self._receive_data)
+        self.recv_thread.daemon = True
+        self.recv_thread.start()
+        return True
+
+    def stop_recording(self):
+        """停止录制并关闭录制文件, 返回已关闭的 SessionRecorder (未在录制时返回 None)"""
+        recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+        return recorder
 
     # 保留你原有的send_data、_receive_data、_parse_status_frame等方法
     def send_data(self):
         """发送数据"""
         if not self.ser or not self.ser.is_open:
-            print("串口未连接，无法发送数据")
+            log.warning("串口未连接，无法发送数据")
             return False
 
-        data = bytearray(55)
-        data[0] = 0xAA  # 帧头
-        data[1] = 0x55  # 帧头
-        data[2] = 0x0A  # 数据数
-        
-        data[3] = 0x04 # 类型标识 float 
-        data[4:8] = struct.pack('<f', self.kp_p)
-        data[8] = 0x04 
-        data[9:13] = struct.pack('<f', self.ki_p)
-        data[13] = 0x04
-        data[14:18] = struct.pack('<f', self.kd_p)
-        data[18] = 0x04
-        data[19:23] = struct.pack('<f', self.max_i_out_p)
-        data[23] = 0x04
-        data[24:28] = struct.pack('<f', self.max_out_p)
-            
-        data[28] = 0x04
-        data[29:33] = struct.pack('<f', self.kp_v)
-        data[33] = 0x04
-        data[34:38] = struct.pack('<f', self.ki_v)
-        data[38] = 0x04
-        data[39:43] = struct.pack('<f', self.kd_v)
-        data[43] = 0x04
-        data[44:48] = struct.pack('<f', self.max_i_out_v)
-        data[48] = 0x04
-        data[49:53] = struct.pack('<f', self.max_out_v)
-
-        checksum = 0x00
-        for i in range(53):
-            checksum ^= data[i]
-        data[53] = checksum
-        data[54] = 0x5D  # 帧尾
+        # 帧格式由 specs/pid.json 生成 (pid_frames.py), 与下位机 pid_frames.h 一致
+        values = (
+            self.kp_p, self.ki_p, self.kd_p, self.max_i_out_p, self.max_out_p,
+            self.kp_v, self.ki_v, self.kd_v, self.max_i_out_v, self.max_out_v,
+        )
+        data = pid_frames.encode_tx(values, self.frame_check)
         
         try:
             self.ser.write(data)
             self.send_over = True
-            print("发送数据成功")
+            recorder = self.recorder
+            if recorder is not None:
+                # 记录发送的参数, 回看录制文件时可直接定位到每次调参
+                recorder.add_event("send_data", self.clock.now(),
+                                   dict(zip(pid_frames.TX_NAMES, map(float, values))))
+            log.info("发送数据成功")
             return data
         except Exception as e:
-            print(f"发送数据失败: {e}")
+            log.error("发送数据失败: %s", e)
             return None
 
+    def request_check_mode(self, check):
+        """发送切换校验方式的命令帧"""
+        if not self.ser or not self.ser.is_open:
+            log.warning("串口未连接，无法发送数据")
+            return False
+        try:
+            self.ser.write(check_mode_frame(check))
+            return True
+        except Exception as e:
+            log.error("发送数据失败: %s", e)
+            return False
+
+    def request_telemetry_mode(self, mode):
+        """发送切换传输方式的命令帧"""
+        if not self.ser or not self.ser.is_open:
+            log.warning("串口未连接，无法发送数据")
+            return False
+        try:
+            self.ser.write(telemetry_mode_frame(mode))
+            return True
+        except Exception as e:
+            log.error("发送数据失败: %s", e)
+            return False
+
     def _receive_data(self):
         """接收线程函数，持续处理串口数据"""
-        buffer = bytearray()
+        framer = RingFramer(min_length=DELTA_MIN_LEN, max_length=BATCH_MAX_LEN)
         while self.ser and self.ser.is_open:
             try:
-                data = self.ser.read(self.ser.in_waiting or 1)
+                waiting = self.ser.in_waiting
+                data = self.ser.read(waiting or 1)
                 if data:
-                    buffer.extend(data)
-                    
-                    while len(buffer) >= 32:
-                        # 查找帧头0xAA 0x55
-                        start_idx = buffer.find(b'\xAA\x55')
-                        if start_idx == -1:
-                            buffer.clear()
-                            break
-                            
-                        data_length = buffer[start_idx + 2]
-                        frame = buffer[start_idx:start_idx + data_length]
-                        # print(f"接收到数据帧: {frame.hex()}")
-                        del buffer[:start_idx + data_length]  # 移除已处理数据
-
-                        # 验证帧尾 (索引30应为0x5D)
-                        if frame[-1] != 0x5D:
-                            print("警告: 无效帧尾")
-                            continue
-                            
-                        # 解析数据帧
-                        self._parse_status_frame(frame)
+                    self.clock.on_read(len(data), self.ser.read_ns if self.replaying else None)
+                    capture = self.capture
+                    if capture is not None:
+                        capture.write(self.clock.read_ns, data)
+                    start = time.perf_counter()
+                    self.link.add_read(len(data), waiting)
+                    framer.feed(data)
+                    bad_frames = framer.bad_frames
+
+                    if self.send_over:
+                        mode = self.frame_check.mode
+                        # 积压较多时一次向量化处理整个缓冲区
+                        if len(framer) >= BULK_MIN_FRAMES * STATUS_FRAME_LEN:
+                            offset = framer.offset
+                            records, consumed, bad = self.bulk_decoders[mode].decode(framer.pending())
+                            framer.consume(consumed)
+                            if bad:
+                                log.count(WARNING, "校验和错误 x%d", bad)
+                            self.link.add_frames(len(records))
+                            self._store_status_block(records, self.clock.block_times(offset, consumed, len(records)))
+
+                        # 批量解码背靠背的完整状态帧
+                        if framer.sync():
+                            offset = framer.offset
+                            rows, consumed, bad = self.status_decoders[mode].decode_batch(framer.pending())
+                            framer.consume(consumed)
+                            if bad:
+                                log.count(WARNING, "校验和错误 x%d", bad)
+                            self.link.add_frames(len(rows))
+                            self._store_status_rows(rows, self.clock.block_times(offset, consumed, len(rows)).tolist())
+
+                    # 剩余的完整帧逐帧解析, 不完整的帧留在缓冲区等待后续数据
+                    for frame in framer.frames():
+                        self._parse_status_frame(frame, framer.offset)
+
+                    if framer.bad_frames != bad_frames:
+                        log.count(WARNING, "无效帧长度或帧尾 x%d", framer.bad_frames - bad_frames)
+                    self.link.add_busy(time.perf_counter() - start)
             except Exception as e:
-                print(f"接收错误: {e}")
+                log.error("接收错误: %s", e)
                 time.sleep(0.2)
 
-    def _parse_status_frame(self, frame):
+    def _parse_status_frame(self, frame, end):
         """
-        解析状态数据帧 (32字节)
+        解析状态数据帧 (异或校验32字节, CRC-16校验33字节)、多样本批量帧或差分压缩帧
+        end 为帧尾在接收字节流中的位置, 用于计算时间戳
         """
-        if not self.send_over:
-            return
-            
         try:
-            # 解析数据
-            checksum = 0   
-            for i in range(30):
-                checksum ^= frame[i]
-            if checksum != frame[30]:
-                print("警告: 校验和错误")
+            if is_batch_frame(frame):
+                self._parse_batch_frame(frame, end)
                 return
-                
-            self.running = bool(frame[3])
-            if self.running:
-                self.motor_v_1 = struct.unpack('<h', frame[4:6])[0]
-                self.motor_v_2 = struct.unpack('<h', frame[6:8])[0]
-                self.motor_v_3 = struct.unpack('<h', frame[8:10])[0]
-                self.motor_v_4 = struct.unpack('<h', frame[10:12])[0]
-                self.current_vx = struct.unpack('<h', frame[12:14])[0]
-                self.current_vy = struct.unpack('<h', frame[14:16])[0]
-                self.current_vz = struct.unpack('<h', frame[16:18])[0]
-                self.current_x = struct.unpack('<h', frame[18:20])[0]
-                self.current_y = struct.unpack('<h', frame[20:22])[0]
-                self.current_z = struct.unpack('<h', frame[22:24])[0]
-                self.current_roll = struct.unpack('<h', frame[24:26])[0]
-                self.current_pitch = struct.unpack('<h', frame[26:28])[0]
-                self.current_yaw = struct.unpack('<h', frame[28:30])[0]
-
-                print(f"电机速度: {self.motor_v_1}, {self.motor_v_2}, {self.motor_v_3}, {self.motor_v_4}")
-                print(f"线性速度: {self.current_vx}, {self.current_vy}, {self.current_vz}")
-                print(f"位置: {self.current_x}, {self.current_y}, {self.current_z}")
-                print(f"姿态: {self.current_roll}, {self.current_pitch}, {self.current_yaw}")
-
-                # 更新历史数据
-                current_time = time.time()
-                self.history_motor_v[0].append(self.motor_v_1)
-                self.history_motor_v[1].append(self.motor_v_2)
-                self.history_motor_v[2].append(self.motor_v_3)
-                self.history_motor_v[3].append(self.motor_v_4)
-                self.history_v[0].append(self.current_vx)
-                self.history_v[1].append(self.current_vy)
-                self.history_v[2].append(self.current_vz)
-                self.history_pos[0].append(self.current_x)
-                self.history_pos[1].append(self.current_y)
-                self.history_pos[2].append(self.current_z)
-                self.history_att[0].append(self.current_roll)
-                self.history_att[1].append(self.current_pitch)
-                self.history_att[2].append(self.current_yaw)
-                self.history_time.append(current_time)
-                    
-                # 限制历史数据长度，防止内存占用过大
-                max_history_length = 1000
-                if len(self.history_time) > max_history_length:
-                    self.history_motor_v[0] = self.history_motor_v[0][-max_history_length:]
-                    self.history_motor_v[1] = self.history_motor_v[1][-max_history_length:]
-                    self.history_motor_v[2] = self.history_motor_v[2][-max_history_length:]
-                    self.history_motor_v[3] = self.history_motor_v[3][-max_history_length:]
-                    self.history_v[0] = self.history_v[0][-max_history_length:]
-                    self.history_v[1] = self.history_v[1][-max_history_length:]
-                    self.history_v[2] = self.history_v[2][-max_history_length:]
-                    self.history_pos[0] = self.history_pos[0][-max_history_length:]
-                    self.history_pos[1] = self.history_pos[1][-max_history_length:]
-                    self.history_pos[2] = self.history_pos[2][-max_history_length:]
-                    self.history_att[0] = self.history_att[0][-max_history_length:]
-                    self.history_att[1] = self.history_att[1][-max_history_length:]
-                    self.history_att[2] = self.history_att[2][-max_history_length:]
-                    self.history_time = self.history_time[-max_history_length:]
+            if is_delta_frame(frame):
+                self._parse_delta_frame(frame, end)
+                return
+            for decoder in self.status_decoders.values():
+                if decoder.size == len(frame):
+                    break
+            else:
+                log.warning("帧长度错误")
+                return
+            row = decoder.decode(frame)
+            if row is None:
+                log.count(WARNING, "校验和错误 x%d", 1)
+                return
+            self.link.add_frames(1)
+            timestamp = self.clock.frame_time(end)
+
+            # 下位机已切换校验方式, 发送随之切换
+            if decoder.check is not self.frame_check:
+                self.frame_check = decoder.check
+                log.info("下位机使用 %s 校验", decoder.check.name)
+
+            if not self.send_over:
+                return
+            self._store_status_rows((row,), (timestamp,))
                     
         except Exception as e:
-            print(f"解析数据帧错误: {e}")
+            log.error("解析数据帧错误: %s", e)
+
+    def _parse_batch_frame(self, frame, end):
+        """解析多样本批量帧, 每个样本展开为一行历史数据"""
+        for decoder in self.batch_decoders.values():
+            if decoder.frame_len(frame[4]) == len(frame):
+                break
+        else:
+            log.warning("帧长度错误")
+            return
+        result = decoder.decode(frame)
+        if result is None:
+            log.count(WARNING, "校验和错误 x%d", 1)
+            return
+        self.link.add_frames(1, frame[4])
+        times = self.clock.frame_times((end,), (frame[4],), (len(frame),))
+
+        if decoder.check is not self.frame_check:
+            self.frame_check = decoder.check
+            log.info("下位机使用 %s 校验", decoder.check.name)
+
+        if not self.send_over:
+            return
+        running, samples = result
+        self.running = bool(running)
+        if self.running:
+            self._store_channel_block(samples['channels'], times)
+
+    def _parse_delta_frame(self, frame, end):
+        """解析差分压缩帧, 由差分重建绝对值后每个样本展开为一行历史数据"""
+        other = CRC16_CHECK if self.frame_check is XOR_CHECK else XOR_CHECK
+        for check in (self.frame_check, other):
+            result = self.delta_decoder.decode(frame, check)
+            if result is not None:
+                break
+        else:
+            log.count(WARNING, "校验和错误 x%d", 1)
+            return
+
+        if check is not self.frame_check:
+            self.frame_check = check
+            log.info("下位机使用 %s 校验", check.name)
+
+        running, rows = result
+        self.link.add_frames(1, len(rows))
+        times = self.clock.frame_times((end,), (len(rows),), (len(frame),))
+        if not len(rows):
+            log.warning("差分帧不连续, 等待关键帧")
+            return
+        if not self.send_over:
+            return
+        self.running = bool(running)
+        if self.running:
+            self._store_channel_block(rows, times)
+
+    def snapshot(self, n=None):
+        """
+        界面线程读取历史数据: 返回最近 n 个样本 (默认全部) 的 (时间戳, 13 x n 数组, 代数)
+        时间戳与数据长度一致且只读, 接收线程继续写入不会改写已取得的视图
+        """
+        return self.history.snapshot(n)
+
+    def rows_since(self, generation):
+        """返回第 generation 代之后的新样本 (时间戳, 13 x k 数组, 当前代数), 供增量读者使用"""
+        return self.history.since(generation)
+
+    def _store_status_rows(self, rows, times):
+        """保存已解码的状态数据 (running, motor_v_1, ..., yaw) 及其时间戳到当前值和历史数据"""
+        for row, timestamp in zip(rows, times):
+            self.running = bool(row[0])
+            if not self.running:
+                continue
+            self._set_current_values(row[1:])
+
+            # 调试级别未启用时不做格式化
+            log.debug("电机速度: %s, %s, %s, %s; 线性速度: %s, %s, %s; 位置: %s, %s, %s; 姿态: %s, %s, %s",
+                      self.motor_v_1, self.motor_v_2, self.motor_v_3, self.motor_v_4,
+                      self.current_vx, self.current_vy, self.current_vz,
+                      self.current_x, self.current_y, self.current_z,
+                      self.current_roll, self.current_pitch, self.current_yaw)
+
+            # 更新历史数据
+            self.history.append(row[1:], timestamp)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.append(row[1:], timestamp)
+
+    def _store_status_block(self, records, times):
+        """按列整块保存批量解码得到的状态记录 (STATUS_DTYPE 数组) 及其时间戳数组"""
+        if not len(records):
+            return
+        running = records['running'] != 0
+        self.running = bool(running[-1])
+        self._store_channel_block(records['channels'][running], times[running])
+
+    def _store_channel_block(self, block, times):
+        """按列整块保存多行通道数据 (行数 x 13 的数组) 及逐行时间戳数组"""
+        if not len(block):
+            return
+        self._set_current_values(block[-1].tolist())
+        log.debug("批量解码 %d 个样本, 最新电机速度: %s, %s, %s, %s", len(block),
+                  self.motor_v_1, self.motor_v_2, self.motor_v_3, self.motor_v_4)
+
+        self.history.extend(block, times)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.extend(block, times)
+
+    def _set_current_values(self, values):
+        """更新13个通道的当前值"""
+        (self.motor_v_1, self.motor_v_2, self.motor_v_3, self.motor_v_4,
+         self.current_vx, self.current_vy, self.current_vz,
+         self.current_x, self.current_y, self.current_z,
+         self.current_roll, self.current_pitch, self.current_yaw) = values
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,112 @@
+import sys
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+# 日志级别
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "调试", INFO: "信息", WARNING: "警告", ERROR: "错误"}
+
+LOG_CAPACITY = 500       # 内存中保留的日志条数 (状态栏最多显示这么多行)
+LOG_RATE_WINDOW = 1.0    # 同一条消息的限速周期 (s): 周期内只输出第一条, 其余合并为一条汇总
+
+
+class RateLog:
+    """
+    限速日志: 可在接收线程中调用, 不阻塞也不随帧率增长输出量
+    消息以格式串 + 参数的形式传入 (如 log.error("接收错误: %s", e)), 级别未启用时直接返回, 不做格式化;
+    同一格式串在 window 秒内只输出第一条, 之后的只计数, 周期结束时输出 "... (1 s 内重复 N 次)";
+    按帧数计的消息 (如 "校验和错误 x%d") 用 count() 记录, 汇总时输出周期内的总数而不是消息条数
+    输出的日志保存在定长的环形缓冲区中 (供界面状态栏读取), echo 为 True 时同时打印到控制台
+    """
+
+    def __init__(self, level=INFO, window=LOG_RATE_WINDOW, capacity=LOG_CAPACITY, echo=True):
+        self.level = level
+        self.window = window
+        self.echo = echo
+        self.entries = deque(maxlen=capacity)  # (时间, 级别, 文本)
+        self.total = 0                         # 累计输出的条数, 读者据此取新增的日志
+        self._pending = {}                     # 格式串 -> [周期起点, 周期内被合并的次数, 级别, 最近一次的参数, 累计数]
+        self._lock = threading.Lock()
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, *args):
+        self._log(level, message, args, None)
+
+    def count(self, level, message, n):
+        """记录 n 个同类事件, message 中唯一的参数为个数 (如 "校验和错误 x%d"); 汇总时输出周期内合计的个数"""
+        self._log(level, message, (n,), n)
+
+    def _log(self, level, message, args, n):
+        if level < self.level:
+            return
+        now = time.monotonic()
+        with self._lock:
+            pending = self._pending.get(message)
+            if pending is not None and now - pending[0] < self.window:
+                pending[1] += 1
+                pending[3] = args
+                if n is not None:
+                    pending[4] += n
+                return
+            if pending is not None and pending[1]:
+                self._emit_repeated(message, pending)
+            self._pending[message] = [now, 0, level, args, 0 if n is not None else None]
+            self._emit(level, message % args if args else message)
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(ERROR, message, *args)
+
+    def flush(self):
+        """输出已过限速周期的汇总 (由界面或主循环定期调用, 否则汇总要等到同一消息再次出现时才输出)"""
+        now = time.monotonic()
+        with self._lock:
+            for message, pending in list(self._pending.items()):
+                if now - pending[0] >= self.window:
+                    if pending[1]:
+                        self._emit_repeated(message, pending)
+                    del self._pending[message]
+
+    def since(self, total):
+        """第 total 条之后输出的日志 [(时间, 级别, 文本), ...] 和当前的累计条数; 已被覆盖的部分不再返回"""
+        with self._lock:
+            count = min(self.total - total, len(self.entries))
+            return list(self.entries)[len(self.entries) - count:], self.total
+
+    def _emit_repeated(self, message, pending):
+        start, count, level, args, total = pending
+        if total is not None:
+            # 第一条之后周期内合计的个数
+            self._emit(level, f"{message % (total,)} (随后 {self.window:g} s 内合计)")
+            return
+        text = message % args if args else message
+        self._emit(level, f"{text} ({self.window:g} s 内重复 {count} 次, 最后一条)")
+
+    def _emit(self, level, text):
+        entry = (datetime.now(), level, text)
+        self.entries.append(entry)
+        self.total += 1
+        if self.echo:
+            try:
+                sys.stdout.write(f"{LEVEL_NAMES.get(level, level)}: {text}\n")
+            except Exception:
+                pass  # 没有控制台 (如 pythonw) 时忽略
+
+
+# 程序内共用的日志: 接收线程、导出线程和界面都写入这一个实例, 日志级别和状态栏对它们同样有效
+log = RateLog()
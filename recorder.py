@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import bisect
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# 会话录制文件:
+# [魔数(8) | 已写入行数 uint64 | 数据区偏移 uint32 | 说明长度 uint32 | 说明(JSON, UTF-8) | 填充] [记录0, 记录1, ...]
+# 每条记录为 time(float64, 相对会话开始的秒数) + 各通道的值 (字段依次命名为 f0, f1, ...), 小端, 无对齐填充
+RECORD_MAGIC = b'ZPIDREC1'
+RECORD_VERSION = 1
+RECORD_SUFFIX = '.zrec'
+RECORD_DIR = 'recordings'
+RECORD_HEADER = struct.Struct('<8sQII')
+RECORD_ALIGN = 4096                  # 数据区起点对齐到页
+RECORD_CHUNK_BYTES = 4 * 1024 * 1024  # 文件按块预分配, 同一时刻只映射当前块
+RECORD_FLUSH_INTERVAL = 1.0          # 行数写回文件头的最长间隔 (s), 异常退出时最多丢失这段时间的数据
+
+# 索引文件 (与录制文件同名, 后缀 .zidx): 每行一个 JSON 对象, 只追加、逐行写回磁盘
+# 第一行 {"stride": N}; 时间索引 {"row": 行号, "time": 时间} 每 N 行一条;
+# 事件 {"row": 事件发生时已写入的行数, "time": 时间, "event": 名称, "values": {参数名: 值}}
+RECORD_INDEX_SUFFIX = '.zidx'
+RECORD_INDEX_STRIDE = 4096
+
+
+def record_dtype(dtype, channels=None):
+    """
+    录制文件中单条记录的类型: time + 各通道的值
+    dtype 为结构化类型 (如 rx_sample_dtype) 时按其字段逐列保存, 否则 channels 个通道使用同一类型
+    """
+    dtype = np.dtype(dtype)
+    if dtype.names:
+        fields = [(f'f{i}', dtype[name].newbyteorder('<')) for i, name in enumerate(dtype.names)]
+    else:
+        fields = [(f'f{i}', dtype.newbyteorder('<')) for i in range(channels)]
+    return np.dtype([('time', '<f8')] + fields)
+
+
+def index_path(path):
+    """录制文件对应的索引文件路径"""
+    return os.path.splitext(path)[0] + RECORD_INDEX_SUFFIX
+
+
+def session_path(prefix, directory=RECORD_DIR, suffix=RECORD_SUFFIX):
+    """按当前时间生成新的录制文件路径, 同名文件已存在时追加序号"""
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    path = stem + suffix
+    index = 1
+    while os.path.exists(path):
+        index += 1
+        path = f"{stem}_{index}{suffix}"
+    return path
+
+
+class SessionRecorder:
+    """
+    只追加的会话录制文件
+    每个解码得到的样本连同时间戳写入内存映射的文件, 文件按块预分配, 同一时刻只映射最后一块,
+    长时间录制内存占用固定; 同时写入稀疏时间索引和事件索引 (见 RecordingIndex)
+    由接收线程写入样本, add_event 和 close 可在界面线程调用
+    """
+
+    def __init__(self, path, names, dtype=np.int16, info=None, chunk_bytes=RECORD_CHUNK_BYTES,
+                 stride=RECORD_INDEX_STRIDE):
+        self.path = path
+        self.names = list(names)
+        self.dtype = record_dtype(dtype, len(self.names))
+        self.fields = self.dtype.names[1:]
+        self.chunk_rows = max(1, chunk_bytes // self.dtype.itemsize)
+        self.rows = 0  # 已写入的记录数
+
+        header = dict(info or {})
+        header.update(version=RECORD_VERSION, names=self.names,
+                      fields=[[name, self.dtype[name].str] for name in self.dtype.names])
+        text = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        self.data_offset = -(-(RECORD_HEADER.size + len(text)) // RECORD_ALIGN) * RECORD_ALIGN
+
+        self._file = open(path, 'w+b')
+        self._file.write(RECORD_HEADER.pack(RECORD_MAGIC, 0, self.data_offset, len(text)) + text)
+        self._chunk = None       # 当前映射的块
+        self._chunk_start = 0    # 当前块第一行的行号
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+        self._map_chunk(0)
+
+        self.stride = stride
+        self._index = open(index_path(path), 'w', encoding='utf-8', buffering=1)  # 行缓冲
+        self._index.write(json.dumps({'stride': stride}) + "\n")
+
+    @property
+    def nbytes(self):
+        """文件中已写入数据的字节数"""
+        return self.data_offset + self.rows * self.dtype.itemsize
+
+    def _map_chunk(self, start):
+        """预分配并映射从第 start 行开始的一块"""
+        if self._chunk is not None:
+            self._chunk.flush()
+        self._chunk = None
+        end = self.data_offset + (start + self.chunk_rows) * self.dtype.itemsize
+        self._file.truncate(end)
+        self._chunk = np.memmap(self._file, dtype=self.dtype, mode='r+', shape=(self.chunk_rows,),
+                                offset=self.data_offset + start * self.dtype.itemsize)
+        self._chunk_start = start
+
+    def append(self, values, timestamp):
+        """写入一个样本 (各通道的值按 names 的顺序)"""
+        with self._lock:
+            if self._file is None:
+                return
+            index = self.rows - self._chunk_start
+            if index == self.chunk_rows:
+                self._map_chunk(self.rows)
+                index = 0
+            self._chunk[index] = (timestamp, *values)
+            if self.rows % self.stride == 0:
+                self._index.write(json.dumps({'row': self.rows, 'time': float(timestamp)}) + "\n")
+            self.rows += 1
+            self._maybe_flush()
+
+    def extend(self, block, times):
+        """
+        整块写入多个样本: block 为行数 x 通道数的数组, 或字段依次命名为 f0, f1, ... 的结构化数组;
+        times 为逐行时间戳数组
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            # 时间索引: 本次写入范围内所有 stride 整数倍的行
+            for row in range(-(-self.rows // self.stride) * self.stride, self.rows + len(times), self.stride):
+                self._index.write(json.dumps({'row': row, 'time': float(times[row - self.rows])}) + "\n")
+            done = 0
+            while done < len(times):
+                index = self.rows - self._chunk_start
+                if index == self.chunk_rows:
+                    self._map_chunk(self.rows)
+                    index = 0
+                count = min(len(times) - done, self.chunk_rows - index)
+                rows = self._chunk[index:index + count]
+                rows['time'] = times[done:done + count]
+                part = block[done:done + count]
+                for i, name in enumerate(self.fields):
+                    rows[name] = part[name] if part.dtype.names else part[:, i]
+                done += count
+                self.rows += count
+            self._maybe_flush()
+
+    def add_event(self, name, timestamp, values=None):
+        """记录一个事件 (如 send_data 发送的参数), 位置为当前已写入的行数"""
+        with self._lock:
+            if self._file is None:
+                return
+            event = {'row': self.rows, 'time': float(timestamp), 'event': name, 'values': values or {}}
+            self._index.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._flushed >= RECORD_FLUSH_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        """把当前块写回磁盘并更新文件头中的行数"""
+        self._chunk.flush()
+        self._file.seek(len(RECORD_MAGIC))
+        self._file.write(struct.pack('<Q', self.rows))
+        self._file.flush()
+        self._flushed = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def close(self):
+        """写回剩余数据, 截掉预分配但未使用的部分并关闭文件"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush()
+            self._chunk = None
+            self._file.truncate(self.nbytes)
+            self._file.close()
+            self._file = None
+            self._index.close()
+
+
+def read_recording(path):
+    """
+    只读打开录制文件, 返回 (说明字典, 记录数组)
+    记录数组为内存映射 (按需从磁盘读取), 字段为 time, f0, f1, ..., 通道名称见说明中的 names
+    """
+    with open(path, 'rb') as f:
+        magic, rows, data_offset, length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+        if magic != RECORD_MAGIC:
+            raise ValueError(f"不是录制文件: {path}")
+        info = json.loads(f.read(length).decode('utf-8'))
+    dtype = np.dtype([(name, code) for name, code in info['fields']])
+    # 异常退出的文件中行数可能尚未写回, 只读取文件头记录的部分
+    available = (os.path.getsize(path) - data_offset) // dtype.itemsize
+    rows = min(rows, available)
+    if not rows:
+        return info, np.zeros(0, dtype=dtype)
+    return info, np.memmap(path, dtype=dtype, mode='r', shape=(rows,), offset=data_offset)
+
+
+class RecordingIndex:
+    """
+    录制文件的定位: 按时间或事件 O(log n) 找到样本行号并取出附近的一段数据 (内存映射, 只读取所需部分)
+    时间索引来自 .zidx 文件 (缺失时从录制文件按 stride 抽样重建); 在两个索引点之间再二分查找精确的行
+    """
+
+    def __init__(self, path, stride=RECORD_INDEX_STRIDE):
+        self.path = path
+        self.info, self.records = read_recording(path)
+        self.stride = stride
+        self.events = []
+        rows, times = [], []
+        try:
+            with open(index_path(path), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # 异常退出时最后一行可能不完整
+                    if 'stride' in entry:
+                        self.stride = entry['stride']
+                    elif 'event' in entry:
+                        self.events.append(entry)
+                    elif entry['row'] < len(self.records):
+                        rows.append(entry['row'])
+                        times.append(entry['time'])
+        except FileNotFoundError:
+            rows = list(range(0, len(self.records), self.stride))
+            times = self.records['time'][::self.stride].tolist()
+        self._rows = rows
+        self._times = times
+
+    def __len__(self):
+        return len(self.records)
+
+    def seek(self, t):
+        """第一个时间不早于 t 的样本的行号 (全部早于 t 时为总行数)"""
+        k = bisect.bisect_left(self._times, t)
+        start = self._rows[k - 1] if k > 0 else 0
+        end = self._rows[k] + 1 if k < len(self._rows) else len(self.records)
+        return start + int(np.searchsorted(self.records['time'][start:end], t, 'left'))
+
+    def window(self, t, before=5.0, after=5.0):
+        """时间范围 [t - before, t + after] 内的记录 (字段为 time, f0, f1, ...)"""
+        start = self.seek(t - before)
+        end = self.seek(np.nextafter(t + after, np.inf))
+        return self.records[start:end]
+
+    def find_events(self, name=None):
+        """按名称筛选的事件列表, 每个事件为 {'row', 'time', 'event', 'values'}"""
+        return [event for event in self.events if name is None or event['event'] == name]
+
+    def event_window(self, event, before=5.0, after=5.0):
+        """事件 (find_events 返回的元素) 前后一段时间内的记录"""
+        return self.window(event['time'], before, after)
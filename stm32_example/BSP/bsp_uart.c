@@ -33,6 +33,24 @@ uint8_t uart3_tx_buffer[SEND_MESSAGE_LEN] =
 };
 
 int running = 0;
+uint8_t check_mode = CHECK_MODE_XOR;
+uint8_t telemetry_mode = TELEMETRY_RAW;
+
+// 批量帧: 已攒的样本
+static pid_frames_rx_t batch_samples[TELEMETRY_BATCH];
+static uint8_t batch_count = 0;
+
+// 差分压缩帧: 当前帧的状态和差分基准
+#define DELTA_CHANNELS (PID_FRAMES_RX_SAMPLE_LEN / 2) // 状态帧各字段均为 int16
+#define DELTA_HEADER_LEN 6
+#define DELTA_SAMPLE_MAX_LEN (DELTA_CHANNELS * 3)     // int16 差值的 zigzag varint 最多3字节
+static int16_t delta_last[DELTA_CHANNELS];
+static uint16_t delta_len = DELTA_HEADER_LEN;
+static uint8_t delta_count = 0;
+static uint8_t delta_seq = 0;
+static uint8_t delta_key = 1;
+static uint8_t need_key = 1;
+static uint8_t frames_since_key = 0;
 
 int fputc(int ch, FILE *f)
 {
@@ -52,78 +70,41 @@ void uart_init(void)
 int Rec_decode(uint8_t *buffer, uint16_t size)
 {
 	if (buffer[0] != 0xAA || buffer[1] != 0x55) return -1;
-	uint8_t checksum = 0x00;
-	for(int i = 0; i < size-2; i++)
-		checksum ^= buffer[i];
-	if(checksum != buffer[size - 2]) return -2;
-	uint8_t data_count = buffer[2];
-	running = 1;
-	custom_field_t received_fields[data_count];
-	uint16_t offset = 3;
 	
-	for (int i = 0; i < data_count; i++) {
-        if (offset >= size - 2) { 
-            return -5; 
-        }
-        
-        uint8_t type_id = buffer[offset];
-        offset++; 
-        
-        received_fields[i].type_id = type_id; 
-
-        switch (type_id) {
-            case 0x00: // int16 (小端序)
-                if (offset + 2 > size - 2) return -5;
-                received_fields[i].value.i16_val = (int16_t)((buffer[offset+1] << 8) | buffer[offset]);
-                offset += 2;
-                break;
-
-            case 0x01: // uint16 (小端序)
-                if (offset + 2 > size - 2) return -5;
-                received_fields[i].value.u16_val = (uint16_t)((buffer[offset+1] << 8) | buffer[offset]);
-                offset += 2;
-                break;
-
-            case 0x02: // int32 (小端序)
-                if (offset + 4 > size - 2) return -5;
-                received_fields[i].value.i32_val = (int32_t)((buffer[offset+3] << 24) | (buffer[offset+2] << 16) | (buffer[offset+1] << 8) | buffer[offset]);
-                offset += 4;
-                break;
-
-            case 0x03: // uint32 (小端序)
-                if (offset + 4 > size - 2) return -5;
-                received_fields[i].value.u32_val = (uint32_t)((buffer[offset+3] << 24) | (buffer[offset+2] << 16) | (buffer[offset+1] << 8) | buffer[offset]);
-                offset += 4;
-                break;
-
-            case 0x04: // float (小端序)
-                if (offset + 4 > size - 2) return -5;
-                memcpy(&(received_fields[i].value.f_val), &buffer[offset], sizeof(float));
-                offset += 4;
-                break;
-                
-            case 0x05: // uint8
-                if (offset + 1 > size - 2) return -5;
-                received_fields[i].value.u8_val = buffer[offset];
-                offset += 1;
-                break;
-                
-            default:
-                // 未知数据类型
-                return -4; // 未知数据类型
-        }
+	// 切换校验方式/传输方式命令帧
+	if (size == 6 && (buffer[2] == FRAME_CMD_CHECK_MODE || buffer[2] == FRAME_CMD_TELEMETRY_MODE)) {
+		uint8_t cmd_checksum = 0x00;
+		for(int i = 0; i < 4; i++)
+			cmd_checksum ^= buffer[i];
+		if(cmd_checksum != buffer[4] || buffer[5] != 0x5D) return -2;
+		if (buffer[2] == FRAME_CMD_CHECK_MODE)
+			check_mode = (buffer[3] == CHECK_MODE_CRC16) ? CHECK_MODE_CRC16 : CHECK_MODE_XOR;
+		else
+			telemetry_mode = (buffer[3] == TELEMETRY_DELTA) ? TELEMETRY_DELTA : TELEMETRY_RAW;
+		// 丢弃未发送的样本, 下一帧从关键帧开始
+		batch_count = 0;
+		delta_count = 0;
+		need_key = 1;
+		return 1;
 	}
-	PID_P[0] = received_fields[0].value.f_val;
-	PID_P[1] = received_fields[1].value.f_val;
-	PID_P[2] = received_fields[2].value.f_val;
-	IOUT_MAX_P = received_fields[3].value.f_val;
-	OUT_MAX_P = received_fields[4].value.f_val;
 	
-	PID_V[0] = received_fields[5].value.f_val;
-	PID_V[1] = received_fields[6].value.f_val;
-	PID_V[2] = received_fields[7].value.f_val;
-	IOUT_MAX_V = received_fields[8].value.f_val;
-	OUT_MAX_V = received_fields[9].value.f_val;
+	// 定长帧, 按 pid_frames.h 中生成的固定偏移解包, 不再逐字段解析类型标识
+	pid_frames_tx_t params;
+	int rec = pid_frames_unpack_tx(buffer, size, check_mode, &params);
+	if (rec != 0) return rec;
+	running = 1;
+	
+	PID_P[0] = params.kp_p;
+	PID_P[1] = params.ki_p;
+	PID_P[2] = params.kd_p;
+	IOUT_MAX_P = params.max_iout_p;
+	OUT_MAX_P = params.max_out_p;
+	
+	PID_V[0] = params.kp_v;
+	PID_V[1] = params.ki_v;
+	PID_V[2] = params.kd_v;
+	IOUT_MAX_V = params.max_iout_v;
+	OUT_MAX_V = params.max_out_v;
 
 	printf("P: %.2f %.2f %.2f %f %f\r\n", PID_P[0], PID_P[1], PID_P[2], IOUT_MAX_P, OUT_MAX_P);
 	printf("V: %.2f %.2f %.2f %f %f\r\n", PID_V[0], PID_V[1], PID_V[2], IOUT_MAX_V, OUT_MAX_V);
@@ -131,45 +112,78 @@ int Rec_decode(uint8_t *buffer, uint16_t size)
 	return 0;
 }
 
-void Send_code(uint8_t *buffer)
+// 把一个样本以 zigzag varint 差值追加到 buffer 中的差分压缩帧, 帧完成时返回帧长, 否则返回0
+// 帧结构: 0xAA 0x55 帧长 0x40|关键帧0x20|running 序号 样本数 差值... 校验位 0x5D
+static uint16_t Delta_encode(uint8_t *buffer, const pid_frames_rx_t *status)
 {
-	buffer[0] = 0xAA;
-	buffer[1] = 0x55;
-	buffer[2] = 0x20;
-	buffer[3] = 0x01;
-	
-	for(int i = 0; i < 4; i++){
-		buffer[i*2 + 4] = vecdata.motor_v[i] & 0xFF;
-		buffer[i*2 + 5] = (vecdata.motor_v[i] >> 8) & 0xFF;
+	uint8_t raw[PID_FRAMES_RX_SAMPLE_LEN];
+	pid_frames_put_rx_sample(raw, status);
+	if (delta_count == 0) {
+		delta_key = need_key || frames_since_key >= KEYFRAME_INTERVAL;
+		delta_len = DELTA_HEADER_LEN;
 	}
 	
-	buffer[12] = vecdata.vx & 0xFF;
-	buffer[13] = (vecdata.vx >> 8) & 0xFF;
-	buffer[14] = vecdata.vy & 0xFF;
-	buffer[15] = (vecdata.vy >> 8) & 0xFF;
-	buffer[16] = vecdata.vz & 0xFF;
-	buffer[17] = (vecdata.vz >> 8) & 0xFF;
-	
-	buffer[18] = odomdata.x & 0xFF;
-	buffer[19] = (odomdata.x >> 8) & 0xFF;
-	buffer[20] = odomdata.y & 0xFF;
-	buffer[21] = (odomdata.y >> 8) & 0xFF;
-	buffer[22] = odomdata.z & 0xFF;
-	buffer[23] = (odomdata.z >> 8) & 0xFF;
-	
-	buffer[24] = imudata.roll & 0xFF;
-	buffer[25] = (imudata.roll >> 8) & 0xFF;
-	buffer[26] = imudata.pitch& 0xFF;
-	buffer[27] = (imudata.pitch >> 8) & 0xFF;
-	buffer[28] = imudata.yaw& 0xFF;
-	buffer[29] = (imudata.yaw >> 8) & 0xFF;
+	for (int i = 0; i < DELTA_CHANNELS; i++) {
+		int16_t value = (int16_t)pid_frames_get_u16(&raw[i * 2]);
+		// 关键帧的第一个样本发送绝对值, 其余为相对前一样本的差值
+		int32_t delta = (delta_count == 0 && delta_key) ? value : (int32_t)value - delta_last[i];
+		uint32_t zigzag = ((uint32_t)delta << 1) ^ (uint32_t)(delta >> 31);
+		while (zigzag >= 0x80) {
+			buffer[delta_len++] = (zigzag & 0x7F) | 0x80;
+			zigzag >>= 7;
+		}
+		buffer[delta_len++] = zigzag;
+		delta_last[i] = value;
+	}
+	delta_count++;
 	
-	buffer[30] = 0x00;
-	for(int i = 0; i < 30 ;i++)
-		buffer[30] ^= buffer[i];
-	buffer[31] = 0x5D;
+	// 攒够样本数, 或剩余空间放不下下一个样本时发送
+	if (delta_count < TELEMETRY_BATCH && delta_len + DELTA_SAMPLE_MAX_LEN + 3 <= 255) return 0;
+	buffer[0] = 0xAA;
+	buffer[1] = 0x55;
+	buffer[2] = delta_len + PID_FRAMES_CHECK_SIZE(check_mode) + 1;
+	buffer[3] = FRAME_DELTA_FLAG | (delta_key ? FRAME_KEY_FLAG : 0) | (status->running & 0x01);
+	buffer[4] = delta_seq++;
+	buffer[5] = delta_count;
+	frames_since_key = delta_key ? 1 : frames_since_key + 1;
+	need_key = 0;
+	delta_count = 0;
+	return pid_frames_seal(buffer, delta_len, check_mode);
+}
+
+void Send_code(uint8_t *buffer)
+{
+	pid_frames_rx_t status = {
+		.running = 0x01,
+		.motor_v_1 = vecdata.motor_v[0],
+		.motor_v_2 = vecdata.motor_v[1],
+		.motor_v_3 = vecdata.motor_v[2],
+		.motor_v_4 = vecdata.motor_v[3],
+		.vx = vecdata.vx,
+		.vy = vecdata.vy,
+		.vz = vecdata.vz,
+		.x = odomdata.x,
+		.y = odomdata.y,
+		.z = odomdata.z,
+		.roll = imudata.roll,
+		.pitch = imudata.pitch,
+		.yaw = imudata.yaw,
+	};
+	uint16_t len;
+	if (telemetry_mode == TELEMETRY_DELTA) {
+		len = Delta_encode(buffer, &status);
+		if (len == 0) return;
+	} else if (TELEMETRY_BATCH > 1) {
+		// 攒够 TELEMETRY_BATCH 个样本后一次发送, 共用一个帧头和校验位
+		batch_samples[batch_count++] = status;
+		if (batch_count < TELEMETRY_BATCH) return;
+		len = pid_frames_pack_rx_batch(buffer, batch_samples, batch_count, check_mode);
+		batch_count = 0;
+	} else {
+		len = pid_frames_pack_rx(buffer, &status, check_mode);
+	}
 	
-	HAL_UART_Transmit(&huart3, uart3_tx_buffer, 32, 100);
+	HAL_UART_Transmit(&huart3, uart3_tx_buffer, len, 100);
 }
 
 //void HAL_UARTEx_RxEventCallback(UART_HandleTypeDef *huart, uint16_t Size) //DMA
@@ -5,9 +5,26 @@
 #include "pid.h"
 #include <stdio.h>
 #include <stdarg.h>
+#include "pid_frames.h" // 由 frame_spec.py 根据 specs/pid.json 生成
 
-#define REC_MESSAGE_LEN 55
-#define SEND_MESSAGE_LEN 32
+#define REC_MESSAGE_LEN PID_FRAMES_TX_LEN(CHECK_MODE_CRC16)  // 异或校验时参数帧55字节, CRC-16校验时56字节
+// 每个状态帧携带的样本数: 1 时发送单样本状态帧 (异或校验32字节, CRC-16校验33字节),
+// 大于1时发送批量帧, 8个样本时异或校验215字节 (每样本约26.9字节, 单样本帧为32字节)
+#define TELEMETRY_BATCH 8
+#define SEND_MESSAGE_LEN 255 // 帧长字节的上限, 差分压缩帧按实际压缩效果变长
+
+// 切换校验方式命令帧 (始终使用异或校验): 0xAA 0x55 0xFE 校验方式 校验位 0x5D
+#define FRAME_CMD_CHECK_MODE 0xFE
+#define CHECK_MODE_XOR   0
+#define CHECK_MODE_CRC16 1 // CRC-16/CCITT-FALSE, 小端存放在帧尾之前
+
+// 切换传输方式命令帧 (始终使用异或校验): 0xAA 0x55 0xFD 传输方式 校验位 0x5D
+#define FRAME_CMD_TELEMETRY_MODE 0xFD
+#define TELEMETRY_RAW   0
+#define TELEMETRY_DELTA 1 // 差分压缩: 各通道相对前一样本的差值以 zigzag varint 发送
+#define KEYFRAME_INTERVAL 16 // 差分压缩时每16帧发送一个关键帧, 上位机丢帧后从关键帧恢复
+#define FRAME_DELTA_FLAG 0x40
+#define FRAME_KEY_FLAG   0x20
 
 typedef struct {
     uint8_t type_id; 
@@ -27,6 +44,8 @@ extern uint8_t uart3_rx_buffer[REC_MESSAGE_LEN];
 extern uint8_t uart3_tx_buffer[SEND_MESSAGE_LEN];
 
 extern int running;
+extern uint8_t check_mode;
+extern uint8_t telemetry_mode;
 
 void Send_code(uint8_t *buffer);
 void uart_init(void);
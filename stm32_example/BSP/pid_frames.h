@@ -0,0 +1,293 @@
+/* 由 frame_spec.py 根据 pid.json 生成, 请勿手动修改 */
+#ifndef __PID_FRAMES_H__
+#define __PID_FRAMES_H__
+
+#include <stdint.h>
+#include <string.h>
+
+#define PID_FRAMES_TAIL 0x5D
+#define PID_FRAMES_CHECK_XOR   0
+#define PID_FRAMES_CHECK_CRC16 1
+#define PID_FRAMES_CHECK_SIZE(check) ((check) == PID_FRAMES_CHECK_CRC16 ? 2 : 1)
+
+#define PID_FRAMES_TX_COUNT 10
+#define PID_FRAMES_TX_BODY_LEN 53
+#define PID_FRAMES_TX_LEN(check) (PID_FRAMES_TX_BODY_LEN + PID_FRAMES_CHECK_SIZE(check) + 1)
+#define PID_FRAMES_RX_BODY_LEN 30
+#define PID_FRAMES_RX_LEN(check) (PID_FRAMES_RX_BODY_LEN + PID_FRAMES_CHECK_SIZE(check) + 1)
+#define PID_FRAMES_MAX_LEN (PID_FRAMES_TX_BODY_LEN > PID_FRAMES_RX_BODY_LEN ? PID_FRAMES_TX_LEN(1) : PID_FRAMES_RX_LEN(1))
+
+/* 批量传入帧: 多个样本共用一个帧头和校验位 */
+#define PID_FRAMES_RX_BATCH_FLAG 0x80
+#define PID_FRAMES_RX_SAMPLE_LEN 26
+#define PID_FRAMES_RX_BATCH_LEN(count, check) (5 + PID_FRAMES_RX_SAMPLE_LEN * (count) + PID_FRAMES_CHECK_SIZE(check) + 1)
+#define PID_FRAMES_RX_BATCH_MAX(check) ((255 - 6 - PID_FRAMES_CHECK_SIZE(check)) / PID_FRAMES_RX_SAMPLE_LEN)
+
+/* 传出帧 (上位机 -> 下位机) */
+typedef struct {
+	float kp_p; // KP_P
+	float ki_p; // KI_P
+	float kd_p; // KD_P
+	float max_iout_p; // MAX_IOUT_P
+	float max_out_p; // MAX_OUT_P
+	float kp_v; // KP_V
+	float ki_v; // KI_V
+	float kd_v; // KD_V
+	float max_iout_v; // MAX_IOUT_V
+	float max_out_v; // MAX_OUT_V
+} pid_frames_tx_t;
+
+/* 传入帧 (下位机 -> 上位机) */
+typedef struct {
+	uint8_t running;
+	int16_t motor_v_1;
+	int16_t motor_v_2;
+	int16_t motor_v_3;
+	int16_t motor_v_4;
+	int16_t vx;
+	int16_t vy;
+	int16_t vz;
+	int16_t x;
+	int16_t y;
+	int16_t z;
+	int16_t roll;
+	int16_t pitch;
+	int16_t yaw;
+} pid_frames_rx_t;
+
+static inline void pid_frames_put_u16(uint8_t *p, uint16_t v) { p[0] = v & 0xFF; p[1] = (v >> 8) & 0xFF; }
+static inline void pid_frames_put_u32(uint8_t *p, uint32_t v)
+{
+	p[0] = v & 0xFF; p[1] = (v >> 8) & 0xFF; p[2] = (v >> 16) & 0xFF; p[3] = (v >> 24) & 0xFF;
+}
+static inline void pid_frames_put_f32(uint8_t *p, float v) { uint32_t u; memcpy(&u, &v, 4); pid_frames_put_u32(p, u); }
+static inline uint16_t pid_frames_get_u16(const uint8_t *p) { return (uint16_t)(p[0] | (p[1] << 8)); }
+static inline uint32_t pid_frames_get_u32(const uint8_t *p)
+{
+	return (uint32_t)p[0] | ((uint32_t)p[1] << 8) | ((uint32_t)p[2] << 16) | ((uint32_t)p[3] << 24);
+}
+static inline float pid_frames_get_f32(const uint8_t *p) { uint32_t u = pid_frames_get_u32(p); float v; memcpy(&v, &u, 4); return v; }
+
+/* CRC-16/CCITT-FALSE (多项式 0x1021, 初值 0xFFFF), 按字节查表 */
+static const uint16_t pid_frames_crc16_table[256] =
+{
+	0x0000, 0x1021, 0x2042, 0x3063, 0x4084, 0x50A5, 0x60C6, 0x70E7,
+	0x8108, 0x9129, 0xA14A, 0xB16B, 0xC18C, 0xD1AD, 0xE1CE, 0xF1EF,
+	0x1231, 0x0210, 0x3273, 0x2252, 0x52B5, 0x4294, 0x72F7, 0x62D6,
+	0x9339, 0x8318, 0xB37B, 0xA35A, 0xD3BD, 0xC39C, 0xF3FF, 0xE3DE,
+	0x2462, 0x3443, 0x0420, 0x1401, 0x64E6, 0x74C7, 0x44A4, 0x5485,
+	0xA56A, 0xB54B, 0x8528, 0x9509, 0xE5EE, 0xF5CF, 0xC5AC, 0xD58D,
+	0x3653, 0x2672, 0x1611, 0x0630, 0x76D7, 0x66F6, 0x5695, 0x46B4,
+	0xB75B, 0xA77A, 0x9719, 0x8738, 0xF7DF, 0xE7FE, 0xD79D, 0xC7BC,
+	0x48C4, 0x58E5, 0x6886, 0x78A7, 0x0840, 0x1861, 0x2802, 0x3823,
+	0xC9CC, 0xD9ED, 0xE98E, 0xF9AF, 0x8948, 0x9969, 0xA90A, 0xB92B,
+	0x5AF5, 0x4AD4, 0x7AB7, 0x6A96, 0x1A71, 0x0A50, 0x3A33, 0x2A12,
+	0xDBFD, 0xCBDC, 0xFBBF, 0xEB9E, 0x9B79, 0x8B58, 0xBB3B, 0xAB1A,
+	0x6CA6, 0x7C87, 0x4CE4, 0x5CC5, 0x2C22, 0x3C03, 0x0C60, 0x1C41,
+	0xEDAE, 0xFD8F, 0xCDEC, 0xDDCD, 0xAD2A, 0xBD0B, 0x8D68, 0x9D49,
+	0x7E97, 0x6EB6, 0x5ED5, 0x4EF4, 0x3E13, 0x2E32, 0x1E51, 0x0E70,
+	0xFF9F, 0xEFBE, 0xDFDD, 0xCFFC, 0xBF1B, 0xAF3A, 0x9F59, 0x8F78,
+	0x9188, 0x81A9, 0xB1CA, 0xA1EB, 0xD10C, 0xC12D, 0xF14E, 0xE16F,
+	0x1080, 0x00A1, 0x30C2, 0x20E3, 0x5004, 0x4025, 0x7046, 0x6067,
+	0x83B9, 0x9398, 0xA3FB, 0xB3DA, 0xC33D, 0xD31C, 0xE37F, 0xF35E,
+	0x02B1, 0x1290, 0x22F3, 0x32D2, 0x4235, 0x5214, 0x6277, 0x7256,
+	0xB5EA, 0xA5CB, 0x95A8, 0x8589, 0xF56E, 0xE54F, 0xD52C, 0xC50D,
+	0x34E2, 0x24C3, 0x14A0, 0x0481, 0x7466, 0x6447, 0x5424, 0x4405,
+	0xA7DB, 0xB7FA, 0x8799, 0x97B8, 0xE75F, 0xF77E, 0xC71D, 0xD73C,
+	0x26D3, 0x36F2, 0x0691, 0x16B0, 0x6657, 0x7676, 0x4615, 0x5634,
+	0xD94C, 0xC96D, 0xF90E, 0xE92F, 0x99C8, 0x89E9, 0xB98A, 0xA9AB,
+	0x5844, 0x4865, 0x7806, 0x6827, 0x18C0, 0x08E1, 0x3882, 0x28A3,
+	0xCB7D, 0xDB5C, 0xEB3F, 0xFB1E, 0x8BF9, 0x9BD8, 0xABBB, 0xBB9A,
+	0x4A75, 0x5A54, 0x6A37, 0x7A16, 0x0AF1, 0x1AD0, 0x2AB3, 0x3A92,
+	0xFD2E, 0xED0F, 0xDD6C, 0xCD4D, 0xBDAA, 0xAD8B, 0x9DE8, 0x8DC9,
+	0x7C26, 0x6C07, 0x5C64, 0x4C45, 0x3CA2, 0x2C83, 0x1CE0, 0x0CC1,
+	0xEF1F, 0xFF3E, 0xCF5D, 0xDF7C, 0xAF9B, 0xBFBA, 0x8FD9, 0x9FF8,
+	0x6E17, 0x7E36, 0x4E55, 0x5E74, 0x2E93, 0x3EB2, 0x0ED1, 0x1EF0
+};
+
+static inline uint16_t pid_frames_crc16(const uint8_t *data, uint16_t len)
+{
+	uint16_t crc = 0xFFFF;
+	for (uint16_t i = 0; i < len; i++)
+		crc = (uint16_t)(crc << 8) ^ pid_frames_crc16_table[(uint8_t)(crc >> 8) ^ data[i]];
+	return crc;
+}
+
+/* 在 buf[0..body_len) 之后写入校验位和帧尾, 返回帧长 */
+static inline uint16_t pid_frames_seal(uint8_t *buf, uint16_t body_len, uint8_t check)
+{
+	if (check == PID_FRAMES_CHECK_CRC16) {
+		pid_frames_put_u16(&buf[body_len], pid_frames_crc16(buf, body_len));
+		buf[body_len + 2] = PID_FRAMES_TAIL;
+		return body_len + 3;
+	}
+	uint8_t checksum = 0x00;
+	for (uint16_t i = 0; i < body_len; i++)
+		checksum ^= buf[i];
+	buf[body_len] = checksum;
+	buf[body_len + 1] = PID_FRAMES_TAIL;
+	return body_len + 2;
+}
+
+/* 验证帧头、校验位和帧尾: 0 正确, -1 帧头错误, -2 校验错误 */
+static inline int pid_frames_verify(const uint8_t *buf, uint16_t body_len, uint8_t check)
+{
+	if (buf[0] != 0xAA || buf[1] != 0x55) return -1;
+	if (check == PID_FRAMES_CHECK_CRC16) {
+		if (pid_frames_crc16(buf, body_len) != pid_frames_get_u16(&buf[body_len]) || buf[body_len + 2] != PID_FRAMES_TAIL) return -2;
+		return 0;
+	}
+	uint8_t checksum = 0x00;
+	for (uint16_t i = 0; i < body_len; i++)
+		checksum ^= buf[i];
+	if (checksum != buf[body_len] || buf[body_len + 1] != PID_FRAMES_TAIL) return -2;
+	return 0;
+}
+
+/* 打包传出帧, 返回帧长 */
+static inline uint16_t pid_frames_pack_tx(uint8_t *buf, const pid_frames_tx_t *msg, uint8_t check)
+{
+	buf[0] = 0xAA;
+	buf[1] = 0x55;
+	buf[2] = PID_FRAMES_TX_COUNT;
+	buf[3] = 0x04;
+	pid_frames_put_f32(&buf[4], msg->kp_p);
+	buf[8] = 0x04;
+	pid_frames_put_f32(&buf[9], msg->ki_p);
+	buf[13] = 0x04;
+	pid_frames_put_f32(&buf[14], msg->kd_p);
+	buf[18] = 0x04;
+	pid_frames_put_f32(&buf[19], msg->max_iout_p);
+	buf[23] = 0x04;
+	pid_frames_put_f32(&buf[24], msg->max_out_p);
+	buf[28] = 0x04;
+	pid_frames_put_f32(&buf[29], msg->kp_v);
+	buf[33] = 0x04;
+	pid_frames_put_f32(&buf[34], msg->ki_v);
+	buf[38] = 0x04;
+	pid_frames_put_f32(&buf[39], msg->kd_v);
+	buf[43] = 0x04;
+	pid_frames_put_f32(&buf[44], msg->max_iout_v);
+	buf[48] = 0x04;
+	pid_frames_put_f32(&buf[49], msg->max_out_v);
+	return pid_frames_seal(buf, PID_FRAMES_TX_BODY_LEN, check);
+}
+
+/* 解包传出帧: 0 正确, -1 帧头错误, -2 校验错误, -4 类型标识不符, -5 长度或字段数不符 */
+static inline int pid_frames_unpack_tx(const uint8_t *buf, uint16_t size, uint8_t check, pid_frames_tx_t *msg)
+{
+	if (size != PID_FRAMES_TX_LEN(check)) return -5;
+	int rec = pid_frames_verify(buf, PID_FRAMES_TX_BODY_LEN, check);
+	if (rec != 0) return rec;
+	if (buf[2] != PID_FRAMES_TX_COUNT) return -5;
+	if (buf[3] != 0x04) return -4;
+	if (buf[8] != 0x04) return -4;
+	if (buf[13] != 0x04) return -4;
+	if (buf[18] != 0x04) return -4;
+	if (buf[23] != 0x04) return -4;
+	if (buf[28] != 0x04) return -4;
+	if (buf[33] != 0x04) return -4;
+	if (buf[38] != 0x04) return -4;
+	if (buf[43] != 0x04) return -4;
+	if (buf[48] != 0x04) return -4;
+	msg->kp_p = pid_frames_get_f32(&buf[4]);
+	msg->ki_p = pid_frames_get_f32(&buf[9]);
+	msg->kd_p = pid_frames_get_f32(&buf[14]);
+	msg->max_iout_p = pid_frames_get_f32(&buf[19]);
+	msg->max_out_p = pid_frames_get_f32(&buf[24]);
+	msg->kp_v = pid_frames_get_f32(&buf[29]);
+	msg->ki_v = pid_frames_get_f32(&buf[34]);
+	msg->kd_v = pid_frames_get_f32(&buf[39]);
+	msg->max_iout_v = pid_frames_get_f32(&buf[44]);
+	msg->max_out_v = pid_frames_get_f32(&buf[49]);
+	return 0;
+}
+
+/* 写入一个样本 (传入帧的数据部分) */
+static inline void pid_frames_put_rx_sample(uint8_t *p, const pid_frames_rx_t *msg)
+{
+	pid_frames_put_u16(&p[0], (uint16_t)msg->motor_v_1);
+	pid_frames_put_u16(&p[2], (uint16_t)msg->motor_v_2);
+	pid_frames_put_u16(&p[4], (uint16_t)msg->motor_v_3);
+	pid_frames_put_u16(&p[6], (uint16_t)msg->motor_v_4);
+	pid_frames_put_u16(&p[8], (uint16_t)msg->vx);
+	pid_frames_put_u16(&p[10], (uint16_t)msg->vy);
+	pid_frames_put_u16(&p[12], (uint16_t)msg->vz);
+	pid_frames_put_u16(&p[14], (uint16_t)msg->x);
+	pid_frames_put_u16(&p[16], (uint16_t)msg->y);
+	pid_frames_put_u16(&p[18], (uint16_t)msg->z);
+	pid_frames_put_u16(&p[20], (uint16_t)msg->roll);
+	pid_frames_put_u16(&p[22], (uint16_t)msg->pitch);
+	pid_frames_put_u16(&p[24], (uint16_t)msg->yaw);
+}
+
+/* 读取一个样本 (传入帧的数据部分) */
+static inline void pid_frames_get_rx_sample(const uint8_t *p, pid_frames_rx_t *msg)
+{
+	msg->motor_v_1 = (int16_t)pid_frames_get_u16(&p[0]);
+	msg->motor_v_2 = (int16_t)pid_frames_get_u16(&p[2]);
+	msg->motor_v_3 = (int16_t)pid_frames_get_u16(&p[4]);
+	msg->motor_v_4 = (int16_t)pid_frames_get_u16(&p[6]);
+	msg->vx = (int16_t)pid_frames_get_u16(&p[8]);
+	msg->vy = (int16_t)pid_frames_get_u16(&p[10]);
+	msg->vz = (int16_t)pid_frames_get_u16(&p[12]);
+	msg->x = (int16_t)pid_frames_get_u16(&p[14]);
+	msg->y = (int16_t)pid_frames_get_u16(&p[16]);
+	msg->z = (int16_t)pid_frames_get_u16(&p[18]);
+	msg->roll = (int16_t)pid_frames_get_u16(&p[20]);
+	msg->pitch = (int16_t)pid_frames_get_u16(&p[22]);
+	msg->yaw = (int16_t)pid_frames_get_u16(&p[24]);
+}
+
+/* 打包传入帧, 返回帧长 */
+static inline uint16_t pid_frames_pack_rx(uint8_t *buf, const pid_frames_rx_t *msg, uint8_t check)
+{
+	buf[0] = 0xAA;
+	buf[1] = 0x55;
+	buf[2] = PID_FRAMES_RX_LEN(check);
+	buf[3] = msg->running;
+	pid_frames_put_rx_sample(&buf[4], msg);
+	return pid_frames_seal(buf, PID_FRAMES_RX_BODY_LEN, check);
+}
+
+/* 解包传入帧: 0 正确, -1 帧头错误, -2 校验错误, -5 长度不符 */
+static inline int pid_frames_unpack_rx(const uint8_t *buf, uint16_t size, uint8_t check, pid_frames_rx_t *msg)
+{
+	if (size != PID_FRAMES_RX_LEN(check) || buf[2] != size) return -5;
+	int rec = pid_frames_verify(buf, PID_FRAMES_RX_BODY_LEN, check);
+	if (rec != 0) return rec;
+	msg->running = buf[3];
+	pid_frames_get_rx_sample(&buf[4], msg);
+	return 0;
+}
+
+/* 打包批量传入帧: msgs 中的 count 个样本共用一个帧头, running 取最后一个样本; 返回帧长, count 超出范围时返回 0 */
+static inline uint16_t pid_frames_pack_rx_batch(uint8_t *buf, const pid_frames_rx_t *msgs, uint8_t count, uint8_t check)
+{
+	if (count == 0 || count > PID_FRAMES_RX_BATCH_MAX(check)) return 0;
+	buf[0] = 0xAA;
+	buf[1] = 0x55;
+	buf[2] = PID_FRAMES_RX_BATCH_LEN(count, check);
+	buf[3] = PID_FRAMES_RX_BATCH_FLAG | (msgs[count - 1].running & 0x01);
+	buf[4] = count;
+	for (uint8_t i = 0; i < count; i++)
+		pid_frames_put_rx_sample(&buf[5 + i * PID_FRAMES_RX_SAMPLE_LEN], &msgs[i]);
+	return pid_frames_seal(buf, 5 + count * PID_FRAMES_RX_SAMPLE_LEN, check);
+}
+
+/* 解包批量传入帧: 返回样本数, 错误时返回值同 unpack_rx; msgs 至少能容纳 max_count 个样本 */
+static inline int pid_frames_unpack_rx_batch(const uint8_t *buf, uint16_t size, uint8_t check, pid_frames_rx_t *msgs, uint8_t max_count)
+{
+	if (size <= 5 || !(buf[3] & PID_FRAMES_RX_BATCH_FLAG)) return -5;
+	uint8_t count = buf[4];
+	if (count == 0 || count > max_count || size != PID_FRAMES_RX_BATCH_LEN(count, check) || buf[2] != size) return -5;
+	int rec = pid_frames_verify(buf, size - 1 - PID_FRAMES_CHECK_SIZE(check), check);
+	if (rec != 0) return rec;
+	for (uint8_t i = 0; i < count; i++) {
+		msgs[i].running = buf[3] & 0x01;
+		pid_frames_get_rx_sample(&buf[5 + i * PID_FRAMES_RX_SAMPLE_LEN], &msgs[i]);
+	}
+	return count;
+}
+
+#endif
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checksum import XOR_CHECK, CRC16_CHECK, xor_checksum
+from frame_codec import StatusFrameDecoder
+
+
+def test_xor_checksum_matches_byte_loop():
+    """折叠异或与逐字节异或一致, 包括超过一次折叠长度的数据"""
+    rnd = np.random.default_rng(0)
+    for n in range(600):
+        data = bytearray(rnd.integers(0, 256, n + 2, dtype=np.uint8).tobytes())
+        expected = 0
+        for byte in data[1:n + 1]:
+            expected ^= byte
+        assert xor_checksum(data, 1, n + 1) == expected
+
+
+def test_decode_batch_drops_bad_frames_and_stops_at_bad_tail():
+    """校验错误的帧被丢弃但计入消耗, 帧尾错误的帧及之后的数据留给逐帧解析"""
+    rnd = np.random.default_rng(1)
+    for check in (XOR_CHECK, CRC16_CHECK):
+        decoder = StatusFrameDecoder(check)
+        frames = []
+        for _ in range(6):
+            body = rnd.integers(0, 256, decoder.size - 1 - check.size, dtype=np.uint8)
+            body[:3] = (0xAA, 0x55, decoder.size)
+            frames.append(check.seal(body.tobytes()))
+        frames[1][5] ^= 0x01     # 校验错误
+        frames[4][-1] = 0x00     # 帧尾错误
+        rows, consumed, bad = decoder.decode_batch(memoryview(b"".join(frames)))
+        assert consumed == 4 * decoder.size
+        assert bad == 1
+        assert rows == [decoder.decode(frames[i]) for i in (0, 2, 3)]
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from link_stats import ReadClock
+
+BAUDRATE = 115200
+BATCH_LEN = 215     # 8 个样本的批量帧
+BATCH_SAMPLES = 8
+
+
+def test_batch_after_idle_spans_its_own_transmit_time():
+    """空闲 5 s 后的第一帧批量帧只占其自身的传输时间, 不摊到整个空闲时段"""
+    clock = ReadClock(BAUDRATE, start_ns=0)
+    clock.on_read(32, 100_000_000)
+    first = clock.frame_time(32)
+
+    clock.on_read(BATCH_LEN, 5_100_000_000)
+    times = clock.frame_times((32 + BATCH_LEN,), (BATCH_SAMPLES,), (BATCH_LEN,))
+
+    transmit = BATCH_LEN * clock.line_byte_ns / 1e9
+    assert len(times) == BATCH_SAMPLES
+    assert times[-1] == 5.1
+    assert times[0] > 5.1 - transmit
+    assert times[0] > first + 4.9
+    assert np.all(np.diff(times) > 0)
+
+
+def test_back_to_back_batches_do_not_overlap():
+    """连续到达的批量帧各自均匀分布, 时间戳单调递增"""
+    clock = ReadClock(BAUDRATE, start_ns=0)
+    byte_ns = clock.line_byte_ns
+    ends = BATCH_LEN * np.arange(1, 4)
+    clock.on_read(3 * BATCH_LEN, 3 * BATCH_LEN * byte_ns)
+    times = clock.frame_times(ends, (BATCH_SAMPLES,) * 3, (BATCH_LEN,) * 3)
+
+    assert len(times) == 3 * BATCH_SAMPLES
+    assert np.all(np.diff(times) > 0)
+    assert np.allclose(times[BATCH_SAMPLES - 1::BATCH_SAMPLES], ends * byte_ns / 1e9)
+
+
+def test_samples_without_lengths_take_frame_end():
+    clock = ReadClock(BAUDRATE, start_ns=0)
+    clock.on_read(BATCH_LEN, 1_000_000_000)
+    times = clock.frame_times((BATCH_LEN,), (BATCH_SAMPLES,))
+    assert np.all(times == 1.0)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_decode import make_frames, make_batch_frames, BATCH_SAMPLES
+from capture import CaptureWriter
+from link_stats import ReadClock
+from offline_decode import decode_capture
+from recorder import read_recording
+
+BAUDRATE = 115200
+
+
+def test_batch_after_idle_spans_its_own_transmit_time(tmp_path):
+    """抓取文件中空闲 5 s 后的批量帧, 样本只分布在该帧的传输时间内"""
+    status = bytes(make_frames(1))
+    batch, size = make_batch_frames(make_frames(BATCH_SAMPLES, seed=1), BATCH_SAMPLES)
+    path = str(tmp_path / 'idle.zcap')
+    capture = CaptureWriter(path, info={'baudrate': BAUDRATE})
+    capture.write(100_000_000, status)
+    capture.write(5_100_000_000, bytes(batch))
+    capture.close()
+
+    target = str(tmp_path / 'idle.zrec')
+    decode_capture(path, target, workers=1)
+    times = read_recording(target)[1]['time']
+
+    transmit = size * ReadClock(BAUDRATE).line_byte_ns / 1e9
+    assert len(times) == 1 + BATCH_SAMPLES
+    assert times[-1] == 5.1
+    assert times[1] > 5.1 - transmit
+    assert np.all(np.diff(times) > 0)